@@ -0,0 +1,135 @@
+"""
+One agent turn: call the LLM, run the tool calls it asks for, and repeat
+until it answers in text. Shared by the four_tools.py REPL, batch runs and
+the benchmarks, and instrumented so each can see where a turn's time goes.
+"""
+
+import json
+import time
+
+from util import call_llm, render_response, execute_tool_calls, print_tool_timing, MAX_TOOL_CONCURRENCY
+from tracing import maybe_span, maybe_turn
+
+def run_agent_turn(messages, client, tool_schemas, tool_functions, model, console,
+                   max_concurrency=MAX_TOOL_CONCURRENCY, cache=None, recorder=None, budget=None,
+                   tracer=None, prefetcher=None, resilience=None):
+    """
+    Run one user turn to completion.
+
+    The user message must already be the last entry of messages. Every
+    assistant message and tool result of the turn is appended to messages.
+
+    Args:
+        messages: Conversation so far, ending with the user message
+        client: OpenAI client
+        tool_schemas: Tool schemas offered to the model
+        tool_functions: Dictionary mapping function names to function objects
+        model: Model name
+        console: Rich console that tool calls and the answer are printed to
+        max_concurrency: Maximum number of tool calls running at once
+        cache: Optional ToolCache
+        recorder: Optional LLMRecorder
+        budget: Optional ContextBudget enforced before every LLM call
+        tracer: Optional Tracer that records the turn and its LLM, tool and
+            render spans
+        prefetcher: Optional Prefetcher that speculatively runs follow-up lookups
+        resilience: Optional Resilience policy giving LLM and tool calls
+            deadlines, retries and hedging
+
+    Returns:
+        (response_message, stats): the final assistant message, and a
+        dictionary with the number of LLM and tool calls and the time spent in
+        LLM calls, tools (wall and summed), JSON serialization and rendering
+    """
+    with maybe_turn(tracer, model=model) as turn_span:
+        stats = {
+            "llm_calls": 0,
+            "tool_calls": 0,
+            "llm_time": 0.0,
+            "tool_wall_time": 0.0,
+            "tool_summed_time": 0.0,
+            "serialization_time": 0.0,
+            "render_time": 0.0,
+            "total_time": 0.0
+        }
+        turn_start = time.perf_counter()
+
+        def ask(status):
+            with console.status(status, spinner="dots"):
+                if budget is not None:
+                    budget.enforce(messages, tool_schemas)
+                start = time.perf_counter()
+                message = call_llm(messages, client, tool_schemas, model, recorder, tracer, resilience)
+                stats["llm_time"] += time.perf_counter() - start
+            stats["llm_calls"] += 1
+            return message
+
+        # Show spinner while waiting for initial response
+        response_message = ask("[bold green]Thinking...")
+
+        # Handle tool calls in a loop until we get a final response
+        while response_message.tool_calls:
+            # Add the assistant's response (with tool call) to messages
+            messages.append(response_message)
+
+            # Announce each tool call
+            start = time.perf_counter()
+            with maybe_span(tracer, "render", "tool_calls"):
+                for tool_call in response_message.tool_calls:
+                    stats["tool_calls"] += 1
+                    function_args = json.loads(tool_call.function.arguments)
+                    console.print(
+                        f"[cyan]🔧 Tool Call {stats['tool_calls']}: {tool_call.function.name}"
+                        f"({', '.join(f'{k}={v}' for k, v in function_args.items())})"
+                        f"[/cyan]"
+                    )
+            stats["render_time"] += time.perf_counter() - start
+
+            # Execute the turn's tool calls concurrently
+            start = time.perf_counter()
+            executed = execute_tool_calls(
+                response_message.tool_calls, tool_functions, max_concurrency, cache, tracer, prefetcher, resilience
+            )
+            tools_wall = time.perf_counter() - start
+            stats["tool_wall_time"] += tools_wall
+            stats["tool_summed_time"] += sum(elapsed for _, _, elapsed in executed)
+
+            # Serialize tool results for the model
+            start = time.perf_counter()
+            with maybe_span(tracer, "serialize", "tool_results"):
+                contents = [json.dumps(tool_result) for _, tool_result, _ in executed]
+            stats["serialization_time"] += time.perf_counter() - start
+
+            # Show tool results briefly
+            start = time.perf_counter()
+            with maybe_span(tracer, "render", "tool_results"):
+                for _, tool_result, _ in executed:
+                    console.print(f"[green]  ✓ {json.dumps(tool_result, indent=2)}[/green]")
+                print_tool_timing(executed, tools_wall, console)
+            stats["render_time"] += time.perf_counter() - start
+
+            # Add tool results to messages, in the original tool call order
+            for (tool_call, _, _), content in zip(executed, contents):
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": content
+                })
+
+            # Get the next response from the model
+            elapsed = time.perf_counter() - turn_start
+            response_message = ask(f"[bold green]Processing... ({elapsed:.1f}s elapsed)")
+
+        # We've exited the loop, so response_message contains the final text response
+        start = time.perf_counter()
+        with maybe_span(tracer, "render", "answer"):
+            console.print("[dim]Assistant ➜[/dim] ", end='')
+            render_response(response_message.content or "", console)
+        stats["render_time"] += time.perf_counter() - start
+
+        # Add final response to context
+        messages.append(response_message)
+
+        stats["total_time"] = time.perf_counter() - turn_start
+        turn_span.update(llm_calls=stats["llm_calls"], tool_calls=stats["tool_calls"])
+    return response_message, stats
@@ -0,0 +1,264 @@
+"""
+Non-interactive batch mode: run the four_tools.py agent over many cases.
+
+Cases are read from a JSONL file, one {"id": ..., "prompt": ...} object per
+line. Each case gets its own independent conversation, and up to
+--concurrency cases run at once (match this to the server's
+OLLAMA_NUM_PARALLEL, which is the default, times the number of --endpoints
+when cases are spread over several servers). Every finished case is appended
+to the output JSONL file straight away, so an interrupted run picks up where
+it left off: cases already answered in the output file are skipped, and
+cases that failed are retried.
+
+Example:
+    python batch.py cases.jsonl results.jsonl --local --concurrency 4
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+from rich.console import Console
+
+from agent import run_agent_turn
+from clients import make_client
+from four_tools import TOOL_FUNCTIONS, TOOL_SCHEMAS, client_kwargs_for, data_namespace
+from llm_cache import LLMRecorder, RECORD, REPLAY
+from prefetch import Prefetcher
+from router import Router
+from resilience import Resilience, DEFAULT_TOOL_DEADLINE, DEFAULT_LLM_DEADLINE, DEFAULT_TOOL_RETRIES
+from tool_cache import ToolCache
+from tools.clinvar_store import ClinVarStore, set_clinvar_store
+from tools.disease_index import DiseaseIndex, set_disease_index
+from tools.frequency_index import FrequencyIndex, set_frequency_index
+from tools.variant_store import open_variant_backend, set_variant_backend
+from tracing import Tracer
+from util import MAX_TOOL_CONCURRENCY
+
+def default_concurrency():
+    """Cases run at once by default: the server's OLLAMA_NUM_PARALLEL, else 4"""
+    return int(os.environ.get("OLLAMA_NUM_PARALLEL", 4))
+
+def load_cases(path):
+    """Read cases from JSONL; a case without an id is named after its line number"""
+    cases = []
+    with open(path) as handle:
+        for line_number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            if "prompt" not in case:
+                raise ValueError(f"{path}:{line_number}: case has no 'prompt'")
+            case.setdefault("id", f"line-{line_number}")
+            cases.append(case)
+    return cases
+
+def completed_ids(path):
+    """Ids of the cases the output file already holds a successful result for"""
+    done = set()
+    try:
+        with open(path) as handle:
+            for line in handle:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    # A line cut short by an interrupted run
+                    continue
+                if "error" not in result:
+                    done.add(result["id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+def run_case(case, client, model, max_concurrency, cache, recorder, tracer, prefetcher=None, resilience=None):
+    """Run one case in a fresh conversation and return its result record"""
+    messages = [{"role": "user", "content": case["prompt"]}]
+    # Tool calls and answers are rendered to a throwaway console
+    console = Console(file=io.StringIO(), width=120)
+    start = time.perf_counter()
+    try:
+        response_message, stats = run_agent_turn(
+            messages, client, TOOL_SCHEMAS, TOOL_FUNCTIONS, model, console, max_concurrency, cache, recorder,
+            tracer=tracer, prefetcher=prefetcher, resilience=resilience
+        )
+    except Exception as e:
+        return {"id": case["id"], "error": f"{type(e).__name__}: {e}", "latency_s": time.perf_counter() - start}
+
+    tool_calls = [
+        {"name": tool_call.function.name, "arguments": json.loads(tool_call.function.arguments)}
+        for message in messages if not isinstance(message, dict)
+        for tool_call in message.tool_calls or []
+    ]
+    return {
+        "id": case["id"],
+        "prompt": case["prompt"],
+        "answer": response_message.content,
+        "tool_calls": tool_calls,
+        "llm_calls": stats["llm_calls"],
+        "latency_s": stats["total_time"]
+    }
+
+def main(cases_path, output_path, model, client_kwargs, concurrency, max_concurrency=MAX_TOOL_CONCURRENCY,
+         tool_cache_path=None, record_path=None, replay_path=None, trace_path=None, vcf_path=None,
+         gene_intervals_path=None, frequency_index_path=None, clinvar_db_path=None, disease_genes_path=None,
+         prefetch=False, endpoints=None, tool_deadline=DEFAULT_TOOL_DEADLINE, llm_deadline=DEFAULT_LLM_DEADLINE,
+         tool_retries=DEFAULT_TOOL_RETRIES, hedge=False):
+    cases = load_cases(cases_path)
+    done = completed_ids(output_path)
+    pending = [case for case in cases if case["id"] not in done]
+    print(f"{len(cases)} case(s) in {cases_path}: {len(cases) - len(pending)} already done, {len(pending)} to run "
+          f"with concurrency {concurrency}")
+    if not pending:
+        return
+
+    # One client (and keep-alive connection pool), cache, recorder and tracer, shared by every case
+    router = None
+    if replay_path:
+        client = None
+    elif endpoints:
+        client = router = Router(endpoints, client_kwargs.get("api_key", "ollama"))
+    else:
+        client = make_client(client_kwargs)
+    if disease_genes_path:
+        set_disease_index(DiseaseIndex.open(disease_genes_path))
+    if vcf_path or gene_intervals_path:
+        set_variant_backend(open_variant_backend(vcf_path, gene_intervals_path))
+    if frequency_index_path:
+        set_frequency_index(FrequencyIndex.open(frequency_index_path))
+    if clinvar_db_path:
+        set_clinvar_store(ClinVarStore(clinvar_db_path))
+    cache = ToolCache(path=tool_cache_path, namespace=data_namespace())
+    prefetcher = Prefetcher(TOOL_FUNCTIONS, cache=cache) if prefetch else None
+    recorder = None
+    if record_path:
+        recorder = LLMRecorder(record_path, RECORD)
+    elif replay_path:
+        recorder = LLMRecorder(replay_path, REPLAY)
+    tracer = Tracer(trace_path) if trace_path else None
+    resilience = Resilience(tool_deadline, llm_deadline, tool_retries, hedge)
+
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [
+            executor.submit(run_case, case, client, model, max_concurrency, cache, recorder, tracer, prefetcher,
+                            resilience)
+            for case in pending
+        ]
+        with open(output_path, 'a') as output:
+            for finished, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                # Checkpoint each result as soon as it is available
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                if "error" in result:
+                    failures += 1
+                    status = f"failed: {result['error']}"
+                else:
+                    latencies.append(result["latency_s"])
+                    status = f"{len(result['tool_calls'])} tool call(s)"
+                print(f"[{finished}/{len(pending)}] {result['id']}: {result['latency_s']:.2f}s, {status}")
+    except KeyboardInterrupt:
+        print("Interrupted; finished cases are saved, rerun the same command to resume")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        cache.close()
+        if prefetcher is not None:
+            prefetcher.close()
+        if tracer is not None:
+            tracer.close()
+        if router is not None:
+            router.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(pending) - failures} case(s) succeeded, {failures} failed in {elapsed:.1f}s "
+          f"({len(pending) / elapsed * 60:.1f} cases/min)")
+    if latencies:
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(f"Per-case latency: p50 {p50:.2f}s, p95 {p95:.2f}s, max {max(latencies):.2f}s")
+    print(cache.summary())
+    if prefetcher is not None:
+        print(prefetcher.summary())
+    if recorder is not None:
+        print(recorder.summary())
+    if router is not None:
+        print(router.summary())
+    print(resilience.summary())
+
+def main_wrapper():
+    parser = argparse.ArgumentParser(description="Run the genomics agent over a JSONL file of cases")
+    parser.add_argument('cases', help="JSONL file of {\"id\": ..., \"prompt\": ...} cases")
+    parser.add_argument('output', help="JSONL file results are appended to (and resumed from)")
+    parser.add_argument('--local', action='store_true', help="use qwen3:8b served by Ollama instead of gpt-4")
+    parser.add_argument('--model', help="model name to request (overrides --local)")
+    parser.add_argument('--base-url', help="OpenAI-compatible endpoint, e.g. http://hpc-node:11434/v1")
+    parser.add_argument('--endpoints', nargs='+', metavar='URL',
+                        help="several OpenAI-compatible endpoints to load-balance cases across (overrides --base-url)")
+    parser.add_argument('--concurrency', type=int, default=default_concurrency(),
+                        help="cases run at once (default: $OLLAMA_NUM_PARALLEL or 4)")
+    parser.add_argument('--max-concurrency', type=int, default=MAX_TOOL_CONCURRENCY,
+                        help="maximum number of tool calls from one turn that run at the same time")
+    parser.add_argument('--tool-cache', metavar='PATH',
+                        help="SQLite file that persists cached tool results across runs")
+    parser.add_argument('--disease-genes', metavar='PATH', help="disease-gene association TSV")
+    parser.add_argument('--vcf', metavar='PATH', help="patient VCF for check_variant (as in four_tools.py)")
+    parser.add_argument('--gene-intervals', metavar='PATH', help="BED-like gene interval table")
+    parser.add_argument('--frequency-index', metavar='PREFIX', help="population frequency index")
+    parser.add_argument('--clinvar-db', metavar='PATH', help="ClinVar SQLite database")
+    parser.add_argument('--trace', metavar='PATH', help="append a JSONL span for every LLM and tool call")
+    parser.add_argument('--prefetch', action='store_true', help="speculatively prefetch follow-up lookups")
+    parser.add_argument('--tool-deadline', type=float, default=DEFAULT_TOOL_DEADLINE, metavar='SECONDS',
+                        help="give up on a tool call after this long (0: never)")
+    parser.add_argument('--llm-deadline', type=float, default=DEFAULT_LLM_DEADLINE, metavar='SECONDS',
+                        help="give up on an LLM call, failing the case, after this long (0: never)")
+    parser.add_argument('--tool-retries', type=int, default=DEFAULT_TOOL_RETRIES,
+                        help="retries of a lookup that failed or timed out")
+    parser.add_argument('--hedge', action='store_true',
+                        help="send a duplicate LLM request when a call is slower than the recent p95")
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument('--record', metavar='PATH',
+                           help="record every LLM request and completion to a JSONL file")
+    recording.add_argument('--replay', metavar='PATH',
+                           help="serve LLM completions from a recording, failing on any unrecorded request")
+    args = parser.parse_args()
+    if args.model and not (args.endpoints or args.base_url):
+        parser.error("--model requires --endpoints or --base-url")
+
+    model = "qwen3:8b" if args.local else "gpt-4"
+    client_kwargs = client_kwargs_for(model)
+    if args.base_url:
+        client_kwargs["base_url"] = args.base_url
+        client_kwargs.setdefault("api_key", os.environ.get("OPENAI_API_KEY", "ollama"))
+    model = args.model or model
+
+    main(
+        args.cases, args.output, model, client_kwargs, args.concurrency,
+        max_concurrency=args.max_concurrency,
+        tool_cache_path=args.tool_cache,
+        record_path=args.record,
+        replay_path=args.replay,
+        trace_path=args.trace,
+        vcf_path=args.vcf,
+        gene_intervals_path=args.gene_intervals,
+        frequency_index_path=args.frequency_index,
+        clinvar_db_path=args.clinvar_db,
+        disease_genes_path=args.disease_genes,
+        prefetch=args.prefetch,
+        endpoints=args.endpoints,
+        tool_deadline=args.tool_deadline or None,
+        llm_deadline=args.llm_deadline or None,
+        tool_retries=args.tool_retries,
+        hedge=args.hedge
+    )
+
+if __name__ == '__main__':
+    main_wrapper()
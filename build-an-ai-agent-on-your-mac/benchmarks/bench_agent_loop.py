@@ -0,0 +1,186 @@
+"""
+Benchmark the agent loop itself, separate from model speed.
+
+Drives four_tools.py's agent turn through the scripted scenarios in
+benchmarks/scenarios.py against a local mock OpenAI-compatible server, so
+no network access or model is needed. Reports per-turn latency percentiles,
+LLM round trips, and the time spent in LLM calls, tools, JSON serialization
+and rendering. --json writes the same numbers for tracking regressions.
+--tool-latency makes every tool call take that long, as a remote database
+would, and --prefetch turns on speculative prefetch of follow-up lookups.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_agent_loop --latency 0.05 --iterations 20 --json agent_loop.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import platform
+import time
+
+import numpy as np
+from openai import AsyncOpenAI, OpenAI
+from rich.console import Console
+
+from agent import run_agent_turn
+from benchmarks.mock_openai_server import MockOpenAIServer
+from benchmarks.scenarios import SCENARIOS
+from four_tools import TOOL_FUNCTIONS, TOOL_SCHEMAS
+from prefetch import Prefetcher
+from streaming import stream_agent_turn
+from util import MAX_TOOL_CONCURRENCY
+
+def percentiles(values):
+    values = np.asarray(values)
+    return {f"p{q}": float(np.percentile(values, q)) for q in (50, 95, 99)}
+
+def fresh_messages(scenario):
+    return [{"role": "user", "content": scenario["prompt"]}]
+
+def with_latency(tool_functions, latency):
+    """Tool functions that each sleep latency seconds first"""
+    def slowed(function):
+        def call(**arguments):
+            time.sleep(latency)
+            return function(**arguments)
+        return call
+    return {name: slowed(function) for name, function in tool_functions.items()}
+
+def run_scenario(name, base_url, iterations, max_concurrency, tool_functions=TOOL_FUNCTIONS, prefetcher=None):
+    """Run one scenario iterations times with the blocking agent loop"""
+    client = OpenAI(base_url=base_url, api_key="mock")
+    console = Console(file=io.StringIO(), width=120)
+    turns = []
+    for _ in range(iterations):
+        messages = fresh_messages(SCENARIOS[name])
+        _, stats = run_agent_turn(
+            messages, client, TOOL_SCHEMAS, tool_functions, name, console, max_concurrency=max_concurrency,
+            prefetcher=prefetcher
+        )
+        turns.append(stats)
+    return turns
+
+def run_scenario_streaming(name, base_url, iterations, max_concurrency, tool_functions=TOOL_FUNCTIONS,
+                           prefetcher=None):
+    """Run one scenario iterations times with the streaming agent loop"""
+    client = AsyncOpenAI(base_url=base_url, api_key="mock")
+    console = Console(file=io.StringIO(), width=120)
+    loop = asyncio.new_event_loop()
+    turns = []
+    try:
+        for _ in range(iterations):
+            messages = fresh_messages(SCENARIOS[name])
+            stats = loop.run_until_complete(stream_agent_turn(
+                messages, client, TOOL_SCHEMAS, tool_functions, name, console, max_concurrency=max_concurrency,
+                prefetcher=prefetcher
+            ))
+            turns.append({
+                "llm_calls": stats["llm_call_count"],
+                "tool_calls": stats["tool_call_count"],
+                "llm_time": sum(timing["total"] for timing in stats["llm_timings"]),
+                "time_to_first_token": stats["time_to_first_token"],
+                "total_time": stats["total"]
+            })
+    finally:
+        loop.run_until_complete(client.close())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+    return turns
+
+def summarize(turns):
+    """Aggregate the per-turn stats of one scenario"""
+    totals = [turn["total_time"] for turn in turns]
+    summary = {
+        "iterations": len(turns),
+        "latency_s": percentiles(totals),
+        "llm_round_trips": turns[0]["llm_calls"],
+        "tool_calls": turns[0]["tool_calls"]
+    }
+    for key in ("llm_time", "tool_wall_time", "tool_summed_time", "serialization_time", "render_time",
+                "time_to_first_token"):
+        if key in turns[0]:
+            summary[f"mean_{key}_s"] = float(np.mean([turn[key] for turn in turns]))
+    # Whatever the turn spent outside LLM calls, tools, serialization and rendering
+    accounted = sum(summary.get(f"mean_{key}_s", 0.0)
+                    for key in ("llm_time", "tool_wall_time", "serialization_time", "render_time"))
+    summary["mean_loop_overhead_s"] = float(np.mean(totals)) - accounted
+    return summary
+
+def report(name, summary):
+    latency = summary["latency_s"]
+    print(
+        f"{name:<20} {latency['p50'] * 1e3:>8.1f} {latency['p95'] * 1e3:>8.1f} {latency['p99'] * 1e3:>8.1f} "
+        f"{summary['llm_round_trips']:>6} {summary['tool_calls']:>6} "
+        f"{summary['mean_llm_time_s'] * 1e3:>8.1f} "
+        f"{summary.get('mean_tool_wall_time_s', 0.0) * 1e3:>8.2f} "
+        f"{summary.get('mean_serialization_time_s', 0.0) * 1e3:>8.3f} "
+        f"{summary.get('mean_render_time_s', 0.0) * 1e3:>8.2f} "
+        f"{summary['mean_loop_overhead_s'] * 1e3:>9.2f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agent loop against a mock OpenAI server")
+    parser.add_argument('--latency', type=float, default=0.0, help="mock model latency per LLM call in seconds")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument('--iterations', type=int, default=20, help="turns per scenario")
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--max-concurrency', type=int, default=MAX_TOOL_CONCURRENCY)
+    parser.add_argument('--stream', action='store_true', help="benchmark the streaming agent loop")
+    parser.add_argument('--tool-latency', type=float, default=0.0, help="seconds every tool call takes")
+    parser.add_argument('--prefetch', action='store_true', help="speculatively prefetch follow-up lookups")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency, token_delay=args.token_delay)
+    base_url = server.start()
+    run = run_scenario_streaming if args.stream else run_scenario
+    tool_functions = with_latency(TOOL_FUNCTIONS, args.tool_latency) if args.tool_latency else TOOL_FUNCTIONS
+
+    mode = "streaming" if args.stream else "blocking"
+    print(f"Agent loop ({mode}), {args.iterations} turn(s) per scenario, mock latency {args.latency * 1e3:.0f} ms, "
+          f"tool latency {args.tool_latency * 1e3:.0f} ms{', prefetch' if args.prefetch else ''}\n")
+    print(
+        f"{'scenario':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'LLM':>6} {'tools':>6} "
+        f"{'LLM ms':>8} {'tool ms':>8} {'json ms':>8} {'rend ms':>8} {'other ms':>9}"
+    )
+
+    results = {}
+    prefetch_summaries = []
+    try:
+        for name in args.scenarios:
+            # One untimed turn warms up imports and lazily built tables
+            run(name, base_url, 1, args.max_concurrency, tool_functions)
+            prefetcher = Prefetcher(tool_functions) if args.prefetch else None
+            results[name] = summarize(run(name, base_url, args.iterations, args.max_concurrency, tool_functions,
+                                          prefetcher))
+            report(name, results[name])
+            if prefetcher is not None:
+                prefetcher.close()
+                results[name]["prefetch"] = dict(prefetcher.stats)
+                prefetch_summaries.append(f"{name}: {prefetcher.summary()}")
+    finally:
+        server.stop()
+    for line in prefetch_summaries:
+        print(line)
+
+    if args.json:
+        output = {
+            "benchmark": "agent_loop",
+            "mode": mode,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "mock_latency_s": args.latency,
+            "token_delay_s": args.token_delay,
+            "max_concurrency": args.max_concurrency,
+            "tool_latency_s": args.tool_latency,
+            "prefetch": args.prefetch,
+            "scenarios": results
+        }
+        with open(args.json, 'w') as handle:
+            json.dump(output, handle, indent=2)
+        print(f"\nWrote {args.json}")
+
+if __name__ == '__main__':
+    main()
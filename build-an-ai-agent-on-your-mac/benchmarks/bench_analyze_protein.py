@@ -0,0 +1,94 @@
+"""
+Benchmark batched protein property computation against the original
+per-sequence analyze_protein, the isoelectric point solver against the
+original count heuristic, and the cumulative-sum hydropathy kernel against
+a per-window sum.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_analyze_protein
+"""
+
+import random
+import time
+
+import numpy as np
+
+from tools.analyze_protein import (
+    aa_weights, aa_charge, hydrophobicity, AMINO_ACIDS, COMPOSITION_COLUMNS,
+    analyze_proteins_batch, hydropathy_profile, isoelectric_points
+)
+
+def analyze_protein_loop(sequence):
+    """The original implementation: four Python passes with dict lookups"""
+    sequence = sequence.upper().strip()
+    mw = sum(aa_weights.get(aa, 0) for aa in sequence)
+    mw -= (len(sequence) - 1) * 18.015
+    aa_composition = {}
+    for aa in sequence:
+        aa_composition[aa] = aa_composition.get(aa, 0) + 1
+    net_charge = sum(aa_charge.get(aa, 0) for aa in sequence)
+    avg_hydrophobicity = sum(hydrophobicity.get(aa, 0) for aa in sequence) / len(sequence) if sequence else 0
+    return mw, net_charge, avg_hydrophobicity, aa_composition
+
+def pI_heuristic(composition):
+    """The original three-way pI estimate, comparing acidic and basic residue counts"""
+    columns = {amino_acid: composition[:, COMPOSITION_COLUMNS.index(amino_acid)] for amino_acid in 'DEKRH'}
+    acidic = columns['D'] + columns['E']
+    basic = columns['K'] + columns['R'] + columns['H']
+    return np.sign(basic - acidic)
+
+def hydropathy_loop(sequence, window):
+    """Sliding-window hydropathy with one Python sum per window"""
+    return [
+        sum(hydrophobicity.get(aa, 0) for aa in sequence[i:i + window]) / window
+        for i in range(len(sequence) - window + 1)
+    ]
+
+def best_of(fn, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    rng = random.Random(0)
+    proteins = [''.join(rng.choices(AMINO_ACIDS, k=rng.randint(50, 1000))) for _ in range(10_000)]
+    residues = sum(len(protein) for protein in proteins)
+
+    # Check the batch path agrees with the original
+    batch = analyze_proteins_batch(proteins)
+    for i in range(0, len(proteins), 997):
+        mw, net_charge, avg_hydrophobicity, _ = analyze_protein_loop(proteins[i])
+        assert np.isclose(batch["molecular_weight_da"][i], mw)
+        assert np.isclose(batch["net_charge"][i], net_charge)
+        assert np.isclose(batch["avg_hydrophobicity"][i], avg_hydrophobicity)
+
+    loop_time = best_of(lambda: [analyze_protein_loop(protein) for protein in proteins], repeats=1)
+    batch_time = best_of(lambda: analyze_proteins_batch(proteins))
+    print(f"Properties of {len(proteins):,} proteins ({residues:,} residues)")
+    print(f"  per-sequence loop: {loop_time * 1000:9.1f} ms  ({residues / loop_time:,.0f} residues/s)")
+    print(f"  batch:             {batch_time * 1000:9.1f} ms  ({residues / batch_time:,.0f} residues/s)")
+    print(f"  speedup:           {loop_time / batch_time:9.1f}x")
+
+    composition = batch["composition"]
+    heuristic_time = best_of(lambda: pI_heuristic(composition))
+    solver_time = best_of(lambda: isoelectric_points(composition))
+    print(f"Isoelectric point of {len(proteins):,} proteins")
+    print(f"  count heuristic:   {heuristic_time * 1000:9.1f} ms")
+    print(f"  bisection solver:  {solver_time * 1000:9.1f} ms  ({batch['isoelectric_point_iterations']} iterations, "
+          f"{batch['isoelectric_point_seconds'] * 1e6 / len(proteins):.2f} us/protein in the batch)")
+
+    protein = ''.join(rng.choices(AMINO_ACIDS, k=30_000))
+    window = 19
+    assert np.allclose(hydropathy_profile(protein, window), hydropathy_loop(protein, window))
+    loop_time = best_of(lambda: hydropathy_loop(protein, window), repeats=1)
+    cumsum_time = best_of(lambda: hydropathy_profile(protein, window))
+    print(f"Hydropathy profile, {len(protein):,} residues, window {window}")
+    print(f"  per-window sum:    {loop_time * 1000:9.1f} ms")
+    print(f"  cumulative sum:    {cumsum_time * 1000:9.1f} ms")
+    print(f"  speedup:           {loop_time / cumsum_time:9.1f}x")
+
+if __name__ == '__main__':
+    main()
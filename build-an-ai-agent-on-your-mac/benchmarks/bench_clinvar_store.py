@@ -0,0 +1,134 @@
+"""
+Benchmark the SQLite ClinVar store.
+
+Writes a synthetic variant_summary.txt.gz with rows for both assemblies, as
+the real file has, then measures how fast load_clinvar ingests it and the
+latency of single and batched lookups, from one thread and from several.
+A full release has about 7 million rows, so the load rate says how long one
+takes.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_clinvar_store --rows 1000000
+"""
+
+import argparse
+import gzip
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.clinvar_store import ClinVarStore, load_clinvar
+
+# Rows in a recent variant_summary.txt.gz (both assemblies)
+FULL_RELEASE_ROWS = 7_000_000
+
+HEADER = [
+    "#AlleleID", "Type", "Name", "GeneID", "GeneSymbol", "HGNC_ID", "ClinicalSignificance", "ClinSigSimple",
+    "LastEvaluated", "RS# (dbSNP)", "nsv/esv (dbVar)", "RCVaccession", "PhenotypeIDS", "PhenotypeList", "Origin",
+    "OriginSimple", "Assembly", "ChromosomeAccession", "Chromosome", "Start", "Stop", "ReferenceAllele",
+    "AlternateAllele", "Cytogenetic", "ReviewStatus", "NumberSubmitters", "Guidelines", "TestedInGTR", "OtherIDs",
+    "SubmitterCategories", "VariationID", "PositionVCF", "ReferenceAlleleVCF", "AlternateAlleleVCF"
+]
+
+SIGNIFICANCES = ["Pathogenic", "Likely pathogenic", "Uncertain significance", "Likely benign", "Benign",
+                 "Conflicting classifications of pathogenicity"]
+REVIEW_STATUSES = ["criteria provided, single submitter", "criteria provided, multiple submitters, no conflicts",
+                   "reviewed by expert panel", "no assertion criteria provided"]
+
+def write_variant_summary(path, rows):
+    """Write rows lines of synthetic variant_summary, alternating GRCh37 and GRCh38; returns GRCh38 ids"""
+    variant_ids = []
+    with gzip.open(path, 'wt', compresslevel=1) as handle:
+        handle.write('\t'.join(HEADER) + '\n')
+        lines = []
+        for i in range(rows):
+            chrom = str(random.randint(1, 22))
+            pos = random.randint(1, 200_000_000)
+            ref, alt = random.sample('ACGT', 2)
+            assembly = 'GRCh38' if i % 2 else 'GRCh37'
+            if assembly == 'GRCh38':
+                variant_ids.append(f"chr{chrom}:{pos}:{ref}:{alt}")
+            row = dict.fromkeys(HEADER, '-')
+            row.update({
+                "#AlleleID": str(i), "Type": "single nucleotide variant", "GeneSymbol": f"GENE{i % 20000}",
+                "ClinicalSignificance": random.choice(SIGNIFICANCES), "PhenotypeList": "Disease A|Disease B",
+                "Assembly": assembly, "Chromosome": chrom, "Start": str(pos), "Stop": str(pos),
+                "ReviewStatus": random.choice(REVIEW_STATUSES), "VariationID": str(i),
+                "PositionVCF": str(pos), "ReferenceAlleleVCF": ref, "AlternateAlleleVCF": alt
+            })
+            lines.append('\t'.join(row[column] for column in HEADER) + '\n')
+            if len(lines) == 10_000:
+                handle.write(''.join(lines))
+                lines = []
+        handle.write(''.join(lines))
+    return variant_ids
+
+def single_lookups(store, variants):
+    """Per-lookup latencies in seconds"""
+    latencies = []
+    for variant in variants:
+        start = time.perf_counter()
+        store.lookup(variant)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite ClinVar store")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="rows of synthetic variant_summary")
+    parser.add_argument('--lookups', type=int, default=20_000, help="single lookups to time")
+    parser.add_argument('--batch', type=int, default=100, help="variants per batched lookup")
+    parser.add_argument('--threads', type=int, default=4, help="threads for the concurrent measurement")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "variant_summary.txt.gz")
+        db_path = os.path.join(directory, "clinvar.sqlite")
+        present = write_variant_summary(source, args.rows)
+
+        # Load
+        start = time.perf_counter()
+        rows, stored = load_clinvar(source, db_path)
+        load = time.perf_counter() - start
+        rate = args.rows / load
+        print(f"Load: {args.rows:,} rows ({rows:,} GRCh38) into {stored:,} variants in {load:.1f}s "
+              f"({rate:,.0f} rows/s, {os.path.getsize(db_path) / 1e6:.0f} MB); "
+              f"a full release of ~{FULL_RELEASE_ROWS / 1e6:.0f}M rows takes ~{FULL_RELEASE_ROWS / rate / 60:.1f} min")
+
+        store = ClinVarStore(db_path)
+        sample = random.choices(present, k=args.lookups)
+        absent = [f"chr{random.randint(1, 22)}:{random.randint(1, 200_000_000)}:A:T" for _ in range(args.lookups)]
+
+        # Single lookups
+        store.lookup(sample[0])
+        for name, variants in (("present", sample), ("absent", absent)):
+            latencies = sorted(single_lookups(store, variants))
+            p99 = latencies[int(len(latencies) * 0.99)]
+            print(f"Single lookup ({name}): p50 {statistics.median(latencies) * 1e6:.1f} µs, "
+                  f"p99 {p99 * 1e6:.1f} µs")
+
+        # Batched lookups, one query per batch
+        batches = [sample[i:i + args.batch] for i in range(0, len(sample), args.batch)]
+        start = time.perf_counter()
+        found = sum(len(store.lookup_many(batch)) for batch in batches)
+        batched = time.perf_counter() - start
+        print(f"Batched lookup: {len(batches):,} queries of {args.batch} variants, "
+              f"{batched / len(batches) * 1e3:.2f} ms/query ({batched / len(sample) * 1e6:.1f} µs/variant, "
+              f"{found:,} found)")
+
+        # Concurrent single lookups, each thread on its own connection
+        chunks = [sample[i::args.threads] for i in range(args.threads)]
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            start = time.perf_counter()
+            list(executor.map(lambda chunk: single_lookups(store, chunk), chunks))
+            concurrent = time.perf_counter() - start
+        print(f"Concurrent lookup ({args.threads} threads): {len(sample) / concurrent:,.0f} lookups/s")
+        store.close()
+
+if __name__ == '__main__':
+    main()
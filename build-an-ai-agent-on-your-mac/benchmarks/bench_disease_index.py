@@ -0,0 +1,109 @@
+"""
+Benchmark the disease name index behind search_disease_genes.
+
+Writes a synthetic disease-gene association file about the size of the HPO
+and OMIM disease vocabularies, then measures how long the index takes to
+build, to load from its pickle, and to answer exact, multi-word, prefix and
+misspelled queries.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_disease_index --diseases 20000
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from tools.disease_index import INDEX_SUFFIX, DiseaseIndex
+
+SUFFIXES = ['syndrome', 'disease', 'deficiency', 'dysplasia', 'encephalopathy', 'type 1', 'type 2', 'familial']
+
+def random_word(rng):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12)))
+
+def write_associations(path, diseases, rng):
+    """Write a disease, genes, synonyms TSV; returns the disease names"""
+    # A Zipf-like vocabulary, so some words appear in many names as in real ontologies
+    words = [random_word(rng) for _ in range(diseases)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    names = []
+    with open(path, 'w') as handle:
+        handle.write("disease\tgenes\tsynonyms\n")
+        for i in range(diseases):
+            name = ' '.join(rng.choices(words, cum_weights=weights, k=rng.randint(1, 4)) + [rng.choice(SUFFIXES)])
+            synonyms = [' '.join(rng.choices(words, cum_weights=weights, k=rng.randint(1, 5))) for _ in range(rng.randint(0, 3))]
+            genes = [f"GENE{rng.randint(1, 20000)}" for _ in range(rng.randint(1, 6))]
+            handle.write(f"{name}\t{','.join(genes)}\t{'|'.join(synonyms)}\n")
+            names.append(name)
+    return names
+
+def misspell(name, rng):
+    """name with one letter of its longest word replaced"""
+    words = name.split()
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[longest]
+    position = rng.randrange(len(word))
+    words[longest] = word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+    return ' '.join(words)
+
+def time_queries(index, queries):
+    """(p50, p99) query latency in seconds"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the disease name index")
+    parser.add_argument('--diseases', type=int, default=20_000, help="diseases in the synthetic association file")
+    parser.add_argument('--queries', type=int, default=2000, help="queries per query kind")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "disease_genes.tsv")
+        names = write_associations(path, args.diseases, rng)
+
+        start = time.perf_counter()
+        index = DiseaseIndex.build(path)
+        build = time.perf_counter() - start
+        index.save(path + INDEX_SUFFIX)
+        print(f"Build: {len(index):,} diseases, {len(index.documents):,} names, {len(index.vocabulary):,} words "
+              f"in {build * 1e3:.0f} ms")
+
+        start = time.perf_counter()
+        index = DiseaseIndex.open(path)
+        load = time.perf_counter() - start
+        print(f"Load from pickle: {load * 1e3:.0f} ms ({os.path.getsize(path + INDEX_SUFFIX) / 1e6:.1f} MB), "
+              f"{build / load:.1f}x faster than rebuilding")
+
+        sample = rng.choices(names, k=args.queries)
+        kinds = {
+            "exact name": sample,
+            "first word": [name.split()[0] for name in sample],
+            "prefix": [name.split()[0][:4] for name in sample],
+            "misspelled": [misspell(name, rng) for name in sample]
+        }
+        for kind, queries in kinds.items():
+            hits = sum(bool(index.search(query)) for query in queries[:200])
+            p50, p99 = time_queries(index, queries)
+            print(f"{kind:>12}: p50 {p50 * 1e6:7.1f} µs, p99 {p99 * 1e6:7.1f} µs ({hits}/200 with results)")
+
+        found = 0
+        for name in sample[:500]:
+            matches = index.search(misspell(name, rng))
+            found += bool(matches) and matches[0]["disease"] == name
+        print(f"Misspelled names ranking their disease first: {found}/500")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the vectorized six-frame ORF finder against a codon-by-codon loop,
+then stream a chromosome-scale FASTA file through the find_orfs tool,
+reporting throughput in bases per second.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_find_orfs --chromosome-length 50000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from tools.find_orfs import find_orfs, iter_orfs
+from tools.translate_dna import codon_table
+
+def find_orfs_loop(sequence, min_length):
+    """Six-frame ORFs with one dict lookup per codon in a Python loop"""
+    complement = str.maketrans('ACGT', 'TGCA')
+    reverse = sequence.translate(complement)[::-1]
+    orfs = set()
+    for strand, dna in (('+', sequence), ('-', reverse)):
+        for offset in range(3):
+            start = None
+            for i in range(offset, len(dna) - 2, 3):
+                amino_acid = codon_table.get(dna[i:i+3], 'X')
+                if amino_acid in '*X':
+                    if amino_acid == '*' and start is not None and (i - start) // 3 >= min_length:
+                        protein = ''.join(codon_table[dna[j:j+3]] for j in range(start, i, 3))
+                        # 1-based forward strand coordinates, stop codon included
+                        if strand == '+':
+                            orfs.add((strand, start + 1, i + 3, protein))
+                        else:
+                            orfs.add((strand, len(dna) - i - 2, len(dna) - start, protein))
+                    start = None
+                elif amino_acid == 'M' and start is None:
+                    start = i
+    return orfs
+
+def as_set(orfs):
+    return {(orf["strand"], orf["start"], orf["end"], orf["protein"]) for orf in orfs}
+
+def random_dna(length, rng, n_runs=0):
+    """Random DNA, with n_runs runs of N like the gaps of an assembly"""
+    dna = bytearray(rng.choices(b'ACGT', k=length))
+    for _ in range(n_runs):
+        start = rng.randrange(length)
+        end = min(start + rng.randrange(100, 10_000), length)
+        dna[start:end] = b'N' * (end - start)
+    return dna.decode('ascii')
+
+def best_of(fn, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark six-frame ORF finding")
+    parser.add_argument('--length', type=int, default=1_000_000, help="bases compared against the loop")
+    parser.add_argument('--chromosome-length', type=int, default=50_000_000, help="bases in the streamed FASTA file")
+    parser.add_argument('--min-length', type=int, default=30, help="minimum ORF length in amino acids")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    # Same ORFs as the loop, in memory and streamed in small chunks across chunk boundaries
+    sequence = random_dna(args.length, rng, n_runs=5)
+    expected = find_orfs_loop(sequence, args.min_length)
+    chunks = [sequence[i:i + 4_099].encode() for i in range(0, len(sequence), 4_099)]
+    assert as_set(iter_orfs([sequence.encode()], args.min_length)) == expected
+    assert as_set(iter_orfs(chunks, args.min_length)) == expected
+    loop_time = best_of(lambda: find_orfs_loop(sequence, args.min_length), repeats=1)
+    vector_time = best_of(lambda: list(iter_orfs([sequence.encode()], args.min_length)))
+    print(f"{len(expected):,} ORF(s) of at least {args.min_length} aa in {args.length:,} bp, same as the loop")
+    print(f"{'loop':<10} {args.length / loop_time:>14,.0f} bases/s")
+    print(f"{'numpy':<10} {args.length / vector_time:>14,.0f} bases/s  {loop_time / vector_time:.1f}x")
+
+    # A chromosome-sized FASTA file, streamed through the tool
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "chromosome.fa")
+        with open(path, 'w') as f:
+            f.write(">chr_bench\n")
+            for i in range(0, args.chromosome_length, 10_000_000):
+                block = random_dna(min(10_000_000, args.chromosome_length - i), rng, n_runs=20)
+                f.write('\n'.join(block[j:j + 60] for j in range(0, len(block), 60)) + '\n')
+        start = time.perf_counter()
+        result = find_orfs(path=path, analyze=True)
+        elapsed = time.perf_counter() - start
+    print(f"\nfind_orfs on a {result['sequence_length']:,} bp FASTA file: {elapsed:.2f}s, "
+          f"{result['sequence_length'] / elapsed:,.0f} bases/s, {result['orf_count']:,} ORF(s) of at least "
+          f"{result['min_length']} aa, longest {result['orfs'][0]['length'] if result['orfs'] else 0} aa")
+
+if __name__ == '__main__':
+    main()
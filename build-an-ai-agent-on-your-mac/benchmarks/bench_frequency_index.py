@@ -0,0 +1,150 @@
+"""
+Benchmark the memory-mapped population frequency index.
+
+Builds a synthetic index of random SNVs, then measures how long it takes to
+open, the latency of single and batched lookups, and how much resident
+memory each step adds, next to the Python dictionary the tool used before.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_frequency_index --variants 10000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from tools.frequency_index import FrequencyIndex, build_frequency_index, save_index
+
+BASES = 'ACGT'
+
+def rss_mb():
+    """Resident set size of this process in MB (Linux only, else None)"""
+    try:
+        with open('/proc/self/status') as handle:
+            for line in handle:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+def random_snvs(count, rng):
+    """Random SNV keys (encoded as in tools.frequency_index) and frequencies"""
+    chroms = rng.integers(1, 23, count, dtype=np.uint64)
+    positions = rng.integers(1, 200_000_000, count, dtype=np.uint64)
+    refs = rng.integers(0, 4, count, dtype=np.uint64)
+    alts = (refs + rng.integers(1, 4, count, dtype=np.uint64)) % 4
+    # Ref length 1 at bit 25, then the leading 1 bit and two 2-bit bases
+    alleles = (np.uint64(1) << np.uint64(25)) | (np.uint64(1) << np.uint64(4)) | (refs << np.uint64(2)) | alts
+    keys = (chroms << np.uint64(59)) | (positions << np.uint64(31)) | alleles
+    frequencies = rng.random(count, dtype=np.float32) ** 4
+    return keys, frequencies
+
+def decode_snv(key):
+    """chrom:pos:ref:alt id of a key made by random_snvs"""
+    key = int(key)
+    chrom = key >> 59
+    pos = (key >> 31) & ((1 << 28) - 1)
+    ref, alt = (key >> 2) & 3, key & 3
+    return f"chr{chrom}:{pos}:{BASES[ref]}:{BASES[alt]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory-mapped population frequency index")
+    parser.add_argument('--variants', type=int, default=10_000_000, help="variants in the synthetic index")
+    parser.add_argument('--dict-variants', type=int, default=1_000_000,
+                        help="variants in the Python dictionary used for comparison")
+    parser.add_argument('--lookups', type=int, default=20_000, help="single lookups to time")
+    parser.add_argument('--batch', type=int, default=100_000, help="variants per batched lookup")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        prefix = os.path.join(directory, "af")
+
+        # Build
+        keys, frequencies = random_snvs(args.variants, rng)
+        start = time.perf_counter()
+        indexed = save_index(prefix, keys, frequencies)
+        build = time.perf_counter() - start
+        size = os.path.getsize(prefix + '.keys.npy') + os.path.getsize(prefix + '.freqs.npy')
+        print(f"Index: {indexed:,} variants, {size / 1e6:.1f} MB on disk ({size / indexed:.0f} bytes/variant), "
+              f"sorted and saved in {build:.2f}s")
+
+        sample = [decode_snv(key) for key in keys[rng.integers(0, args.variants, args.lookups)]]
+        absent = [f"chr{random.randint(1, 22)}:{random.randint(1, 200_000_000)}:A:T" for _ in range(args.lookups)]
+        del keys, frequencies
+
+        # Open
+        before = rss_mb()
+        start = time.perf_counter()
+        index = FrequencyIndex.open(prefix)
+        opened = time.perf_counter() - start
+        after_open = rss_mb()
+        print(f"Open: {opened * 1e3:.2f} ms")
+
+        # A few lookups touch only a few pages of the index
+        for variant in absent[:1000]:
+            index.lookup(variant)
+        after_few = rss_mb()
+
+        # Single lookups
+        start = time.perf_counter()
+        hits = sum(index.lookup(variant) is not None for variant in sample)
+        present = (time.perf_counter() - start) / len(sample)
+        start = time.perf_counter()
+        for variant in absent:
+            index.lookup(variant)
+        missing = (time.perf_counter() - start) / len(absent)
+        after_lookups = rss_mb()
+        print(f"Single lookup: {present * 1e6:.1f} µs present ({hits}/{len(sample)} found), "
+              f"{missing * 1e6:.1f} µs absent")
+
+        # Batched lookups
+        batch = (sample * (args.batch // len(sample) + 1))[:args.batch]
+        start = time.perf_counter()
+        found = index.lookup_many(batch)
+        batched = time.perf_counter() - start
+        print(f"Batched lookup: {len(batch):,} variants in {batched * 1e3:.1f} ms "
+              f"({batched / len(batch) * 1e6:.2f} µs/variant, {np.count_nonzero(~np.isnan(found)):,} found)")
+
+        if before is not None:
+            print(f"RSS: +{after_open - before:.1f} MB after open, +{after_few - before:.1f} MB after 1,000 lookups, "
+                  f"+{after_lookups - before:.1f} MB after {2 * args.lookups + 1000:,} lookups "
+                  f"(the index is {size / 1e6:.1f} MB)")
+
+        # Text build path, for rows/s
+        tsv = os.path.join(directory, "af.tsv")
+        rows, _ = random_snvs(min(args.variants, 200_000), rng)
+        with open(tsv, 'w') as handle:
+            for key in rows:
+                chrom, pos, ref, alt = decode_snv(key).split(':')
+                handle.write(f"{chrom}\t{pos}\t{ref}\t{alt}\t{random.random():.6g}\n")
+        start = time.perf_counter()
+        built, _ = build_frequency_index(tsv, os.path.join(directory, "tsv"))
+        print(f"Build from TSV: {built:,} rows in {time.perf_counter() - start:.2f}s")
+
+    # The previous approach: a Python dictionary of variant id strings
+    before = rss_mb()
+    start = time.perf_counter()
+    table = {
+        f"chr{random.randint(1, 22)}:{random.randint(1, 200_000_000)}:A:T": random.random()
+        for _ in range(args.dict_variants)
+    }
+    built = time.perf_counter() - start
+    after = rss_mb()
+    start = time.perf_counter()
+    for variant in sample:
+        table.get(variant, 0.0)
+    dict_lookup = (time.perf_counter() - start) / len(sample)
+    memory = f", {(after - before) * 1e6 / len(table):.0f} bytes/variant in RAM" if before is not None else ""
+    print(f"Python dict: {len(table):,} variants built in {built:.2f}s{memory}, "
+          f"{dict_lookup * 1e6:.2f} µs/lookup")
+
+if __name__ == '__main__':
+    main()
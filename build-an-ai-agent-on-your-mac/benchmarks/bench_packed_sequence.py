@@ -0,0 +1,105 @@
+"""
+Benchmark the 2-bit packed sequence against Python strings: memory held and
+peak memory while preparing a sequence, and throughput of reverse
+complement, k-mer counting and codon usage, in bases per second.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_packed_sequence --length 10000000
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from tools.packed_sequence import PackedSequence, kmer_string
+from tools.translate_dna import codon_index, codon_table
+
+COMPLEMENT = str.maketrans('ACGTN', 'TGCAN')
+
+def reverse_complement_str(sequence):
+    return sequence.translate(COMPLEMENT)[::-1]
+
+def kmer_counts_str(sequence, k):
+    """k-mers without N, one slice per window"""
+    return Counter(kmer for kmer in (sequence[i:i+k] for i in range(len(sequence) - k + 1)) if 'N' not in kmer)
+
+def codon_counts_str(sequence):
+    return Counter(codon for codon in (sequence[i:i+3] for i in range(0, len(sequence) - 2, 3)) if 'N' not in codon)
+
+def random_dna(length, rng, n_runs):
+    """Random DNA with n_runs runs of N like the gaps of an assembly"""
+    dna = bytearray(rng.choices(b'ACGT', k=length))
+    for _ in range(n_runs):
+        start = rng.randrange(length)
+        end = min(start + rng.randrange(100, 10_000), length)
+        dna[start:end] = b'N' * (end - start)
+    return dna.decode('ascii')
+
+def peak_memory(fn):
+    """(result, peak bytes allocated while running fn)"""
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+def best_of(fn, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def report(label, bases, str_time, packed_time):
+    print(f"{label:<30} {bases / str_time:>14,.0f} {bases / packed_time:>16,.0f} {str_time / packed_time:>8.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark 2-bit packed sequences against strings")
+    parser.add_argument('--length', type=int, default=10_000_000, help="bases in the benchmark sequence")
+    parser.add_argument('--k', type=int, default=6)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    sequence = random_dna(args.length, rng, n_runs=args.length // 100_000)
+    lowercase = sequence.lower()
+    packed = PackedSequence.from_dna(sequence)
+
+    # Memory: what each form holds, and the peak while turning lowercase input into it
+    # (translate_dna cleans and uppercases, copying the string each time)
+    _, str_peak = peak_memory(lambda: lowercase.replace(" ", "").replace("\n", "").upper())
+    _, packed_peak = peak_memory(lambda: PackedSequence.from_dna(lowercase))
+    print(f"{args.length:,} bp with {packed.masked_bases:,} N in {len(packed.mask_starts)} run(s)")
+    print(f"{'':<30} {'str':>14} {'packed':>16}")
+    print(f"{'bytes held':<30} {sys.getsizeof(sequence):>14,} {packed.nbytes:>16,}")
+    print(f"{'peak bytes while preparing':<30} {str_peak:>14,} {packed_peak:>16,}")
+
+    # Same answers both ways
+    assert str(packed) == sequence
+    assert str(packed.reverse_complement()) == reverse_complement_str(sequence)
+    sample = sequence[:1_000_000]
+    packed_sample = PackedSequence.from_dna(sample)
+    hashes, counts = packed_sample.kmer_counts(args.k)
+    assert {kmer_string(int(h), args.k): int(c) for h, c in zip(hashes, counts)} == kmer_counts_str(sample, args.k)
+    codon_counts = packed_sample.codon_counts()
+    assert {codon: int(codon_counts[codon_index(codon)]) for codon in codon_table
+            if codon_counts[codon_index(codon)]} == codon_counts_str(sample)
+
+    print(f"\n{'workload':<30} {'str bases/s':>14} {'packed bases/s':>16} {'speedup':>9}")
+    report("pack / copy", args.length, best_of(lambda: lowercase.upper()),
+           best_of(lambda: PackedSequence.from_dna(lowercase)))
+    report("reverse complement", args.length, best_of(lambda: reverse_complement_str(sequence)),
+           best_of(packed.reverse_complement))
+    report(f"{args.k}-mer counts (1 Mb)", len(sample), best_of(lambda: kmer_counts_str(sample, args.k), repeats=1),
+           best_of(lambda: packed_sample.kmer_counts(args.k)))
+    report("codon usage (1 Mb)", len(sample), best_of(lambda: codon_counts_str(sample), repeats=1),
+           best_of(packed_sample.codon_counts))
+    for k, canonical in ((args.k, False), (21, True)):
+        label = f"{k}-mer counts{', canonical' if canonical else ''}"
+        seconds = best_of(lambda: packed.kmer_counts(k, canonical), repeats=1)
+        print(f"{label + f' ({args.length / 1e6:g} Mb)':<30} {'':>14} {args.length / seconds:>16,.0f}")
+
+if __name__ == '__main__':
+    main()
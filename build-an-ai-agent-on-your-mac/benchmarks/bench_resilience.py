@@ -0,0 +1,142 @@
+"""
+Benchmark deadlines, retries and hedged LLM requests.
+
+Runs scripted turns against a mock server where a fraction of responses are
+slow (--slow-fraction, --slow-latency), with and without hedging, and
+reports per-turn latency percentiles. Hedging is then compared on servers
+that answer one request at a time, as a busy model server does: with one
+server the duplicate queues behind the slow request and never wins, while a
+Router over two sends it to the other server, where it usually does. It then runs the same turns with tools
+that sometimes raise (--tool-failure-rate) or hang (--tool-hang-rate), with
+and without retries, and reports how many turns got every lookup answered.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_resilience --turns 100
+"""
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+
+import numpy as np
+from rich.console import Console
+
+from agent import run_agent_turn
+from benchmarks.mock_openai_server import MockOpenAIServer
+from benchmarks.scenarios import SCENARIOS
+from clients import make_client
+from four_tools import TOOL_FUNCTIONS, TOOL_SCHEMAS
+from resilience import HEDGE_MIN_SAMPLES, Resilience
+from router import Router
+
+def unreliable(tool_functions, failure_rate, hang_rate, hang_time, seed=0):
+    """Tool functions that sometimes raise, and sometimes hang for hang_time seconds first"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def wrap(function):
+        def call(**arguments):
+            with lock:
+                draw = rng.random()
+            if draw < failure_rate:
+                raise ConnectionError("simulated database error")
+            if draw < failure_rate + hang_rate:
+                time.sleep(hang_time)
+            return function(**arguments)
+        return call
+    return {name: wrap(function) for name, function in tool_functions.items()}
+
+def run_turns(client, scenario, turns, resilience, tool_functions=TOOL_FUNCTIONS):
+    """Run turns one after another; returns (latencies, turns with a failed lookup, failed turns)"""
+    console = Console(file=io.StringIO())
+    latencies = []
+    failed_lookups = 0
+    failed_turns = 0
+    for _ in range(turns):
+        messages = [{"role": "user", "content": SCENARIOS[scenario]["prompt"]}]
+        start = time.perf_counter()
+        try:
+            run_agent_turn(messages, client, TOOL_SCHEMAS, tool_functions, scenario, console,
+                           resilience=resilience)
+        except Exception:
+            failed_turns += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        results = [json.loads(message["content"]) for message in messages
+                   if isinstance(message, dict) and message["role"] == "tool"]
+        failed_lookups += any("failed after" in result.get("error", "") for result in results)
+    return latencies, failed_lookups, failed_turns
+
+def report(label, latencies, resilience):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+    print(f"{label:<24} p50 {p50:7.1f} ms, p95 {p95:7.1f} ms, p99 {p99:7.1f} ms")
+    print(f"{'':<24} {resilience.summary()}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deadlines, retries and hedged LLM requests")
+    parser.add_argument('--turns', type=int, default=100)
+    parser.add_argument('--scenario', default="epilepsy_batch", choices=list(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.05, help="usual mock model latency in seconds")
+    parser.add_argument('--slow-fraction', type=float, default=0.05, help="fraction of slow LLM responses")
+    parser.add_argument('--slow-latency', type=float, default=1.0, help="seconds before a slow LLM response")
+    parser.add_argument('--tool-failure-rate', type=float, default=0.05, help="fraction of tool calls that raise")
+    parser.add_argument('--tool-hang-rate', type=float, default=0.02, help="fraction of tool calls that hang")
+    parser.add_argument('--tool-deadline', type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{args.turns} turn(s) of {args.scenario}; LLM latency {args.latency * 1e3:.0f} ms, "
+          f"{args.slow_fraction:.0%} of responses {args.slow_latency * 1e3:.0f} ms\n")
+    for label, hedge in (("no hedging", False), ("hedged after p95", True)):
+        # A fresh server each time, so both runs see the same slow responses
+        server = MockOpenAIServer(latency=args.latency, slow_fraction=args.slow_fraction,
+                                  slow_latency=args.slow_latency)
+        client = make_client({"base_url": server.start(), "api_key": "mock"})
+        resilience = Resilience(hedge=hedge)
+        try:
+            # Untimed turns give the hedge threshold its latency samples
+            run_turns(client, args.scenario, HEDGE_MIN_SAMPLES, resilience)
+            latencies, _, _ = run_turns(client, args.scenario, args.turns, resilience)
+        finally:
+            server.stop()
+        report(label, latencies, resilience)
+
+    print("\nServers answering one request at a time, hedged after p95")
+    for label, server_count in (("one server", 1), ("router over two", 2)):
+        servers = [MockOpenAIServer(latency=args.latency, slow_fraction=args.slow_fraction,
+                                    slow_latency=args.slow_latency, max_parallel=1, seed=seed)
+                   for seed in range(server_count)]
+        urls = [server.start() for server in servers]
+        client = make_client({"base_url": urls[0], "api_key": "mock"}) if server_count == 1 else Router(urls, "mock")
+        resilience = Resilience(hedge=True)
+        try:
+            run_turns(client, args.scenario, HEDGE_MIN_SAMPLES, resilience)
+            latencies, _, _ = run_turns(client, args.scenario, args.turns, resilience)
+        finally:
+            if server_count > 1:
+                client.close()
+            for server in servers:
+                server.stop()
+        report(label, latencies, resilience)
+
+    print(f"\nTools: {args.tool_failure_rate:.0%} raise, {args.tool_hang_rate:.0%} hang; "
+          f"tool deadline {args.tool_deadline:g}s")
+    server = MockOpenAIServer(latency=args.latency)
+    client = make_client({"base_url": server.start(), "api_key": "mock"})
+    try:
+        for label, retries in (("no retries", 0), ("2 retries with backoff", 2)):
+            tool_functions = unreliable(TOOL_FUNCTIONS, args.tool_failure_rate, args.tool_hang_rate,
+                                        args.tool_deadline * 4)
+            resilience = Resilience(tool_deadline=args.tool_deadline, tool_retries=retries)
+            latencies, failed_lookups, failed_turns = run_turns(client, args.scenario, args.turns, resilience,
+                                                                tool_functions)
+            report(label, latencies, resilience)
+            print(f"{'':<24} {args.turns - failed_lookups - failed_turns}/{args.turns} turn(s) with every lookup "
+                  f"answered, {failed_turns} failed turn(s)")
+    finally:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
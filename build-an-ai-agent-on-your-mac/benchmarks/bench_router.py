@@ -0,0 +1,97 @@
+"""
+Benchmark routing LLM calls across several model servers.
+
+Starts several local mock servers, each answering only --max-parallel
+requests at a time as Ollama does with OLLAMA_NUM_PARALLEL, and runs a batch
+of scripted cases concurrently three ways: against a single server, through a
+Router over all of them, and through a Router while one server is killed
+partway through. Reports cases per minute, how many LLM calls stayed on their
+conversation's backend, and the router's per-backend queue depth and latency.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_router --servers 3 --cases 24 --concurrency 12
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batch import run_case
+from benchmarks.mock_openai_server import MockOpenAIServer
+from benchmarks.scenarios import SCENARIOS
+from clients import make_client
+from router import Router
+
+def start_servers(count, latency, max_parallel):
+    servers = [MockOpenAIServer(latency=latency, max_parallel=max_parallel) for _ in range(count)]
+    return servers, [server.start() for server in servers]
+
+def run_cases(client, scenario, cases, concurrency):
+    """Run the cases concurrently; returns (seconds, failed case count)"""
+    prompt = SCENARIOS[scenario]["prompt"]
+    # Every case is its own conversation
+    cases = [{"id": i, "prompt": f"{prompt} (case {i})"} for i in range(cases)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda case: run_case(case, client, scenario, 1, None, None, None), cases))
+    return time.perf_counter() - start, sum("error" in result for result in results)
+
+def report(label, cases, elapsed, failed, servers):
+    requests = ', '.join(str(server.requests) for server in servers)
+    print(f"{label:<28} {elapsed:6.2f}s {cases / elapsed * 60:8.1f} cases/min, {failed} failed, "
+          f"LLM calls per server: {requests}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load-balanced routing across mock model servers")
+    parser.add_argument('--servers', type=int, default=3, help="mock model servers")
+    parser.add_argument('--max-parallel', type=int, default=2, help="requests each server answers at once")
+    parser.add_argument('--latency', type=float, default=0.2, help="mock model latency per LLM call in seconds")
+    parser.add_argument('--cases', type=int, default=24)
+    parser.add_argument('--concurrency', type=int, default=12, help="cases run at once")
+    parser.add_argument('--kill-after', type=float, default=1.0,
+                        help="seconds into the failover run at which the first server is killed")
+    parser.add_argument('--scenario', default="epilepsy_sequential", choices=list(SCENARIOS))
+    args = parser.parse_args()
+
+    print(f"{args.cases} case(s) of {args.scenario}, {args.concurrency} at once; {args.servers} server(s) answering "
+          f"{args.max_parallel} request(s) at a time with {args.latency * 1e3:.0f} ms latency\n")
+
+    servers, urls = start_servers(args.servers, args.latency, args.max_parallel)
+    try:
+        client = make_client({"base_url": urls[0], "api_key": "mock"})
+        elapsed, failed = run_cases(client, args.scenario, args.cases, args.concurrency)
+        report("single endpoint", args.cases, elapsed, failed, servers)
+    finally:
+        for server in servers:
+            server.stop()
+
+    servers, urls = start_servers(args.servers, args.latency, args.max_parallel)
+    router = Router(urls, "mock")
+    try:
+        elapsed, failed = run_cases(router, args.scenario, args.cases, args.concurrency)
+        report("router", args.cases, elapsed, failed, servers)
+        routed = router.summary()
+    finally:
+        router.close()
+        for server in servers:
+            server.stop()
+
+    servers, urls = start_servers(args.servers, args.latency, args.max_parallel)
+    router = Router(urls, "mock")
+    killer = threading.Timer(args.kill_after, servers[0].kill)
+    try:
+        killer.start()
+        elapsed, failed = run_cases(router, args.scenario, args.cases, args.concurrency)
+        report("router, server 1 killed", args.cases, elapsed, failed, servers)
+        failed_over = router.summary()
+    finally:
+        killer.cancel()
+        router.close()
+        for server in servers[1:]:
+            server.stop()
+
+    print(f"\nRouter:\n{routed}\n\nRouter with server 1 killed after {args.kill_after:.1f}s:\n{failed_over}")
+
+if __name__ == '__main__':
+    main()
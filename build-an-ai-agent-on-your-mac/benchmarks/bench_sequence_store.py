@@ -0,0 +1,87 @@
+"""
+Benchmark the prompt size of a translate-then-analyze conversation with
+sequences passed inline vs. through the local sequence store.
+
+For each DNA length, the user pastes a coding sequence, the model calls
+translate_dna and then analyze_protein on the protein, and answers. The
+conversation is replayed with the real tools, once with every sequence in
+the messages (as before the store) and once with the pasted sequence stored
+by the REPL and the tools passing IDs. Reports the estimated prompt tokens
+summed over the turn's three LLM calls, and the tool time.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_sequence_store
+"""
+
+import json
+import random
+import time
+
+import tools.sequence_store as sequence_store
+from context_budget import estimate_tokens
+from tools.analyze_protein import analyze_protein
+from tools.sequence_store import store_inline_sequences
+from tools.translate_dna import codon_table, translate_dna
+
+STORE_INLINE_LENGTH = sequence_store.INLINE_LENGTH
+
+def coding_sequence(length, rng):
+    """ATG, random sense codons, then a stop codon"""
+    codons = [codon for codon, amino_acid in codon_table.items() if amino_acid != '*']
+    return 'ATG' + ''.join(rng.choices(codons, k=length // 3 - 2)) + 'TAA'
+
+def tool_call_message(call_id, name, arguments):
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{"id": call_id, "type": "function",
+                        "function": {"name": name, "arguments": json.dumps(arguments)}}]
+    }
+
+def run_conversation(dna, use_store):
+    """
+    Replay the turn; returns (prompt tokens summed over the LLM calls, tool seconds)
+
+    Without the store every sequence is kept inline, as the tools used to return them.
+    """
+    sequence_store.INLINE_LENGTH = STORE_INLINE_LENGTH if use_store else float('inf')
+    prompt = f"Translate this DNA and analyze the protein: {dna}"
+    if use_store:
+        prompt, _ = store_inline_sequences(prompt)
+    messages = [{"role": "user", "content": prompt}]
+    prompt_tokens = 0
+    tool_seconds = 0.0
+
+    def step(call_id, name, function, sequence):
+        """One LLM call that asks for a tool, and the tool call"""
+        nonlocal prompt_tokens, tool_seconds
+        prompt_tokens += sum(estimate_tokens(message) for message in messages)
+        start = time.perf_counter()
+        result = function(sequence)
+        tool_seconds += time.perf_counter() - start
+        messages.append(tool_call_message(call_id, name, {"sequence": sequence}))
+        messages.append({"role": "tool", "tool_call_id": call_id, "content": json.dumps(result)})
+        return result
+
+    # The model passes on whatever the user's message holds: the sequence or its ID
+    translated = step("call_0", "translate_dna", translate_dna, prompt.split(": ", 1)[1].split(" ", 1)[0])
+    protein = translated.get("protein_sequence") or translated["protein_sequence_id"]
+    step("call_1", "analyze_protein", analyze_protein, protein)
+
+    # The LLM call that writes the answer
+    prompt_tokens += sum(estimate_tokens(message) for message in messages)
+    return prompt_tokens, tool_seconds
+
+def main():
+    rng = random.Random(0)
+    print(f"{'DNA length':>12} {'inline tokens':>14} {'store tokens':>13} {'reduction':>10} "
+          f"{'inline tools':>13} {'store tools':>12}")
+    for length in (1_000, 10_000, 100_000, 1_000_000):
+        dna = coding_sequence(length, rng)
+        inline_tokens, inline_seconds = run_conversation(dna, use_store=False)
+        store_tokens, store_seconds = run_conversation(dna, use_store=True)
+        print(f"{length:>12,} {inline_tokens:>14,} {store_tokens:>13,} {inline_tokens / store_tokens:>9.0f}x "
+              f"{inline_seconds * 1e3:>10.1f} ms {store_seconds * 1e3:>9.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark the vectorized translation engine against the original
+codon-by-codon loop, reporting throughput in bases per second.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_translate_dna
+"""
+
+import random
+import time
+
+from tools.sequence_store import resolve_sequence
+from tools.translate_dna import codon_table, translate_dna, translate_batch, FRAMES
+
+def translate_dna_loop(sequence):
+    """The original implementation: one dict lookup per codon in a Python loop"""
+    sequence = sequence.upper().replace(" ", "").replace("\n", "")
+    protein = []
+    for i in range(0, len(sequence) - 2, 3):
+        amino_acid = codon_table.get(sequence[i:i+3], 'X')
+        if amino_acid == '*':
+            break
+        protein.append(amino_acid)
+    return ''.join(protein)
+
+def six_frames_loop(sequence):
+    """Six-frame translation built from the original loop (without stopping at stop codons)"""
+    complement = str.maketrans('ACGT', 'TGCA')
+    reverse = sequence.translate(complement)[::-1]
+    proteins = {}
+    for frame in FRAMES:
+        strand = sequence if frame > 0 else reverse
+        offset = abs(frame) - 1
+        proteins[frame] = ''.join(
+            codon_table.get(strand[i:i+3], 'X') for i in range(offset, len(strand) - 2, 3)
+        )
+    return proteins
+
+def random_dna(length, rng):
+    return ''.join(rng.choices('ACGT', k=length))
+
+def stop_free_dna(length, rng):
+    """Random DNA with every stop codon replaced so frame 1 is translated end to end"""
+    codons = [codon for codon, amino_acid in codon_table.items() if amino_acid != '*']
+    return ''.join(rng.choices(codons, k=length // 3))
+
+def best_of(fn, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def report(label, bases, loop_time, vector_time):
+    print(
+        f"{label:<34} {bases / loop_time:>14,.0f} {bases / vector_time:>16,.0f} "
+        f"{loop_time / vector_time:>8.1f}x"
+    )
+
+def main():
+    rng = random.Random(0)
+    print(f"{'workload':<34} {'loop bases/s':>14} {'numpy bases/s':>16} {'speedup':>9}")
+
+    # Single sequence, frame 1 (the translate_dna tool)
+    for length in (1_000, 100_000, 1_000_000):
+        sequence = stop_free_dna(length, rng)
+        result = translate_dna(sequence)
+        protein = result.get("protein_sequence") or resolve_sequence(result["protein_sequence_id"], "protein")
+        assert protein == translate_dna_loop(sequence)
+        report(
+            f"translate_dna, {length:,} bp",
+            len(sequence),
+            best_of(lambda: translate_dna_loop(sequence)),
+            best_of(lambda: translate_dna(sequence))
+        )
+
+    # Six frames of one long sequence
+    sequence = random_dna(1_000_000, rng)
+    assert translate_batch([sequence], frames=FRAMES)[0] == six_frames_loop(sequence)
+    report(
+        "six frames, 1,000,000 bp",
+        len(sequence),
+        best_of(lambda: six_frames_loop(sequence), repeats=1),
+        best_of(lambda: translate_batch([sequence], frames=FRAMES))
+    )
+
+    # Six frames of a panel of short sequences
+    panel = [random_dna(1_500, rng) for _ in range(1_000)]
+    bases = sum(len(sequence) for sequence in panel)
+    report(
+        "six frames, 1,000 x 1,500 bp panel",
+        bases,
+        best_of(lambda: [six_frames_loop(sequence) for sequence in panel], repeats=1),
+        best_of(lambda: translate_batch(panel, frames=FRAMES))
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark check_variant's indexed VCF backend as the VCF grows.
+
+Writes synthetic position-sorted patient VCFs of increasing size, then
+compares the latency of a gene-region query through the sidecar index with
+a scan of the whole file. Gene queries return more variants as the VCF
+gets denser, so the cost of locating a region is also measured on its own
+with 1 bp queries at random positions: it should stay flat while the scan
+grows with the number of records.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_variant_store --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from tools.variant_store import GENE_INTERVALS, IndexedVCFBackend, build_vcf_index, parse_vcf_line, INDEX_SUFFIX
+
+# GRCh38 chromosome lengths, for spreading variants over the genome
+CHROMOSOME_LENGTHS = {
+    'chr1': 248956422, 'chr2': 242193529, 'chr3': 198295559, 'chr4': 190214555, 'chr5': 181538259,
+    'chr6': 170805979, 'chr7': 159345973, 'chr8': 145138636, 'chr9': 138394717, 'chr10': 133797422,
+    'chr11': 135086622, 'chr12': 133275309, 'chr13': 114364328, 'chr14': 107043718, 'chr15': 101991189,
+    'chr16': 90338345, 'chr17': 83257441, 'chr18': 80373285, 'chr19': 58617616, 'chr20': 64444167,
+    'chr21': 46709983, 'chr22': 50818468
+}
+
+def write_vcf(path, records, rng):
+    """Write a sorted single-sample VCF with about records variants"""
+    total_length = sum(CHROMOSOME_LENGTHS.values())
+    with open(path, 'w') as handle:
+        handle.write("##fileformat=VCFv4.2\n")
+        handle.write('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n')
+        handle.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tPATIENT\n")
+        for chrom, length in CHROMOSOME_LENGTHS.items():
+            count = int(records * length / total_length)
+            positions = np.sort(rng.integers(1, length, count))
+            lines = []
+            for pos in positions.tolist():
+                ref, alt = random.sample('ACGT', 2)
+                genotype = '0/1' if pos % 3 else '1/1'
+                lines.append(f"{chrom}\t{pos}\t.\t{ref}\t{alt}\t50\tPASS\t.\tGT\t{genotype}\n")
+            handle.write(''.join(lines))
+
+def scan_query(path, chrom, start, end):
+    """The unindexed alternative: read every line of the VCF"""
+    variants = []
+    with open(path) as handle:
+        for line in handle:
+            if line.startswith('#'):
+                continue
+            fields = line.split('\t', 4)
+            if fields[0] == chrom and start - len(fields[3]) < int(fields[1]) <= end:
+                variants.extend(parse_vcf_line(line))
+    return variants
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed VCF region queries")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="numbers of VCF records to benchmark")
+    parser.add_argument('--queries', type=int, default=2000, help="indexed queries per measurement")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+    genes = list(GENE_INTERVALS)
+
+    print(f"{'records':>10} {'VCF MB':>8} {'index s':>8} {'index KB':>9} {'seek µs':>8} {'gene µs':>8} "
+          f"{'variants/gene':>14} {'scan ms':>9} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"patient_{size}.vcf")
+            write_vcf(path, size, rng)
+
+            start = time.perf_counter()
+            build_vcf_index(path)
+            index_time = time.perf_counter() - start
+
+            backend = IndexedVCFBackend(path)
+            found = [len(backend.query(*GENE_INTERVALS[gene])) for gene in genes]
+
+            start = time.perf_counter()
+            for i in range(args.queries):
+                backend.query(*GENE_INTERVALS[genes[i % len(genes)]])
+            indexed = (time.perf_counter() - start) / args.queries
+
+            chroms = list(CHROMOSOME_LENGTHS)
+            points = [(chroms[i % len(chroms)], int(rng.integers(1, 40_000_000))) for i in range(args.queries)]
+            start = time.perf_counter()
+            for chrom, pos in points:
+                backend.query(chrom, pos, pos)
+            seek = (time.perf_counter() - start) / args.queries
+            backend.close()
+
+            gene = 'BRCA1'
+            start = time.perf_counter()
+            scanned = scan_query(path, *GENE_INTERVALS[gene])
+            scan = time.perf_counter() - start
+            assert len(scanned) == found[genes.index(gene)]
+
+            print(
+                f"{size:>10,} {os.path.getsize(path) / 1e6:>8.1f} {index_time:>8.2f} "
+                f"{os.path.getsize(path + INDEX_SUFFIX) / 1e3:>9.1f} {seek * 1e6:>8.1f} {indexed * 1e6:>8.1f} "
+                f"{np.mean(found):>14.1f} {scan * 1e3:>9.1f} {scan / indexed:>8.0f}x"
+            )
+
+if __name__ == '__main__':
+    main()
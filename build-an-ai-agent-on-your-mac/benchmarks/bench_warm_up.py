@@ -0,0 +1,92 @@
+"""
+Benchmark model warm-up and connection reuse at agent startup.
+
+Runs the first turn of a scripted scenario against a mock server that takes
+--load-delay seconds to load a model on its first request, as Ollama does,
+three ways: cold, with clients.WarmUp started while a simulated user spends
+--think-time seconds typing, and with warm-up but a question asked at once.
+First-turn latency is counted from the moment the question is asked. It then
+compares LLM calls made with a fresh client each time against calls through
+the shared keep-alive connection pool.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.bench_warm_up --load-delay 3 --think-time 5
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+from openai import OpenAI
+from rich.console import Console
+
+from agent import run_agent_turn
+from benchmarks.mock_openai_server import MockOpenAIServer
+from benchmarks.scenarios import SCENARIOS
+from clients import WarmUp, make_client
+from four_tools import TOOL_FUNCTIONS, TOOL_SCHEMAS
+
+def first_turn(scenario, load_delay, latency, think_time=None):
+    """
+    Seconds from asking the first question to the answer, on a freshly started server.
+
+    Args:
+        think_time: Seconds the user types while warm-up runs (None: no warm-up)
+    """
+    server = MockOpenAIServer(latency=latency, load_delay=load_delay)
+    client_kwargs = {"base_url": server.start(), "api_key": "mock"}
+    try:
+        client = make_client(client_kwargs)
+        if think_time is not None:
+            warm_up = WarmUp(client_kwargs, scenario, TOOL_SCHEMAS).start()
+            time.sleep(think_time)
+        start = time.perf_counter()
+        if think_time is not None:
+            warm_up.wait()
+        messages = [{"role": "user", "content": SCENARIOS[scenario]["prompt"]}]
+        run_agent_turn(messages, client, TOOL_SCHEMAS, TOOL_FUNCTIONS, scenario, Console(file=io.StringIO()))
+        return time.perf_counter() - start
+    finally:
+        server.stop()
+
+def call_latency(client_for_call, calls):
+    """Mean seconds per minimal chat completion, getting each call's client from client_for_call"""
+    latencies = []
+    for _ in range(calls):
+        client = client_for_call()
+        start = time.perf_counter()
+        client.chat.completions.create(model="unscripted", messages=[{"role": "user", "content": "Hi"}])
+        latencies.append(time.perf_counter() - start)
+    return statistics.mean(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model warm-up and connection reuse")
+    parser.add_argument('--load-delay', type=float, default=3.0, help="seconds the mock server takes to load a model")
+    parser.add_argument('--latency', type=float, default=0.2, help="mock model latency per LLM call in seconds")
+    parser.add_argument('--think-time', type=float, default=5.0, help="seconds the user takes to type the question")
+    parser.add_argument('--scenario', default="epilepsy_sequential", choices=list(SCENARIOS))
+    parser.add_argument('--calls', type=int, default=200, help="LLM calls for the connection reuse comparison")
+    args = parser.parse_args()
+
+    print(f"First turn of {args.scenario}, model load {args.load_delay:.1f}s, mock latency {args.latency * 1e3:.0f} ms")
+    cold = first_turn(args.scenario, args.load_delay, args.latency)
+    print(f"{'no warm-up':<32} {cold:6.2f}s")
+    for label, think_time in ((f"warm-up, {args.think_time:.0f}s to type", args.think_time),
+                              ("warm-up, asked at once", 0.0)):
+        warm = first_turn(args.scenario, args.load_delay, args.latency, think_time)
+        print(f"{label:<32} {warm:6.2f}s ({warm - cold:+.2f}s)")
+
+    server = MockOpenAIServer()
+    base_url = server.start()
+    try:
+        fresh = call_latency(lambda: OpenAI(base_url=base_url, api_key="mock"), args.calls)
+        shared = call_latency(lambda: make_client({"base_url": base_url, "api_key": "mock"}), args.calls)
+    finally:
+        server.stop()
+    print(f"\nLLM call overhead over {args.calls} calls (no model latency)")
+    print(f"{'new client per call':<32} {fresh * 1e3:6.2f} ms")
+    print(f"{'shared keep-alive pool':<32} {shared * 1e3:6.2f} ms ({fresh / shared:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
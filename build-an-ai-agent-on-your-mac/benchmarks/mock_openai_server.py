@@ -0,0 +1,270 @@
+"""
+Local stand-in for an OpenAI-compatible server, for benchmarks.
+
+Implements /v1/chat/completions (plain and stream=True), /v1/models, and
+Ollama's /api/generate for preloading a model.
+Responses are scripted per scenario: the request's model name selects the
+scenario, and the number of assistant messages since the last user message
+selects the step, so a scripted agent loop needs no network access and no
+model. A configurable delay stands in for model latency, and another for
+the time a local server takes to load a model on its first request, and a
+random fraction of slow responses gives it a latency tail. Like
+Ollama with OLLAMA_NUM_PARALLEL, it can be limited to answering a few
+requests at a time, and kill() makes it drop every connection as a crashed
+node would.
+
+Run standalone from build-an-ai-agent-on-your-mac/:
+    python -m benchmarks.mock_openai_server --port 8000 --latency 0.2
+"""
+
+import json
+import random
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.scenarios import SCENARIOS
+
+class MockOpenAIServer:
+    """Scripted OpenAI-compatible chat completions server on a background thread"""
+
+    def __init__(self, scenarios=SCENARIOS, latency=0.0, token_delay=0.0, load_delay=0.0, max_parallel=None,
+                 slow_fraction=0.0, slow_latency=0.0, seed=0, host="127.0.0.1", port=0):
+        """
+        Args:
+            scenarios: Dictionary mapping scenario (model) names to scripts
+            latency: Seconds before the first byte of each response
+            token_delay: Seconds between streamed chunks
+            load_delay: Seconds the first request for each model waits for it to load
+            max_parallel: Requests answered at the same time; the rest queue (None: no limit)
+            slow_fraction: Fraction of responses that take slow_latency seconds instead of latency
+            seed: Seed of the random choice of slow responses
+            host, port: Address to listen on (port 0 picks a free port)
+        """
+        self.scenarios = scenarios
+        self.latency = latency
+        self.token_delay = token_delay
+        self.load_delay = load_delay
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.loaded = set()
+        self.down = False
+        self.slots = nullcontext() if max_parallel is None else threading.BoundedSemaphore(max_parallel)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Start serving in a background thread and return the base URL"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def kill(self):
+        """Stop serving and drop open keep-alive connections without answering, like a crashed server"""
+        self.down = True
+        self.stop()
+
+    def load(self, model):
+        """Wait for a model to load unless it already has; concurrent requests share one load"""
+        with self._load_lock:
+            if model not in self.loaded:
+                time.sleep(self.load_delay)
+                self.loaded.add(model)
+
+    def response_latency(self):
+        """Seconds before the next response: usually latency, sometimes slow_latency"""
+        with self._lock:
+            slow = self._random.random() < self.slow_fraction
+        return self.slow_latency if slow else self.latency
+
+    def respond(self, request):
+        """The scripted assistant message for a chat completions request"""
+        with self._lock:
+            self.requests += 1
+        steps = self.scenarios.get(request.get("model"), {}).get("steps", [])
+        messages = request.get("messages", [])
+        last_user = max((i for i, message in enumerate(messages) if message.get("role") == "user"), default=-1)
+        step = sum(1 for message in messages[last_user + 1:] if message.get("role") == "assistant")
+
+        if step >= len(steps):
+            return {"role": "assistant", "content": "Done."}
+        script = steps[step]
+        if "tool_calls" in script:
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{step}_{i}",
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])}
+                    }
+                    for i, call in enumerate(script["tool_calls"])
+                ]
+            }
+        return {"role": "assistant", "content": script["content"]}
+
+def _usage(request, message):
+    prompt_tokens = len(json.dumps(request.get("messages", []))) // 4
+    completion_tokens = len(json.dumps(message)) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle's
+    # algorithm and delayed ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.server.mock.down:
+            self.close_connection = True
+            return
+        if self.path.rstrip('/') != '/v1/models':
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+        models = [{"id": name, "object": "model", "owned_by": "mock"} for name in self.server.mock.scenarios]
+        self._send_json(200, {"object": "list", "data": models})
+
+    def do_POST(self):
+        if self.server.mock.down:
+            self.close_connection = True
+            return
+        path = self.path.rstrip('/')
+        if path not in ('/v1/chat/completions', '/api/generate'):
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length))
+        mock = self.server.mock
+        mock.load(request.get("model"))
+
+        if path == '/api/generate':
+            # Ollama answers a request without a prompt once the model is loaded
+            return self._send_json(200, {"model": request.get("model"), "response": "", "done": True})
+
+        with mock.slots:
+            self._complete(request)
+
+    def _complete(self, request):
+        mock = self.server.mock
+        message = mock.respond(request)
+        time.sleep(mock.response_latency())
+
+        if request.get("stream"):
+            return self._stream(request, message)
+
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{mock.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"
+            }],
+            "usage": _usage(request, message)
+        })
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, request, message):
+        """Send the message as server-sent events, a few tokens per chunk"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-mock-stream",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.server.mock.token_delay)
+
+        send({"role": "assistant"})
+        for word in (message.get("content") or "").split(" "):
+            send({"content": word + " "})
+        for index, tool_call in enumerate(message.get("tool_calls") or []):
+            arguments = tool_call["function"]["arguments"]
+            half = len(arguments) // 2
+            send({"tool_calls": [{
+                "index": index, "id": tool_call["id"], "type": "function",
+                "function": {"name": tool_call["function"]["name"], "arguments": arguments[:half]}
+            }]})
+            send({"tool_calls": [{"index": index, "function": {"arguments": arguments[half:]}}]})
+        send({}, "tool_calls" if message.get("tool_calls") else "stop")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            usage_chunk = {
+                "id": "chatcmpl-mock-stream",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [],
+                "usage": _usage(request, message)
+            }
+            self.wfile.write(f"data: {json.dumps(usage_chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scripted OpenAI-compatible server for benchmarks")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before each response")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument('--load-delay', type=float, default=0.0, help="seconds to load each model on first use")
+    parser.add_argument('--max-parallel', type=int, help="requests answered at the same time (default: no limit)")
+    parser.add_argument('--slow-fraction', type=float, default=0.0, help="fraction of responses that are slow")
+    parser.add_argument('--slow-latency', type=float, default=0.0, help="seconds before a slow response")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency, token_delay=args.token_delay, load_delay=args.load_delay,
+                              max_parallel=args.max_parallel, slow_fraction=args.slow_fraction,
+                              slow_latency=args.slow_latency, port=args.port)
+    print(f"Serving scenarios {', '.join(server.scenarios)} at {server.base_url} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Scripted agent conversations for the mock server.
+
+Each scenario is the user prompt plus the assistant message the model would
+send at each step of the turn: either a list of tool calls or final text.
+The tool calls follow the canonical path of four_tools.py for that case.
+
+The *_batch scenarios take the same path through the list-valued tools,
+and the *_sequential ones issue the single-item tool calls
+one per step, as local models often do, to show the round trips the batch
+tools save. The *_diagnose ones answer with the one diagnose pipeline call.
+"""
+
+SCENARIOS = {
+    "epilepsy": {
+        "prompt": "Patient has epilepsy. Find the genetic cause.",
+        "steps": [
+            {"tool_calls": [
+                {"name": "search_disease_genes", "arguments": {"disease": "epilepsy"}}
+            ]},
+            {"tool_calls": [
+                {"name": "check_variant", "arguments": {"gene": "SCN1A"}},
+                {"name": "check_variant", "arguments": {"gene": "KCNQ2"}}
+            ]},
+            {"tool_calls": [
+                {"name": "check_population_frequency", "arguments": {"variant": "chr2:166245425:T:C"}},
+                {"name": "query_clinvar", "arguments": {"variant": "chr2:166245425:T:C"}}
+            ]},
+            {"content": (
+                "The patient carries **chr2:166245425:T:C** in *SCN1A*. It is ultra-rare in gnomAD "
+                "(allele frequency 0.00001) and ClinVar classifies it as **Pathogenic** (3-star) for "
+                "Dravet syndrome, so it is the most likely genetic cause of the epilepsy. No variant "
+                "was found in *KCNQ2*."
+            )}
+        ]
+    },
+    "brca1": {
+        "prompt": "Analyze variant chr17:43094464:G:A for clinical significance",
+        "steps": [
+            {"tool_calls": [
+                {"name": "check_population_frequency", "arguments": {"variant": "chr17:43094464:G:A"}},
+                {"name": "query_clinvar", "arguments": {"variant": "chr17:43094464:G:A"}}
+            ]},
+            {"content": (
+                "**chr17:43094464:G:A** (*BRCA1*) is rare (allele frequency 0.0002) and ClinVar lists it "
+                "as **Likely pathogenic** (2-star) for familial breast-ovarian cancer."
+            )}
+        ]
+    },
+    "cancer": {
+        "prompt": "Patient has a family history of cancer. Find the genetic cause.",
+        "steps": [
+            {"tool_calls": [
+                {"name": "search_disease_genes", "arguments": {"disease": "cancer"}}
+            ]},
+            {"tool_calls": [
+                {"name": "check_variant", "arguments": {"gene": "TP53"}},
+                {"name": "check_variant", "arguments": {"gene": "BRCA1"}},
+                {"name": "check_variant", "arguments": {"gene": "BRCA2"}}
+            ]},
+            {"tool_calls": [
+                {"name": "check_population_frequency", "arguments": {"variant": "chr17:7675088:C:T"}},
+                {"name": "query_clinvar", "arguments": {"variant": "chr17:7675088:C:T"}},
+                {"name": "check_population_frequency", "arguments": {"variant": "chr17:43094464:G:A"}},
+                {"name": "query_clinvar", "arguments": {"variant": "chr17:43094464:G:A"}}
+            ]},
+            {"content": (
+                "The *TP53* variant chr17:7675088:C:T is common and **Benign**. The *BRCA1* variant "
+                "chr17:43094464:G:A is rare and **Likely pathogenic** for familial breast-ovarian cancer, "
+                "making it the most likely cause."
+            )}
+        ]
+    }
+}
+
+SCENARIOS["epilepsy_batch"] = {
+    "prompt": SCENARIOS["epilepsy"]["prompt"],
+    "steps": [
+        {"tool_calls": [
+            {"name": "search_disease_genes", "arguments": {"disease": "epilepsy"}}
+        ]},
+        {"tool_calls": [
+            {"name": "check_variants", "arguments": {"genes": ["SCN1A", "KCNQ2"]}}
+        ]},
+        {"tool_calls": [
+            {"name": "check_population_frequencies", "arguments": {"variants": ["chr2:166245425:T:C"]}},
+            {"name": "query_clinvar_batch", "arguments": {"variants": ["chr2:166245425:T:C"]}}
+        ]},
+        SCENARIOS["epilepsy"]["steps"][-1]
+    ]
+}
+
+SCENARIOS["cancer_batch"] = {
+    "prompt": SCENARIOS["cancer"]["prompt"],
+    "steps": [
+        {"tool_calls": [
+            {"name": "search_disease_genes", "arguments": {"disease": "cancer"}}
+        ]},
+        {"tool_calls": [
+            {"name": "check_variants", "arguments": {"genes": ["TP53", "BRCA1", "BRCA2"]}}
+        ]},
+        {"tool_calls": [
+            {"name": "check_population_frequencies",
+             "arguments": {"variants": ["chr17:7675088:C:T", "chr17:43094464:G:A"]}},
+            {"name": "query_clinvar_batch", "arguments": {"variants": ["chr17:7675088:C:T", "chr17:43094464:G:A"]}}
+        ]},
+        SCENARIOS["cancer"]["steps"][-1]
+    ]
+}
+
+def one_call_per_step(scenario):
+    """The scenario with every tool call in a step of its own"""
+    steps = []
+    for step in scenario["steps"]:
+        if "tool_calls" in step:
+            steps.extend({"tool_calls": [tool_call]} for tool_call in step["tool_calls"])
+        else:
+            steps.append(step)
+    return {"prompt": scenario["prompt"], "steps": steps}
+
+SCENARIOS["epilepsy_sequential"] = one_call_per_step(SCENARIOS["epilepsy"])
+SCENARIOS["cancer_sequential"] = one_call_per_step(SCENARIOS["cancer"])
+
+SCENARIOS["epilepsy_diagnose"] = {
+    "prompt": SCENARIOS["epilepsy"]["prompt"],
+    "steps": [
+        {"tool_calls": [
+            {"name": "diagnose", "arguments": {"disease": "epilepsy"}}
+        ]},
+        SCENARIOS["epilepsy"]["steps"][-1]
+    ]
+}
+
+SCENARIOS["cancer_diagnose"] = {
+    "prompt": SCENARIOS["cancer"]["prompt"],
+    "steps": [
+        {"tool_calls": [
+            {"name": "diagnose", "arguments": {"disease": "cancer"}}
+        ]},
+        SCENARIOS["cancer"]["steps"][-1]
+    ]
+}
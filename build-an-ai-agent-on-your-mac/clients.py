@@ -0,0 +1,157 @@
+"""
+Shared connections and model warm-up for the OpenAI clients.
+
+Every client made by make_client() draws on one keep-alive connection pool
+(one for blocking clients, one for async ones), so LLM calls after the first,
+and the concurrent cases of batch.py, skip TCP and TLS setup. The pool keeps
+idle connections open for minutes rather than httpx's default 5 seconds,
+because an interactive user takes longer than that to type the next question.
+
+WarmUp gets the model server ready before the first question, on a
+background thread while the user types: it opens a connection, asks Ollama
+to load the model into memory and keep it there, and sends one tiny request
+carrying the tool schemas so the server has already processed the prompt
+prefix every turn starts with.
+"""
+
+import threading
+import time
+
+from openai import (
+    DEFAULT_CONNECTION_LIMITS, AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI, Timeout
+)
+
+# Connections kept per pool; enough for batch.py's concurrent cases
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+
+# Seconds an idle connection stays open
+KEEPALIVE_EXPIRY = 300
+
+# Connecting should be quick; a local model loading or thinking can take minutes
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 600.0
+
+# How long Ollama keeps the model loaded after the last request
+DEFAULT_KEEP_ALIVE = "30m"
+
+_http_clients = {}
+_lock = threading.Lock()
+
+def shared_http_client(asynchronous=False):
+    """The process-wide keep-alive connection pool for blocking or async clients"""
+    with _lock:
+        if asynchronous not in _http_clients:
+            # The Limits class of the httpx the installed openai is built on
+            limits = type(DEFAULT_CONNECTION_LIMITS)(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            )
+            timeout = Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+            http_client_class = DefaultAsyncHttpxClient if asynchronous else DefaultHttpxClient
+            _http_clients[asynchronous] = http_client_class(limits=limits, timeout=timeout)
+        return _http_clients[asynchronous]
+
+def make_client(client_kwargs, asynchronous=False):
+    """
+    An OpenAI client that shares the process-wide connection pool.
+
+    Args:
+        client_kwargs: Keyword arguments for OpenAI (base_url, api_key)
+        asynchronous: Make an AsyncOpenAI client instead
+
+    Returns:
+        OpenAI or AsyncOpenAI client
+    """
+    client_class = AsyncOpenAI if asynchronous else OpenAI
+    return client_class(http_client=shared_http_client(asynchronous), **client_kwargs)
+
+def server_root(base_url):
+    """The server address of an OpenAI-compatible base URL, where Ollama's own API lives"""
+    base_url = str(base_url).rstrip('/')
+    return base_url[:-len('/v1')] if base_url.endswith('/v1') else base_url
+
+class WarmUp:
+    """Loads the model and primes the prompt prefix on a background thread"""
+
+    def __init__(self, client_kwargs, model, tool_schemas, keep_alive=DEFAULT_KEEP_ALIVE):
+        """
+        Args:
+            client_kwargs: Keyword arguments for OpenAI (base_url, api_key)
+            model: Model the agent will use
+            tool_schemas: Tool schemas every turn sends
+            keep_alive: How long Ollama should keep the model loaded
+        """
+        self.client = make_client(client_kwargs)
+        self.model = model
+        self.tool_schemas = tool_schemas
+        self.keep_alive = keep_alive
+        # Only a local server has a model to load; a hosted API only gets its connection opened
+        self.local = "base_url" in client_kwargs
+        self.steps = {}
+        self.errors = {}
+        self.started_at = None
+        self.finished_at = None
+        self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+
+    def start(self):
+        """Start warming up in the background; returns self"""
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _step(self, name, function):
+        start = time.perf_counter()
+        try:
+            function()
+        except Exception as e:
+            self.errors[name] = f"{type(e).__name__}: {e}"
+        self.steps[name] = time.perf_counter() - start
+
+    def _run(self):
+        # Open a keep-alive connection to the server
+        self._step("connect", self.client.models.list)
+        if self.local and "connect" not in self.errors:
+            # Load the model into memory and keep it there
+            self._step("load", self._load)
+            # Process the tool schemas the first prompt starts with
+            self._step("prime", self._prime)
+        self.finished_at = time.perf_counter()
+
+    def _load(self):
+        """Ask Ollama to load the model; an empty prompt loads it without generating"""
+        response = shared_http_client().post(
+            f"{server_root(self.client.base_url)}/api/generate",
+            json={"model": self.model, "keep_alive": self.keep_alive}
+        )
+        response.raise_for_status()
+
+    def _prime(self):
+        self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": "Hi"}],
+            tools=self.tool_schemas,
+            max_tokens=1
+        )
+
+    def wait(self):
+        """
+        Block until the warm-up is done.
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.perf_counter()
+        self._thread.join()
+        return time.perf_counter() - start
+
+    def summary(self):
+        """One-line description of the warm-up steps"""
+        if self.finished_at is None:
+            return "Warm-up: still running"
+        steps = ', '.join(
+            f"{name} {seconds:.2f}s" + (f" (failed: {self.errors[name]})" if name in self.errors else "")
+            for name, seconds in self.steps.items()
+        )
+        return f"Warm-up: {self.finished_at - self.started_at:.2f}s in the background ({steps})"
@@ -0,0 +1,118 @@
+"""
+Token budget for the growing conversation history.
+
+Each message's size is estimated at about four characters per token. When
+the history plus tool schemas exceeds the budget, old tool results are
+compacted first (long fields elided, short ones such as ids and
+classifications kept). If that is not enough, the oldest whole turns are
+evicted. A turn runs from a user message up to the next one, so an assistant
+tool call and its tool results are always kept or dropped together.
+"""
+
+import json
+
+from util import message_to_dict
+
+CHARS_PER_TOKEN = 4
+
+# Per-message framing tokens (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Tool result fields longer than this are elided when compacting
+MAX_COMPACTED_FIELD_CHARS = 80
+
+def estimate_tokens(message):
+    """Approximate token count of one message"""
+    return MESSAGE_OVERHEAD_TOKENS + len(json.dumps(message_to_dict(message))) // CHARS_PER_TOKEN
+
+def estimate_schema_tokens(tool_schemas):
+    """Approximate token count of the tool schemas sent with every call"""
+    return len(json.dumps(tool_schemas or [])) // CHARS_PER_TOKEN
+
+def compact_tool_result(content):
+    """Shorten a JSON tool result, eliding long fields and keeping short ones"""
+    try:
+        result = json.loads(content)
+    except ValueError:
+        result = None
+    if not isinstance(result, dict):
+        return json.dumps({"summary": f"<elided {len(content)} chars>", "compacted": True})
+
+    compacted = {}
+    for key, value in result.items():
+        size = len(json.dumps(value))
+        compacted[key] = value if size <= MAX_COMPACTED_FIELD_CHARS else f"<elided {size} chars>"
+    compacted["compacted"] = True
+    return json.dumps(compacted)
+
+class ContextBudget:
+    """Keeps the messages sent to the LLM within a token budget"""
+
+    def __init__(self, max_tokens=None):
+        """
+        Args:
+            max_tokens: Token budget for messages plus tool schemas, or None to
+                only measure the prompt size
+        """
+        self.max_tokens = max_tokens
+        self.tokens_sent = []
+        self.stats = {"compacted": 0, "evicted_turns": 0}
+
+    def enforce(self, messages, tool_schemas=None):
+        """
+        Shrink messages in place until they fit the budget.
+
+        The current turn (from the last user message on) is never touched.
+
+        Returns:
+            Estimated number of tokens that will be sent
+        """
+        schema_tokens = estimate_schema_tokens(tool_schemas)
+        sizes = [estimate_tokens(message) for message in messages]
+        total = schema_tokens + sum(sizes)
+
+        if self.max_tokens is not None and total > self.max_tokens:
+            user_indices = [i for i, message in enumerate(messages) if _role(message) == "user"]
+            current_turn = user_indices[-1] if user_indices else len(messages)
+
+            # First compact old tool results, oldest first
+            for i in range(current_turn):
+                if total <= self.max_tokens:
+                    break
+                message = messages[i]
+                if _role(message) != "tool" or _is_compacted(message["content"]):
+                    continue
+                compacted = compact_tool_result(message["content"])
+                if len(compacted) < len(message["content"]):
+                    message["content"] = compacted
+                    new_size = estimate_tokens(message)
+                    total -= sizes[i] - new_size
+                    sizes[i] = new_size
+                    self.stats["compacted"] += 1
+
+            # Then evict whole turns, oldest first
+            while total > self.max_tokens and len(user_indices) > 1:
+                start, end = user_indices[0], user_indices[1]
+                total -= sum(sizes[start:end])
+                del messages[start:end]
+                del sizes[start:end]
+                user_indices = [i - (end - start) for i in user_indices[1:]]
+                self.stats["evicted_turns"] += 1
+
+        self.tokens_sent.append(total)
+        return total
+
+    def summary(self, since=0):
+        """Describe the prompt sizes sent from call number since onwards"""
+        sent = ", ".join(f"{tokens:,}" for tokens in self.tokens_sent[since:])
+        budget = f"{self.max_tokens:,}" if self.max_tokens is not None else "unlimited"
+        return (
+            f"Prompt tokens per LLM call: {sent} (budget {budget}; "
+            f"{self.stats['compacted']} tool result(s) compacted, {self.stats['evicted_turns']} turn(s) evicted)"
+        )
+
+def _is_compacted(content):
+    return content.endswith('"compacted": true}')
+
+def _role(message):
+    return message.get("role") if isinstance(message, dict) else message.role
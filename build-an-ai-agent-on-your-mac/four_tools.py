@@ -4,163 +4,376 @@ Genomics Agent
 Demonstrates an agent choosing a path through tool calls for genetic diagnosis
 """
 
-from openai import OpenAI
 from rich.console import Console
 from rich.panel import Panel
-import json
+import asyncio
 import time
 
-from util import call_llm, render_response, print_messages, execute_tool_call
+from util import message_to_dict, print_messages, MAX_TOOL_CONCURRENCY
+from clients import make_client, WarmUp
+from router import Router
+from resilience import Resilience, DEFAULT_TOOL_DEADLINE, DEFAULT_LLM_DEADLINE, DEFAULT_TOOL_RETRIES
+from agent import run_agent_turn
+from streaming import stream_agent_turn
+from tool_cache import ToolCache
+from prefetch import Prefetcher
+from llm_cache import LLMRecorder, RECORD, REPLAY
+from context_budget import ContextBudget
+from tracing import Tracer
 from tools.search_disease_genes import search_disease_genes, search_disease_genes_schema
+from tools.disease_index import DiseaseIndex, set_disease_index, get_disease_index
 from tools.check_variant import check_variant, check_variant_schema
+from tools.variant_store import open_variant_backend, set_variant_backend, get_variant_backend
+from tools.frequency_index import FrequencyIndex, set_frequency_index, get_frequency_index
+from tools.clinvar_store import ClinVarStore, set_clinvar_store, get_clinvar_store
 from tools.check_population_frequency import check_population_frequency, check_population_frequency_schema
 from tools.query_clinvar import query_clinvar, query_clinvar_schema
+from tools.check_variants import check_variants, check_variants_schema
+from tools.check_population_frequencies import check_population_frequencies, check_population_frequencies_schema
+from tools.query_clinvar_batch import query_clinvar_batch, query_clinvar_batch_schema
+from tools.diagnose import diagnose, diagnose_schema
 
-def main(show_messages, model):
-    # Initialize Rich console
-    console = Console()
-    
+# Define the mapping of function names to function objects
+TOOL_FUNCTIONS = {
+    "search_disease_genes": search_disease_genes,
+    "check_variant": check_variant,
+    "check_population_frequency": check_population_frequency,
+    "query_clinvar": query_clinvar,
+    "check_variants": check_variants,
+    "check_population_frequencies": check_population_frequencies,
+    "query_clinvar_batch": query_clinvar_batch,
+    "diagnose": diagnose
+}
+
+# Define the tool schemas
+TOOL_SCHEMAS = [
+    search_disease_genes_schema,
+    check_variant_schema,
+    check_population_frequency_schema,
+    query_clinvar_schema,
+    check_variants_schema,
+    check_population_frequencies_schema,
+    query_clinvar_batch_schema,
+    diagnose_schema
+]
+
+def data_namespace():
+    """Names of the data the lookup tools read, so cached results never cross data sets"""
+    sources = [get_disease_index(), get_variant_backend(), get_frequency_index(), get_clinvar_store()]
+    return ''.join(f"{data.source}|" for data in sources)
 
+def client_kwargs_for(model):
+    """Keyword arguments for the OpenAI client that serves model"""
     if model == "qwen3:8b": 
         # Initialize client for Ollama (OpenAI-compatible endpoint)
         # Ollama runs on localhost:11434 by default
-        client = OpenAI(
-            base_url="http://localhost:11434/v1",
-            api_key="ollama"  # Ollama doesn't need a real API key
-        )
+        return {
+            "base_url": "http://localhost:11434/v1",
+            "api_key": "ollama"  # Ollama doesn't need a real API key
+        }
     elif model == "gpt-4": 
-        client = OpenAI()
+        return {}
     else: 
         raise ValueError(f"Unsupported model {model}")
 
+def cancel_pending(loop):
+    """Cancel the tasks an interrupted streaming turn left on the event loop"""
+    tasks = asyncio.all_tasks(loop)
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+def drop_unanswered_tool_calls(messages):
+    """
+    Remove the last assistant tool call message, and whatever follows it,
+    if some of its calls have no tool result, so the history stays valid
+    """
+    for i in range(len(messages) - 1, -1, -1):
+        message = message_to_dict(messages[i])
+        if message.get("role") == "assistant" and message.get("tool_calls"):
+            answered = {
+                result["tool_call_id"] for result in map(message_to_dict, messages[i + 1:])
+                if result.get("role") == "tool"
+            }
+            if not {call["id"] for call in message["tool_calls"]} <= answered:
+                del messages[i:]
+            return
+
+def main(show_messages, model, max_concurrency=MAX_TOOL_CONCURRENCY, stream=False, tool_cache_path=None,
+         record_path=None, replay_path=None, context_budget=None, trace_path=None, vcf_path=None,
+         gene_intervals_path=None, frequency_index_path=None, clinvar_db_path=None, disease_genes_path=None,
+         prefetch=False, warm_up=False, endpoints=None, tool_deadline=DEFAULT_TOOL_DEADLINE,
+         llm_deadline=DEFAULT_LLM_DEADLINE, tool_retries=DEFAULT_TOOL_RETRIES, hedge=False):
+    # Initialize Rich console
+    console = Console()
+    
+    # Endpoints given on the command line are Ollama servers, whatever model they serve
+    client_kwargs = {"api_key": "ollama"} if endpoints else client_kwargs_for(model)
+
+    # Record completions to, or replay them from, a local file
+    recorder = None
+    if record_path:
+        recorder = LLMRecorder(record_path, RECORD)
+    elif replay_path:
+        recorder = LLMRecorder(replay_path, REPLAY)
+
+    if stream:
+        # Streaming turns share one event loop for the whole session
+        loop = asyncio.new_event_loop()
+
+    # Clients share one keep-alive connection pool; several endpoints are load-balanced by a router
+    router = None
+    if replay_path:
+        # Replayed runs never reach the model server
+        client = None
+    elif endpoints:
+        client = router = Router(endpoints, client_kwargs.get("api_key", "ollama"), asynchronous=stream)
+    else:
+        client = make_client(client_kwargs, asynchronous=stream)
+    
+    # Load the model and prime the tool schemas on every endpoint while the user types
+    warm_ups = []
+    if warm_up and client is not None:
+        endpoint_kwargs = [dict(client_kwargs, base_url=url) for url in endpoints] if endpoints else [client_kwargs]
+        warm_ups = [WarmUp(kwargs, model, TOOL_SCHEMAS).start() for kwargs in endpoint_kwargs]
+
     # Initialize context (message history)
     messages = []
     
-    # Define the mapping of function names to function objects
-    tool_functions = {
-        "search_disease_genes": search_disease_genes,
-        "check_variant": check_variant,
-        "check_population_frequency": check_population_frequency,
-        "query_clinvar": query_clinvar
-    }
-    
-    # Define the tool schemas
-    tool_schemas = [
-        search_disease_genes_schema,
-        check_variant_schema,
-        check_population_frequency_schema,
-        query_clinvar_schema
-    ]
+    # Search the diseases of an association file instead of the simulated ones
+    if disease_genes_path:
+        set_disease_index(DiseaseIndex.open(disease_genes_path))
+    
+    # Query the patient's variants from a VCF instead of the simulated patient
+    if vcf_path or gene_intervals_path:
+        set_variant_backend(open_variant_backend(vcf_path, gene_intervals_path))
+    
+    # Look up population frequencies in a memory-mapped index
+    if frequency_index_path:
+        set_frequency_index(FrequencyIndex.open(frequency_index_path))
+    
+    # Look up clinical significance in a ClinVar database loaded into SQLite
+    if clinvar_db_path:
+        set_clinvar_store(ClinVarStore(clinvar_db_path))
+    
+    # Cache lookup results, optionally persisting them across sessions
+    cache = ToolCache(path=tool_cache_path, namespace=data_namespace())
+    
+    # Speculatively look up frequencies and ClinVar as soon as a variant is found
+    prefetcher = Prefetcher(TOOL_FUNCTIONS, cache=cache) if prefetch else None
+    
+    # Give LLM and tool calls deadlines, retry failed lookups, and optionally hedge slow LLM calls
+    resilience = Resilience(tool_deadline, llm_deadline, tool_retries, hedge)
+    
+    # Keep the prompt within a token budget (or just measure it)
+    budget = ContextBudget(context_budget)
+    
+    # Trace LLM calls, tool calls and rendering (to a JSONL file if requested)
+    tracer = Tracer(trace_path)
     
     # Welcome message
     console.print(Panel.fit(
         "[cyan bold]Genomics Agent - Genetic Diagnosis Assistant[/cyan bold]\n"
         f"[dim]Running {model}[/dim]\n"
-        "[dim]Type 'quit' or 'exit' to end[/dim]\n"
+        "[dim]Type 'quit' or 'exit' to end, '/trace' for where the time went"
+        + (", '/backends' for the endpoints" if router is not None else "") + "[/dim]\n"
         "[yellow]Try: 'Patient has epilepsy. Find the genetic cause.'[/yellow]\n"
         "[yellow]Or: 'Analyze variant chr2:166245425:T:C for clinical significance'[/yellow]",
         border_style="cyan"
     ))
     console.print()
     
+    first_turn = True
     while True:
         # User prompt
         user_input = console.input("[dim]You ➜ [/dim]")
         
         # Check for exit command
         if user_input.lower().strip() in ['quit', 'exit']:
+            console.print(f"[dim]{cache.summary()}[/dim]")
+            if prefetcher is not None:
+                console.print(f"[dim]{prefetcher.summary()}[/dim]")
+                prefetcher.close()
+            if recorder is not None:
+                console.print(f"[dim]{recorder.summary()}[/dim]")
+            if router is not None:
+                console.print(f"[dim]{router.summary()}[/dim]")
+                router.close()
+            console.print(f"[dim]{resilience.summary()}[/dim]")
             console.print("[cyan]Goodbye![/cyan]")
+            cache.close()
+            tracer.close()
+            if stream:
+                loop.close()
             break
         
         # Skip empty inputs
         if not user_input.strip():
             continue
         
+        # Summarize the trace: '/trace' for the last turn, '/trace all' for the session
+        if user_input.strip().startswith('/trace'):
+            turn = None if user_input.strip() == '/trace all' else tracer.last_turn
+            console.print(f"[dim]{tracer.summary(turn)}[/dim]")
+            continue
+        
+        # Show each endpoint's health, queue depth and latency
+        if user_input.strip() == '/backends' and router is not None:
+            console.print(f"[dim]{router.summary()}[/dim]")
+            continue
+        
         # Start timing
         start_time = time.time()
         
+        # The first turn waits for whatever is left of the warm-up
+        if first_turn:
+            warm_up_wait = sum(warm_up.wait() for warm_up in warm_ups)
+        
+        # The conversation as it was before this question, restored if the turn is cancelled
+        turn_start_messages = list(messages)
+        
         # Add user message to context
         messages.append({"role": "user", "content": user_input})
+        llm_calls_before_turn = len(budget.tokens_sent)
         
         try:
-            # Track tool calls for path visualization
-            tool_call_count = 0
-            
-            # Show spinner while waiting for initial response
-            with console.status("[bold green]Thinking...", spinner="dots"):
-                response_message = call_llm(messages, client, tool_schemas, model)
-            
-            # Handle tool calls in a loop until we get a final response
-            while response_message.tool_calls:
-                # Add the assistant's response (with tool call) to messages
-                messages.append(response_message)
-                
-                # Execute each tool call
-                for tool_call in response_message.tool_calls:
-                    tool_call_count += 1
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    console.print(
-                        f"[cyan]🔧 Tool Call {tool_call_count}: {function_name}"
-                        f"({', '.join(f'{k}={v}' for k, v in function_args.items())})"
-                        f"[/cyan]"
-                    )
-                    
-                    # Execute the tool using the tool_functions dictionary
-                    tool_result = execute_tool_call(tool_call, tool_functions)
-                    
-                    # Show tool result briefly
-                    console.print(f"[green]  ✓ {json.dumps(tool_result, indent=2)}[/green]")
-                    
-                    # Add tool result to messages
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(tool_result)
-                    })
-                
-                # Get the next response from the model
-                elapsed = time.time() - start_time
-                with console.status(f"[bold green]Processing... ({elapsed:.1f}s elapsed)", spinner="dots"):
-                    response_message = call_llm(messages, client, tool_schemas, model)
+            if stream:
+                # Stream the turn: text is printed as it arrives and tools start as soon as their arguments are complete
+                turn = loop.run_until_complete(stream_agent_turn(
+                    messages, client, TOOL_SCHEMAS, TOOL_FUNCTIONS, model, console, max_concurrency, cache, recorder,
+                    budget, tracer, prefetcher, resilience
+                ))
+                tool_call_count = turn["tool_call_count"]
+                console.print(
+                    f"[blue italic]Time to first token: {turn['time_to_first_token']:.2f}s, "
+                    f"total latency: {turn['total']:.2f}s ({turn['llm_call_count']} LLM call(s))[/blue italic]"
+                )
+            else:
+                response_message, stats = run_agent_turn(
+                    messages, client, TOOL_SCHEMAS, TOOL_FUNCTIONS, model, console, max_concurrency, cache, recorder,
+                    budget, tracer, prefetcher, resilience
+                )
+                tool_call_count = stats["tool_calls"]
             
-            # We've exited the loop, so response_message contains the final text response
-            console.print("[dim]Assistant ➜[/dim] ", end='')
-            render_response(response_message.content, console)
+                # Calculate and show total elapsed time
+                total_time = time.time() - start_time
+                console.print(f"[blue italic]Total processing time: {total_time:.2f}s[/blue italic]")
             
-            # Add final response to context
-            messages.append(response_message)
-            
-            # Calculate and show total elapsed time
-            total_time = time.time() - start_time
-            console.print(f"[blue italic]Total processing time: {total_time:.2f}s[/blue italic]")
+            # Show how long the first question took, the one a cold model server slows down
+            if first_turn:
+                first_turn_time = time.time() - start_time
+                if warm_ups:
+                    console.print(f"[dim]First turn: {first_turn_time:.2f}s with warm-up, "
+                                  f"{warm_up_wait:.2f}s of it waiting for it[/dim]")
+                    for warm_up in warm_ups:
+                        console.print(f"[dim]{warm_up.summary()}[/dim]")
+                else:
+                    console.print(f"[dim]First turn: {first_turn_time:.2f}s without warm-up "
+                                  f"(--warm-up loads the model while you type)[/dim]")
+                first_turn = False
             
             # Show summary
             if tool_call_count > 0:
                 console.print(f"[yellow italic]({tool_call_count} tool call(s) executed)[/yellow italic]")
+            console.print(f"[dim]{budget.summary(since=llm_calls_before_turn)}[/dim]")
             
             if show_messages:
                 print_messages(messages, console)
         
+        except KeyboardInterrupt:
+            # Ctrl-C cancels the turn, not the session
+            console.print("\n[yellow]Cancelled[/yellow]")
+            if stream:
+                cancel_pending(loop)
+            messages[:] = turn_start_messages
+        
         except Exception as e:
             console.print(f"[bold red]Error:[/bold red] {e}")
-            # Remove the last user message on error
-            if messages and messages[-1].get("role") == "user":
-                messages.pop()
+            # Keep the question and every tool result that finished (only an unanswered
+            # tool call is dropped), and note for the model why the turn stopped
+            drop_unanswered_tool_calls(messages)
+            messages.append({"role": "assistant", "content": f"(This turn stopped early: {e})"})
         
         console.print()
 
 def main_wrapper():
-    import sys
+    import argparse
     
-    # Check if --show-messages flag is provided
-    show_messages = '--show-messages' in sys.argv
-
-    # Check if --local flag is provided
-    model = "qwen3:8b" if '--local' in sys.argv else "gpt-4"
+    parser = argparse.ArgumentParser(description="Genomics agent for genetic diagnosis")
+    parser.add_argument('--show-messages', action='store_true', help="print the accumulated messages after each turn")
+    parser.add_argument('--local', action='store_true', help="use qwen3:8b served by Ollama instead of gpt-4")
+    parser.add_argument('--max-concurrency', type=int, default=MAX_TOOL_CONCURRENCY,
+                        help="maximum number of tool calls from one turn that run at the same time")
+    parser.add_argument('--stream', action='store_true',
+                        help="stream tokens as they are generated and report time to first token")
+    parser.add_argument('--tool-cache', metavar='PATH',
+                        help="SQLite file that persists cached tool results across sessions")
+    parser.add_argument('--context-budget', type=int, metavar='TOKENS',
+                        help="keep the prompt under this many (estimated) tokens by compacting old tool results "
+                             "and evicting old turns")
+    parser.add_argument('--disease-genes', metavar='PATH',
+                        help="disease-gene association TSV (e.g. HPO phenotype_to_genes.txt) for search_disease_genes; "
+                             "its index is cached next to it")
+    parser.add_argument('--vcf', metavar='PATH',
+                        help="patient VCF for check_variant: sorted .vcf (indexed on first use) or "
+                             "tabix-indexed .vcf.gz (needs pysam)")
+    parser.add_argument('--gene-intervals', metavar='PATH',
+                        help="BED-like file of chrom, start, end, gene used to turn genes into regions")
+    parser.add_argument('--frequency-index', metavar='PREFIX',
+                        help="population frequency index built with python -m tools.frequency_index")
+    parser.add_argument('--clinvar-db', metavar='PATH',
+                        help="ClinVar SQLite database built with python -m tools.clinvar_store")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="append a JSONL span for every LLM call, tool call and render to this file")
+    parser.add_argument('--prefetch', action='store_true',
+                        help="start frequency and ClinVar lookups as soon as check_variant finds a variant")
+    parser.add_argument('--warm-up', action='store_true',
+                        help="load the model and prime the tool schemas in the background at startup")
+    parser.add_argument('--endpoints', nargs='+', metavar='URL',
+                        help="OpenAI-compatible endpoints to load-balance across, e.g. http://node1:11434/v1 "
+                             "http://node2:11434/v1")
+    parser.add_argument('--model', help="model name to request from --endpoints, e.g. qwen3-coder-next:q8_0")
+    parser.add_argument('--tool-deadline', type=float, default=DEFAULT_TOOL_DEADLINE, metavar='SECONDS',
+                        help="give up on a tool call after this long (0: never)")
+    parser.add_argument('--llm-deadline', type=float, default=DEFAULT_LLM_DEADLINE, metavar='SECONDS',
+                        help="give up on an LLM call after this long (0: never)")
+    parser.add_argument('--tool-retries', type=int, default=DEFAULT_TOOL_RETRIES,
+                        help="retries, with jittered backoff, of a lookup that timed out or hit a transient error")
+    parser.add_argument('--hedge', action='store_true',
+                        help="send a duplicate LLM request when a call is slower than the recent p95")
+    recording = parser.add_mutually_exclusive_group()
+    recording.add_argument('--record', metavar='PATH',
+                           help="record every LLM request and completion to a JSONL file")
+    recording.add_argument('--replay', metavar='PATH',
+                           help="serve LLM completions from a recording, failing on any unrecorded request")
+    args = parser.parse_args()
+    if args.model and not args.endpoints:
+        parser.error("--model requires --endpoints")
+    
+    model = args.model or ("qwen3:8b" if args.local else "gpt-4")
     
-    main(show_messages, model)
+    main(
+        args.show_messages, model,
+        max_concurrency=args.max_concurrency,
+        stream=args.stream,
+        tool_cache_path=args.tool_cache,
+        record_path=args.record,
+        replay_path=args.replay,
+        context_budget=args.context_budget,
+        trace_path=args.trace,
+        vcf_path=args.vcf,
+        gene_intervals_path=args.gene_intervals,
+        frequency_index_path=args.frequency_index,
+        clinvar_db_path=args.clinvar_db,
+        disease_genes_path=args.disease_genes,
+        prefetch=args.prefetch,
+        warm_up=args.warm_up,
+        endpoints=args.endpoints,
+        tool_deadline=args.tool_deadline or None,
+        llm_deadline=args.llm_deadline or None,
+        tool_retries=args.tool_retries,
+        hedge=args.hedge
+    )
 
 if __name__ == '__main__':
     main_wrapper()
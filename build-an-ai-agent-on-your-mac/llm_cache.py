@@ -0,0 +1,90 @@
+"""
+Record/replay store for LLM completions.
+
+In record mode each request (model, messages and tool schemas) is hashed
+canonically and stored with its completion in a JSONL file. In replay mode
+requests are answered from that file without calling the LLM, and a request
+that was never recorded raises ReplayMissError, so scripted end-to-end runs
+are deterministic and need no model server.
+"""
+
+import hashlib
+import json
+import threading
+
+from openai.types.chat import ChatCompletionMessage
+
+from util import message_to_dict
+
+RECORD = "record"
+REPLAY = "replay"
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a request has no recorded completion"""
+
+def request_hash(model, messages, tool_schemas=None):
+    """SHA-256 of the canonical JSON form of an LLM request"""
+    request = {
+        "model": model,
+        "messages": [message_to_dict(message) for message in messages],
+        "tools": tool_schemas or []
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class LLMRecorder:
+    """Records completions to, or replays them from, a JSONL file"""
+
+    def __init__(self, path, mode):
+        """
+        Args:
+            path: JSONL file of recorded completions (appended to in record mode)
+            mode: RECORD or REPLAY
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unsupported mode {mode}")
+        self.path = path
+        self.mode = mode
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self._completions = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as handle:
+                for line in handle:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._completions[entry["hash"]] = entry["completion"]
+        except FileNotFoundError:
+            if mode == REPLAY:
+                raise
+
+    def replay(self, model, messages, tool_schemas=None):
+        """Return the recorded completion for a request, or raise ReplayMissError"""
+        key = request_hash(model, messages, tool_schemas)
+        with self._lock:
+            completion = self._completions.get(key)
+            if completion is None:
+                self.stats["misses"] += 1
+                raise ReplayMissError(
+                    f"No recorded completion for request {key[:12]} "
+                    f"({model}, {len(messages)} message(s)) in {self.path}"
+                )
+            self.stats["hits"] += 1
+        return ChatCompletionMessage.model_validate(completion)
+
+    def record(self, model, messages, tool_schemas, message):
+        """Store the completion of a request"""
+        key = request_hash(model, messages, tool_schemas)
+        completion = message_to_dict(message)
+        entry = {"hash": key, "model": model, "message_count": len(messages), "completion": completion}
+        with self._lock:
+            self._completions[key] = completion
+            with open(self.path, 'a') as handle:
+                handle.write(json.dumps(entry) + "\n")
+            self.stats["recorded"] += 1
+
+    def summary(self):
+        return (
+            f"LLM {self.mode}: {self.stats['hits']} replayed, {self.stats['misses']} missed, "
+            f"{self.stats['recorded']} recorded ({self.path})"
+        )
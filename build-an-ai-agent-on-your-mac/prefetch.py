@@ -0,0 +1,181 @@
+"""
+Speculative prefetch of the lookups a model usually asks for next.
+
+When check_variant finds a variant, the model's next step is almost always
+check_population_frequency and query_clinvar on it, one LLM round trip
+later. A Prefetcher sees each tool result as soon as it is produced, starts
+those follow-up lookups on a background thread, and parks their results for
+a short while. When the model's call arrives it is served from there,
+waiting only for whatever part of the lookup is still running.
+
+Speculation costs tool time that is wasted whenever the model does not ask,
+so the prefetcher counts hits, misses and wasted lookups.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tool_cache import make_key
+
+# Seconds a prefetched result waits for the model's call
+DEFAULT_TTL = 120
+
+DEFAULT_MAX_ENTRIES = 256
+
+# Variants of one check_variant result whose follow-ups are prefetched
+MAX_PREFETCHED_VARIANTS = 3
+
+def variant_follow_ups(result):
+    """Frequency and ClinVar lookups of the variants a check_variant result found"""
+    for variant in result.get("variants", [])[:MAX_PREFETCHED_VARIANTS]:
+        yield "check_population_frequency", {"variant": variant["variant_id"]}
+        yield "query_clinvar", {"variant": variant["variant_id"]}
+
+def batch_variant_follow_ups(result):
+    """Batched frequency and ClinVar lookups of the variants a check_variants result found"""
+    if result.get("variant_ids"):
+        yield "check_population_frequencies", {"variants": result["variant_ids"]}
+        yield "query_clinvar_batch", {"variants": result["variant_ids"]}
+
+# Tool name -> function of its result yielding the (tool name, arguments) calls likely to follow
+DEFAULT_FOLLOW_UPS = {
+    "check_variant": variant_follow_ups,
+    "check_variants": batch_variant_follow_ups
+}
+
+class Prefetcher:
+    """Runs likely follow-up tool calls in the background and serves them when asked"""
+
+    def __init__(self, tool_functions, follow_ups=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_workers=2, cache=None):
+        """
+        Args:
+            tool_functions: Dictionary mapping function names to function objects
+            follow_ups: Dictionary mapping tool names to functions of their
+                result that yield (tool name, arguments) follow-up calls
+                (defaults to DEFAULT_FOLLOW_UPS)
+            ttl: Seconds a prefetched result is kept
+            max_entries: Maximum number of prefetched results kept
+            max_workers: Background threads running the lookups
+            cache: Optional ToolCache; calls it already holds are not prefetched,
+                and served results are stored in it
+        """
+        self.tool_functions = tool_functions
+        self.follow_ups = DEFAULT_FOLLOW_UPS if follow_ups is None else follow_ups
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache = cache
+        self.prefetched_tools = set()
+        self.stats = {"started": 0, "hits": 0, "misses": 0, "wasted": 0, "wasted_time": 0.0, "saved_time": 0.0}
+        self._entries = OrderedDict()
+        # Reentrant: a wasted lookup's done callback may run while the lock is held
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+
+    def _run(self, function_name, arguments):
+        start = time.perf_counter()
+        result = self.tool_functions[function_name](**arguments)
+        return result, time.perf_counter() - start
+
+    def observe(self, function_name, result):
+        """Start the follow-up lookups suggested by a tool's result"""
+        rule = self.follow_ups.get(function_name)
+        if rule is None or not isinstance(result, dict) or "error" in result:
+            return
+        for follow_up, arguments in rule(result):
+            if follow_up not in self.tool_functions:
+                continue
+            self.prefetched_tools.add(follow_up)
+            if self.cache is not None and self.cache.contains(follow_up, arguments):
+                continue
+            key = make_key(follow_up, arguments)
+            with self._lock:
+                self._expire(time.time())
+                if key in self._entries:
+                    continue
+                future = self._executor.submit(self._run, follow_up, arguments)
+                self._entries[key] = (time.time() + self.ttl, future)
+                self.stats["started"] += 1
+                while len(self._entries) > self.max_entries:
+                    self._waste(self._entries.popitem(last=False)[1][1])
+
+    def take(self, function_name, arguments, timeout=None):
+        """
+        Claim a prefetched result, waiting for it if its lookup is still running.
+
+        Args:
+            timeout: Seconds to wait for a running lookup before giving up on it
+
+        Returns:
+            (found, result) tuple
+        """
+        if function_name not in self.prefetched_tools:
+            return False, None
+        key = make_key(function_name, arguments)
+        with self._lock:
+            self._expire(time.time())
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                # Calls the tool cache answers are not misses of the prefetcher
+                if self.cache is None or not self.cache.contains(function_name, arguments):
+                    self.stats["misses"] += 1
+                return False, None
+            self.stats["hits"] += 1
+        start = time.perf_counter()
+        try:
+            result, elapsed = entry[1].result(timeout=timeout)
+        except Exception:
+            # A lookup that failed or is stuck is run again by the caller, so its time is wasted
+            with self._lock:
+                self.stats["hits"] -= 1
+                self.stats["misses"] += 1
+                self._waste(entry[1])
+            return False, None
+        # The model's call only waited for the part of the lookup still running
+        with self._lock:
+            self.stats["saved_time"] += max(elapsed - (time.perf_counter() - start), 0.0)
+        if self.cache is not None:
+            self.cache.put(function_name, arguments, result)
+        return True, result
+
+    def _expire(self, now):
+        while self._entries:
+            key, (expires_at, future) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+            self._waste(future)
+
+    def _waste(self, future):
+        """Count a prefetched lookup nobody asked for, or one abandoned; a running one adds its time when it ends"""
+        self.stats["wasted"] += 1
+        if not future.cancel():
+            future.add_done_callback(self._add_wasted_time)
+
+    def _add_wasted_time(self, future):
+        if not future.cancelled() and future.exception() is None:
+            with self._lock:
+                self.stats["wasted_time"] += future.result()[1]
+
+    def summary(self):
+        """One-line description of the prefetch counters"""
+        with self._lock:
+            self._expire(time.time())
+            pending = len(self._entries)
+            calls = self.stats["hits"] + self.stats["misses"]
+            hit_rate = self.stats["hits"] / calls if calls else 0.0
+            return (
+                f"Prefetch: {self.stats['started']} lookup(s) started, {self.stats['hits']} served "
+                f"({hit_rate:.0%} of {calls} follow-up call(s)), saving {self.stats['saved_time'] * 1e3:.1f} ms of tool time; "
+                f"{self.stats['wasted']} wasted ({self.stats['wasted_time'] * 1e3:.1f} ms of tool time), "
+                f"{pending} unclaimed"
+            )
+
+    def close(self):
+        """Stop background lookups, counting the unclaimed ones as wasted"""
+        with self._lock:
+            while self._entries:
+                self._waste(self._entries.popitem(last=False)[1][1])
+        self._executor.shutdown(wait=False, cancel_futures=True)
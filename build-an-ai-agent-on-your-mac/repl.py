@@ -1,8 +1,10 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from rich.console import Console
 from rich.panel import Panel
+import asyncio
 
 from util import render_response, print_messages
+from streaming import call_llm_stream
 
 def call_llm(messages, client): 
     response = client.chat.completions.create(
@@ -11,12 +13,17 @@ def call_llm(messages, client):
     )
     return response.choices[0].message.content
 
-def main(show_messages): 
+def main(show_messages, stream=False): 
     # Initialize Rich console
     console = Console()
 
     # Initialize client
-    client = OpenAI()
+    if stream:
+        # Streaming responses share one event loop for the whole session
+        client = AsyncOpenAI()
+        loop = asyncio.new_event_loop()
+    else:
+        client = OpenAI()
     
     # Initialize context (message history)
     messages = []
@@ -46,13 +53,27 @@ def main(show_messages):
         
         # Get LLM response
         try:
-            # Show spinner while waiting for response
-            with console.status("[bold green]Thinking...", spinner="dots"):
-                response = call_llm(messages, client)
-            
-            # Assistant prompt and response
-            console.print("[dim]Assistant ➜[/dim] ", end='')
-            render_response(response, console)
+            if stream:
+                # Print the response as it arrives
+                console.print("[dim]Assistant ➜[/dim] ", end='')
+                response_message, timing = loop.run_until_complete(call_llm_stream(
+                    messages, client,
+                    on_text=lambda text: console.print(text, end='', markup=False, highlight=False)
+                ))
+                response = response_message.content
+                console.print()
+                console.print(
+                    f"[blue italic]Time to first token: {timing['time_to_first_token']:.2f}s, "
+                    f"total latency: {timing['total']:.2f}s[/blue italic]"
+                )
+            else:
+                # Show spinner while waiting for response
+                with console.status("[bold green]Thinking...", spinner="dots"):
+                    response = call_llm(messages, client)
+                
+                # Assistant prompt and response
+                console.print("[dim]Assistant ➜[/dim] ", end='')
+                render_response(response, console)
             
             # Add assistant response to context
             messages.append({"role": "assistant", "content": response})
@@ -67,4 +88,5 @@ def main(show_messages):
         console.print()
 
 if __name__ == '__main__': 
-    main(show_messages=False)
\ No newline at end of file
+    import sys
+    main(show_messages=False, stream='--stream' in sys.argv)
\ No newline at end of file
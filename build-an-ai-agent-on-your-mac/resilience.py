@@ -0,0 +1,208 @@
+"""
+Deadlines, retries and hedged requests for LLM and tool calls.
+
+A Resilience policy is handed to the agent turn like the tool cache and the
+tracer. Tool calls run under a deadline; a call that misses it is abandoned
+(Python threads cannot be killed) and the model gets an error result instead
+of the REPL hanging. Idempotent lookups that time out or hit a transient
+error (OSError, a locked SQLite database) are retried with jittered
+exponential backoff; any other error is returned to the model at once. LLM
+calls get a deadline too, passed on as the request timeout so the connection
+is closed and the server stops generating. A blocking LLM call can also be
+hedged: if it has not answered after the p95 of recent LLM latencies, a
+duplicate request is sent (through a Router, to another backend) and
+whichever answers first is used. Every timeout, retry and hedge is counted.
+"""
+
+import asyncio
+import contextvars
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+from openai import APITimeoutError
+
+from tool_cache import DEFAULT_TTLS
+
+# Seconds a tool call or an LLM call may take
+DEFAULT_TOOL_DEADLINE = 30.0
+DEFAULT_LLM_DEADLINE = 300.0
+
+# Retries of an idempotent tool call, and the backoff between them
+DEFAULT_TOOL_RETRIES = 2
+BACKOFF = 0.1
+MAX_BACKOFF = 2.0
+
+# Errors worth retrying: a dropped connection or a database locked by another writer
+TRANSIENT_ERRORS = (OSError, sqlite3.OperationalError)
+
+# Every cacheable tool is a read-only lookup, so it is safe to run twice
+IDEMPOTENT_TOOLS = set(DEFAULT_TTLS)
+
+# Hedge after this percentile of recent LLM latencies, once there are enough of them
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+class DeadlineExceeded(TimeoutError):
+    """An LLM call did not finish within its deadline"""
+
+def in_thread(function, *args, **kwargs):
+    """
+    Start function on a daemon thread, in a copy of the current context.
+
+    A daemon thread rather than an executor, so that an abandoned call never
+    keeps the interpreter from exiting.
+
+    Returns:
+        Future of the function's result
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(function, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+class Resilience:
+    """Deadlines, retries and hedging policy, with counters of each"""
+
+    def __init__(self, tool_deadline=DEFAULT_TOOL_DEADLINE, llm_deadline=DEFAULT_LLM_DEADLINE,
+                 tool_retries=DEFAULT_TOOL_RETRIES, hedge=False, idempotent_tools=IDEMPOTENT_TOOLS):
+        """
+        Args:
+            tool_deadline: Seconds a tool call may take (None: no deadline)
+            llm_deadline: Seconds an LLM call may take (None: no deadline)
+            tool_retries: Retries of an idempotent tool call that raised or timed out
+            hedge: Send a duplicate LLM request when a blocking call is slower than recent p95
+            idempotent_tools: Names of the tools that are safe to retry
+        """
+        self.tool_deadline = tool_deadline
+        self.llm_deadline = llm_deadline
+        self.tool_retries = tool_retries
+        self.hedge = hedge
+        self.idempotent_tools = idempotent_tools
+        self.metrics = {
+            "llm_calls": 0, "llm_timeouts": 0, "hedges": 0, "hedge_wins": 0,
+            "tool_calls": 0, "tool_timeouts": 0, "tool_retries": 0, "tool_failures": 0
+        }
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def _count(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def backoff(self, attempt):
+        """Seconds to wait before a retry: full jitter over an exponentially growing window"""
+        return random.uniform(0, min(MAX_BACKOFF, BACKOFF * 2 ** (attempt - 1)))
+
+    def call_tool(self, function_name, function, arguments):
+        """
+        Run a tool under the tool deadline, retrying idempotent lookups that time out
+        or hit a transient error; any other error fails the call at once.
+
+        Returns:
+            (result, completed) tuple; completed is False when every attempt
+            failed and result is an error dictionary for the model
+        """
+        self._count("tool_calls")
+        attempts = 1 + (self.tool_retries if function_name in self.idempotent_tools else 0)
+        for attempt in range(attempts):
+            if attempt:
+                self._count("tool_retries")
+                time.sleep(self.backoff(attempt))
+            future = in_thread(function, **arguments)
+            try:
+                return future.result(timeout=self.tool_deadline), True
+            except FutureTimeoutError:
+                self._count("tool_timeouts")
+                error = f"timed out after {self.tool_deadline:g}s"
+            except TRANSIENT_ERRORS as e:
+                error = f"{type(e).__name__}: {e}"
+            except Exception as e:
+                # A bad argument or a bug fails the same way every time
+                self._count("tool_failures")
+                return {"error": f"{function_name} failed: {type(e).__name__}: {e}"}, False
+        self._count("tool_failures")
+        return {"error": f"{function_name} failed after {attempts} attempt(s): {error}"}, False
+
+    def hedge_threshold(self):
+        """Seconds after which a blocking LLM call is hedged, or None"""
+        with self._lock:
+            if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return float(np.percentile(self._latencies, HEDGE_PERCENTILE))
+
+    def call_llm(self, create, params, create_hedge=None):
+        """
+        Run create(**params), a blocking chat completions call, under the LLM
+        deadline, hedged with a duplicate request if it is slow. The duplicate
+        goes through create_hedge if given (a Router's, which sends it to
+        another backend), otherwise through create.
+        """
+        self._count("llm_calls")
+        if self.llm_deadline:
+            params = dict(params, timeout=self.llm_deadline)
+        start = time.perf_counter()
+        first = in_thread(create, **params)
+        pending = {first}
+
+        threshold = self.hedge_threshold()
+        if threshold is not None and not wait(pending, timeout=threshold).done:
+            self._count("hedges")
+            pending.add(in_thread(create_hedge or create, **params))
+
+        while pending:
+            remaining = None if not self.llm_deadline else max(self.llm_deadline - (time.perf_counter() - start), 0)
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                self._count("llm_timeouts")
+                raise DeadlineExceeded(f"LLM call exceeded its {self.llm_deadline:g}s deadline")
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self._count("hedge_wins")
+                    with self._lock:
+                        self._latencies.append(time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+        if isinstance(error, APITimeoutError):
+            self._count("llm_timeouts")
+        raise error
+
+    async def call_llm_async(self, call):
+        """Await an async LLM call (a coroutine) under the LLM deadline"""
+        self._count("llm_calls")
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call, self.llm_deadline or None)
+        except (asyncio.TimeoutError, APITimeoutError):
+            self._count("llm_timeouts")
+            raise DeadlineExceeded(f"LLM call exceeded its {self.llm_deadline:g}s deadline") from None
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return result
+
+    def summary(self):
+        """One-line description of the timeouts, retries and hedges"""
+        with self._lock:
+            metrics = dict(self.metrics)
+        return (
+            f"Resilience: {metrics['llm_calls']} LLM call(s), {metrics['llm_timeouts']} timed out, "
+            f"{metrics['hedges']} hedged ({metrics['hedge_wins']} won by the hedge); "
+            f"{metrics['tool_calls']} tool call(s), {metrics['tool_timeouts']} timed out, "
+            f"{metrics['tool_retries']} retried, {metrics['tool_failures']} failed"
+        )
@@ -0,0 +1,338 @@
+"""
+Route LLM calls across several OpenAI-compatible endpoints.
+
+A Router stands in for an OpenAI client (it has chat.completions.create) in
+front of several model servers, such as Ollama on a few cluster nodes. Each
+conversation, identified by its first message, stays on the backend that
+first served it, so that backend's prefix (KV) cache stays warm for it. A new
+conversation goes to the healthy backend with the fewest requests in flight.
+
+A background thread probes every backend's /models endpoint. A backend that
+fails a probe, or fails a request with a connection error or a 5xx status, is
+taken out of rotation until a probe succeeds again, and the failed request is
+retried on another backend. Conversations on it move to another backend.
+
+A streamed call stays in flight on its backend until its stream is exhausted,
+closed or fails, so a backend busy generating long streamed completions does
+not look idle; an error partway through a stream counts as a backend failure.
+
+A hedged duplicate of a slow call (see resilience.py) goes through
+create_hedge, which sends it to a different backend than the conversation's,
+since the conversation's backend is the one being slow; once the hedge has
+answered, the conversation moves to the hedge's backend.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+
+import numpy as np
+from openai import APIConnectionError, APIStatusError
+
+from clients import make_client
+
+# Seconds between health probes, and how long a probe may take
+PROBE_INTERVAL = 10
+PROBE_TIMEOUT = 2.0
+
+# Conversation -> backend assignments remembered
+MAX_CONVERSATIONS = 10_000
+
+# Recent request latencies kept per backend for percentiles
+LATENCY_WINDOW = 1000
+
+def conversation_key(messages):
+    """Identify a conversation by its first message"""
+    first = messages[0]
+    if isinstance(first, dict):
+        role, content = first.get("role"), first.get("content")
+    else:
+        role, content = first.role, first.content
+    return hashlib.sha1(f"{role}\0{content}".encode()).hexdigest()
+
+def is_failover_error(error):
+    """Whether a failed request should be retried on another backend"""
+    # APIConnectionError includes timeouts
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+class RoutedStream:
+    """A streamed response that keeps its call in flight until the stream ends"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._iterator = iter(stream)
+        self._release = release
+
+    def _finish(self, error=None):
+        # Release the call once, however the stream ends
+        release, self._release = self._release, None
+        if release is not None:
+            release(error)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._finish(e)
+            raise
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class AsyncRoutedStream:
+    """An async streamed response that keeps its call in flight until the stream ends"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._release = release
+
+    def _finish(self, error=None):
+        release, self._release = self._release, None
+        if release is not None:
+            release(error)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._finish(e)
+            raise
+        except BaseException:
+            # Cancelled (e.g. past the LLM deadline): stop the generation too
+            await self.close()
+            raise
+
+    async def close(self):
+        try:
+            await self._stream.close()
+        finally:
+            self._finish()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+class Backend:
+    """One endpoint and its counters"""
+
+    def __init__(self, base_url, api_key, asynchronous=False):
+        self.base_url = base_url
+        # No retries against a single backend: the router fails over instead
+        client_kwargs = {"base_url": base_url, "api_key": api_key, "max_retries": 0}
+        self.client = make_client(client_kwargs, asynchronous)
+        self.probe_client = make_client(dict(client_kwargs, timeout=PROBE_TIMEOUT))
+        self.healthy = True
+        self.outstanding = 0
+        self.peak_outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+class Router:
+    """Sticky, least-outstanding-requests routing of chat completions with health checks and failover"""
+
+    def __init__(self, base_urls, api_key="ollama", asynchronous=False, probe_interval=PROBE_INTERVAL):
+        """
+        Args:
+            base_urls: OpenAI-compatible base URLs, e.g. http://node1:11434/v1
+            api_key: API key sent to every backend
+            asynchronous: Route AsyncOpenAI calls (create is then awaited)
+            probe_interval: Seconds between health probes
+        """
+        if not base_urls:
+            raise ValueError("Router needs at least one endpoint")
+        self.backends = [Backend(base_url, api_key, asynchronous) for base_url in base_urls]
+        self.conversations = OrderedDict()
+        self.stats = {"calls": 0, "sticky": 0, "failovers": 0, "hedges": 0}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        # Looks like client.chat.completions.create to call_llm and stream_agent_turn
+        create = self._create_async if asynchronous else self._create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create, create_hedge=self._create_hedge))
+        self._prober = threading.Thread(target=self._probe_loop, args=(probe_interval,), name="router-probe",
+                                        daemon=True)
+        self._prober.start()
+
+    def probe(self):
+        """Check every backend's /models endpoint and update its health"""
+        for backend in self.backends:
+            try:
+                backend.probe_client.models.list()
+                healthy = True
+            except Exception:
+                healthy = False
+            with self._lock:
+                backend.healthy = healthy
+
+    def _probe_loop(self, interval):
+        self.probe()
+        while not self._closed.wait(interval):
+            self.probe()
+
+    def _acquire(self, key, tried, hedge=False):
+        """
+        Pick the backend for a conversation's next call and count the call as in flight.
+        A hedge avoids the conversation's backend, and does not move the conversation.
+        """
+        with self._lock:
+            sticky = self.conversations.get(key)
+            if not hedge and sticky is not None and sticky.healthy and sticky not in tried:
+                backend = sticky
+                self.conversations.move_to_end(key)
+                self.stats["sticky"] += 1
+            else:
+                avoid = tried + [sticky] if hedge else tried
+                candidates = [backend for backend in self.backends if backend.healthy and backend not in avoid]
+                if not candidates:
+                    # Every backend left looks down; the probes may be stale, so try them anyway
+                    candidates = [backend for backend in self.backends if backend not in avoid]
+                if not candidates and hedge:
+                    # A single backend: the hedge can only go to the conversation's own
+                    candidates = [backend for backend in self.backends if backend not in tried]
+                if not candidates:
+                    return None
+                backend = min(candidates, key=lambda backend: (backend.outstanding, backend.requests))
+                if not hedge:
+                    self.conversations[key] = backend
+                    self.conversations.move_to_end(key)
+                    while len(self.conversations) > MAX_CONVERSATIONS:
+                        self.conversations.popitem(last=False)
+            if hedge and not tried:
+                self.stats["hedges"] += 1
+            if tried:
+                self.stats["failovers"] += 1
+            self.stats["calls"] += 1
+            backend.outstanding += 1
+            backend.peak_outstanding = max(backend.peak_outstanding, backend.outstanding)
+            return backend
+
+    def _release(self, backend, start, error=None):
+        """Record a finished call; a backend that failed is out of rotation until its next good probe"""
+        with self._lock:
+            backend.outstanding -= 1
+            backend.requests += 1
+            if error is None:
+                backend.latencies.append(time.perf_counter() - start)
+                return False
+            backend.failures += 1
+            if is_failover_error(error):
+                backend.healthy = False
+                return True
+            return False
+
+    def _create(self, hedge=False, **params):
+        key = conversation_key(params["messages"])
+        tried = []
+        while True:
+            backend = self._acquire(key, tried, hedge)
+            if backend is None:
+                raise error
+            start = time.perf_counter()
+            try:
+                response = backend.client.chat.completions.create(**params)
+            except Exception as e:
+                if not self._release(backend, start, e):
+                    raise
+                tried.append(backend)
+                error = e
+                continue
+            if params.get("stream"):
+                return RoutedStream(response, lambda error: self._release(backend, start, error))
+            self._release(backend, start)
+            if hedge:
+                self._move(key, backend)
+            return response
+
+    def _move(self, key, backend):
+        """Move a conversation to the backend that answered its hedge, away from the slow one"""
+        with self._lock:
+            self.conversations[key] = backend
+            self.conversations.move_to_end(key)
+
+    def _create_hedge(self, **params):
+        """A duplicate of a slow call, sent to another backend than the conversation's"""
+        return self._create(hedge=True, **params)
+
+    async def _create_async(self, **params):
+        key = conversation_key(params["messages"])
+        tried = []
+        while True:
+            backend = self._acquire(key, tried)
+            if backend is None:
+                raise error
+            start = time.perf_counter()
+            try:
+                response = await backend.client.chat.completions.create(**params)
+            except Exception as e:
+                if not self._release(backend, start, e):
+                    raise
+                tried.append(backend)
+                error = e
+                continue
+            if params.get("stream"):
+                return AsyncRoutedStream(response, lambda error: self._release(backend, start, error))
+            self._release(backend, start)
+            return response
+
+    def summary(self):
+        """Per-backend health, queue depth and latency"""
+        with self._lock:
+            lines = [f"{'backend':<36} {'health':>7} {'in flight':>9} {'peak':>5} {'calls':>6} {'failed':>6} "
+                     f"{'p50 ms':>8} {'p95 ms':>8}"]
+            for backend in self.backends:
+                if backend.latencies:
+                    p50, p95 = np.percentile(backend.latencies, [50, 95]) * 1e3
+                    latency = f"{p50:>8.1f} {p95:>8.1f}"
+                else:
+                    latency = f"{'-':>8} {'-':>8}"
+                lines.append(
+                    f"{backend.base_url:<36} {'up' if backend.healthy else 'down':>7} {backend.outstanding:>9} "
+                    f"{backend.peak_outstanding:>5} {backend.requests:>6} {backend.failures:>6} {latency}"
+                )
+            lines.append(
+                f"Routing: {self.stats['calls']} call(s), {self.stats['sticky']} kept on their conversation's "
+                f"backend, {self.stats['failovers']} failed over, {self.stats['hedges']} hedge(s) sent to another backend, "
+                f"{len(self.conversations)} conversation(s)"
+            )
+            return "\n".join(lines)
+
+    def close(self):
+        """Stop the health probes"""
+        self._closed.set()
@@ -0,0 +1,228 @@
+"""
+Async, token-streaming agent loop.
+
+Completions are requested with stream=True, so assistant text reaches the
+console as it is generated, and each tool call starts executing as soon as
+its arguments are complete instead of after the whole response has arrived.
+"""
+
+import asyncio
+import json
+import time
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+
+from util import execute_tool_call, MAX_TOOL_CONCURRENCY
+from tracing import maybe_span, maybe_turn
+
+async def call_llm_stream(messages, client, tool_schemas=None, model="gpt-4", on_text=None, on_tool_call=None,
+                          recorder=None, tracer=None):
+    """
+    Call the LLM with stream=True and assemble the response incrementally.
+
+    Tool calls arrive as deltas keyed by index; a call's arguments are
+    complete once a delta for a later index arrives, or the stream ends.
+
+    Args:
+        messages: Conversation so far
+        client: An AsyncOpenAI client
+        tool_schemas: Optional tool schemas
+        model: Model name
+        on_text: Called with each piece of assistant text as it arrives
+        on_tool_call: Called with each tool call as soon as it is complete
+        recorder: Optional LLMRecorder; in replay mode the recorded completion
+            is delivered through the callbacks without calling the LLM
+        tracer: Optional Tracer; the call is recorded as an "llm" span with
+            its time to first token and the token usage the server reports
+
+    Returns:
+        (message, timing): the assembled ChatCompletionMessage, and a dictionary
+        with time_to_first_token and total latency in seconds
+    """
+    params = {
+        "model": model,
+        "messages": messages,
+        "stream": True
+    }
+
+    if tool_schemas:
+        params["tools"] = tool_schemas
+        params["tool_choice"] = "auto"
+
+    if tracer is not None:
+        # Ask for a final usage chunk so the span has token counts
+        params["stream_options"] = {"include_usage": True}
+
+    with maybe_span(tracer, "llm", model, message_count=len(messages), stream=True) as span:
+        start = time.perf_counter()
+
+        if recorder is not None and recorder.mode == "replay":
+            message = recorder.replay(model, messages, tool_schemas)
+            if message.content and on_text:
+                on_text(message.content)
+            for tool_call in message.tool_calls or []:
+                if on_tool_call:
+                    on_tool_call(tool_call)
+            total = time.perf_counter() - start
+            span.update(replayed=True, time_to_first_token=total)
+            return message, {"time_to_first_token": total, "total": total}
+
+        first_token = None
+        content = []
+        tool_calls = {}
+        completed = set()
+
+        def complete(index):
+            completed.add(index)
+            if on_tool_call:
+                on_tool_call(ChatCompletionMessageToolCall.model_validate(tool_calls[index]))
+
+        stream = await client.chat.completions.create(**params)
+        # Closed however the loop ends, so the connection (and a router's in-flight count) is released
+        async with stream:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    span.update(prompt_tokens=chunk.usage.prompt_tokens,
+                                completion_tokens=chunk.usage.completion_tokens)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+
+                if first_token is None and (delta.content or delta.tool_calls):
+                    first_token = time.perf_counter() - start
+
+                if delta.content:
+                    content.append(delta.content)
+                    if on_text:
+                        on_text(delta.content)
+
+                for piece in delta.tool_calls or []:
+                    if piece.index not in tool_calls:
+                        # A new call starts, so every earlier call has all its arguments
+                        for index in sorted(set(tool_calls) - completed):
+                            complete(index)
+                        tool_calls[piece.index] = {
+                            "id": piece.id,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        }
+                    call = tool_calls[piece.index]
+                    if piece.id:
+                        call["id"] = piece.id
+                    if piece.function and piece.function.name:
+                        call["function"]["name"] += piece.function.name
+                    if piece.function and piece.function.arguments:
+                        call["function"]["arguments"] += piece.function.arguments
+
+        for index in sorted(set(tool_calls) - completed):
+            complete(index)
+
+        total = time.perf_counter() - start
+        message = ChatCompletionMessage.model_validate({
+            "role": "assistant",
+            "content": ''.join(content) or None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)] or None
+        })
+        if recorder is not None:
+            recorder.record(model, messages, tool_schemas, message)
+        span["time_to_first_token"] = total if first_token is None else first_token
+        return message, {
+            "time_to_first_token": span["time_to_first_token"],
+            "total": total
+        }
+
+async def stream_agent_turn(messages, client, tool_schemas, tool_functions, model, console,
+                            max_concurrency=MAX_TOOL_CONCURRENCY, cache=None, recorder=None, budget=None,
+                            tracer=None, prefetcher=None, resilience=None):
+    """
+    Run one user turn with streaming: call the LLM, execute tool calls as they
+    complete, and repeat until the model answers in text.
+
+    Assistant text is printed as it streams in. The final assistant message is
+    appended to messages along with every intermediate tool exchange. With a
+    tracer, the turn and its LLM, tool and render spans are recorded. With a
+    Resilience policy, LLM and tool calls have deadlines and failed lookups
+    are retried.
+
+    Returns:
+        Dictionary with the number of tool calls and LLM calls, the turn's
+        time to first token and total latency, and each LLM call's timing
+    """
+    with maybe_turn(tracer, model=model, stream=True) as turn_span:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        turn_start = time.perf_counter()
+        llm_timings = []
+        tool_call_count = 0
+
+        async def run_tool(tool_call):
+            async with semaphore:
+                return await asyncio.to_thread(
+                    execute_tool_call, tool_call, tool_functions, cache, tracer, prefetcher, resilience
+                )
+
+        while True:
+            tasks = {}
+
+            def start_tool(tool_call):
+                nonlocal tool_call_count
+                tool_call_count += 1
+                function_args = json.loads(tool_call.function.arguments)
+                console.print(
+                    f"[cyan]🔧 Tool Call {tool_call_count}: {tool_call.function.name}"
+                    f"({', '.join(f'{k}={v}' for k, v in function_args.items())})"
+                    f"[/cyan]"
+                )
+                tasks[tool_call.id] = asyncio.create_task(run_tool(tool_call))
+
+            def print_text(text):
+                if not printed_prefix:
+                    console.print("[dim]Assistant ➜[/dim] ", end='')
+                    printed_prefix.append(True)
+                console.print(text, end='', markup=False, highlight=False)
+
+            printed_prefix = []
+            if budget is not None:
+                budget.enforce(messages, tool_schemas)
+            call = call_llm_stream(
+                messages, client, tool_schemas, model,
+                on_text=print_text, on_tool_call=start_tool, recorder=recorder, tracer=tracer
+            )
+            try:
+                if resilience is not None:
+                    response_message, timing = await resilience.call_llm_async(call)
+                else:
+                    response_message, timing = await call
+            except BaseException:
+                # The response never completed, so the tools it started have no message to answer:
+                # cancel them and collect them, rather than leave them holding the semaphore
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+                raise
+            llm_timings.append(timing)
+            if printed_prefix:
+                console.print()
+
+            messages.append(response_message)
+            if not response_message.tool_calls:
+                break
+
+            # Collect tool results in the original tool call order
+            for tool_call in response_message.tool_calls:
+                tool_result = await tasks[tool_call.id]
+                with maybe_span(tracer, "render", "tool_results"):
+                    console.print(f"[green]  ✓ {json.dumps(tool_result, indent=2)}[/green]")
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": json.dumps(tool_result)
+                })
+
+        turn_span.update(llm_calls=len(llm_timings), tool_calls=tool_call_count)
+    return {
+        "tool_call_count": tool_call_count,
+        "llm_call_count": len(llm_timings),
+        "time_to_first_token": llm_timings[0]["time_to_first_token"],
+        "total": time.perf_counter() - turn_start,
+        "llm_timings": llm_timings
+    }
@@ -0,0 +1,88 @@
+"""
+Tests of the batched protein properties against per-residue loops.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from tools.analyze_protein import (
+    C_TERMINUS_PKA, COMPOSITION_COLUMNS, N_TERMINUS_PKA, WATER_WEIGHT, aa_charge, aa_weights, analyze_protein,
+    analyze_proteins_batch, hydrophobicity, hydropathy_profile, negative_pka, positive_pka
+)
+
+def random_proteins(seed, count=50):
+    rng = random.Random(seed)
+    # Mostly standard residues, with lower case, stops and unknowns mixed in
+    letters = 'ACDEFGHIKLMNPQRSTVWYacdekX*'
+    return [''.join(rng.choices(letters, k=rng.randint(1, 120))) for _ in range(count)]
+
+def test_batch_matches_residue_loops():
+    proteins = random_proteins(0)
+    properties = analyze_proteins_batch(proteins)
+    for i, protein in enumerate(proteins):
+        protein = protein.upper()
+        assert properties["length"][i] == len(protein)
+        weight = sum(aa_weights.get(residue, 0.0) for residue in protein) - (len(protein) - 1) * WATER_WEIGHT
+        assert properties["molecular_weight_da"][i] == pytest.approx(weight)
+        assert properties["net_charge"][i] == pytest.approx(sum(aa_charge.get(residue, 0) for residue in protein))
+        average = sum(hydrophobicity.get(residue, 0.0) for residue in protein) / len(protein)
+        assert properties["avg_hydrophobicity"][i] == pytest.approx(average)
+        counts = [protein.count(column) for column in COMPOSITION_COLUMNS[:-1]]
+        assert properties["composition"][i].tolist() == counts + [len(protein) - sum(counts)]
+
+def test_batch_of_one_matches_analyze_protein():
+    for protein in random_proteins(1, count=10):
+        result = analyze_protein(protein)
+        properties = analyze_proteins_batch([protein])
+        assert result["molecular_weight_da"] == round(float(properties["molecular_weight_da"][0]), 2)
+        assert result["avg_hydrophobicity"] == round(float(properties["avg_hydrophobicity"][0]), 2)
+
+@pytest.mark.parametrize("window", [1, 9, 19])
+def test_hydropathy_profile_matches_window_means(window):
+    protein = random_proteins(2, count=1)[0].upper() + 'LIVF' * 10
+    values = [hydrophobicity.get(residue, 0.0) for residue in protein]
+    expected = [sum(values[i:i + window]) / window for i in range(len(values) - window + 1)]
+    assert hydropathy_profile(protein, window).tolist() == pytest.approx(expected)
+    assert hydropathy_profile(protein[:window - 1], window).size == 0
+
+def charge(protein, ph):
+    """Henderson-Hasselbalch net charge of one protein, residue by residue"""
+    positive = 1 / (1 + 10 ** (ph - N_TERMINUS_PKA))
+    negative = 1 / (1 + 10 ** (C_TERMINUS_PKA - ph))
+    for residue in protein:
+        if residue in positive_pka:
+            positive += 1 / (1 + 10 ** (ph - positive_pka[residue]))
+        if residue in negative_pka:
+            negative += 1 / (1 + 10 ** (negative_pka[residue] - ph))
+    return positive - negative
+
+def naive_isoelectric_point(protein):
+    low, high = 0.0, 14.0
+    while high - low > 1e-6:
+        middle = (low + high) / 2
+        low, high = (middle, high) if charge(protein, middle) > 0 else (low, middle)
+    return (low + high) / 2
+
+def test_isoelectric_points_match_scalar_bisection():
+    proteins = random_proteins(3) + ['KKKKRRRR', 'DDDDEEEE', 'G']
+    properties = analyze_proteins_batch(proteins)
+    for protein, pI in zip(proteins, properties["isoelectric_point"]):
+        assert abs(pI - naive_isoelectric_point(protein.upper())) < 1e-3, protein
+    assert 0 < properties["isoelectric_point_iterations"] <= 100
+    assert properties["isoelectric_point_seconds"] >= 0
+
+def test_empty_sequence_has_no_isoelectric_point():
+    properties = analyze_proteins_batch(['', 'MKV'])
+    assert math.isnan(properties["isoelectric_point"][0]) and not np.isnan(properties["isoelectric_point"][1])
+    assert analyze_protein('')["isoelectric_point"] is None
+
+def test_pI_estimate_compares_acidic_and_basic_counts():
+    assert analyze_protein('DDEK')["pI_estimate"] == "< 7 (acidic)"
+    assert analyze_protein('KRHD')["pI_estimate"] == "> 7 (basic)"
+    assert analyze_protein('DK')["pI_estimate"] == "~ 7 (neutral)"
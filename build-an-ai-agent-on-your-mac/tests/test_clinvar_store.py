@@ -0,0 +1,56 @@
+"""
+Tests of the ClinVar loader and store against the rows they were loaded from.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import pytest
+
+from tools.clinvar_store import ClinVarStore, load_clinvar
+
+HEADER = [
+    "#AlleleID", "GeneSymbol", "ClinicalSignificance", "PhenotypeList", "Assembly", "Chromosome",
+    "ReviewStatus", "PositionVCF", "ReferenceAlleleVCF", "AlternateAlleleVCF"
+]
+
+ROWS = [
+    # The same variant three times: the best-reviewed row must win, wherever it comes in the file
+    ["1", "BRCA1", "Uncertain significance", "Hereditary cancer", "GRCh38", "17",
+     "criteria provided, single submitter", "43094464", "G", "A"],
+    ["2", "BRCA1", "Likely pathogenic", "Breast-ovarian cancer, familial", "GRCh38", "17",
+     "reviewed by expert panel", "43094464", "G", "A"],
+    ["3", "BRCA1", "Benign", "not specified", "GRCh38", "17",
+     "no assertion criteria provided", "43094464", "G", "A"],
+    ["4", "SCN1A", "Pathogenic", "Dravet syndrome|Epilepsy", "GRCh38", "2",
+     "criteria provided, multiple submitters, no conflicts", "166245425", "T", "C"],
+    # Other assemblies and variants without VCF alleles are skipped
+    ["5", "SCN1A", "Pathogenic", "Dravet syndrome", "GRCh37", "2",
+     "reviewed by expert panel", "166245400", "T", "C"],
+    ["6", "TP53", "Pathogenic", "Li-Fraumeni syndrome", "GRCh38", "17",
+     "reviewed by expert panel", "na", "na", "na"]
+]
+
+@pytest.fixture
+def store(tmp_path):
+    source = tmp_path / "variant_summary.txt"
+    source.write_text("".join("\t".join(fields) + "\n" for fields in [HEADER] + ROWS))
+    assert load_clinvar(str(source), str(tmp_path / "clinvar.sqlite"), batch_size=2) == (4, 2)
+    store = ClinVarStore(str(tmp_path / "clinvar.sqlite"))
+    yield store
+    store.close()
+
+def test_duplicates_keep_the_best_reviewed_row(store):
+    assert store.lookup("chr17:43094464:G:A") == {
+        "significance": "Likely pathogenic",
+        "review_status": "3-star",
+        "condition": "Breast-ovarian cancer, familial",
+        "gene": "BRCA1"
+    }
+    assert store.lookup("2:166245425:t:c")["condition"] == "Dravet syndrome; Epilepsy"
+
+def test_lookup_many_matches_lookup(store):
+    variants = ["17:43094464:G:A", "chr2:166245425:T:C", "chr2:166245400:T:C", "chr17:1:A:C"]
+    expected = {variant: store.lookup(variant) for variant in variants if store.lookup(variant)}
+    assert store.lookup_many(variants) == expected
+    assert list(expected) == ["17:43094464:G:A", "chr2:166245425:T:C"]
@@ -0,0 +1,104 @@
+"""
+Tests of the disease index against a brute-force scan of every name.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import math
+import random
+
+import pytest
+
+from tools.disease_index import (
+    EXACT_NAME_BONUS, FUZZY_WEIGHT, MIN_SIMILARITY, PREFIX_WEIGHT, SIMULATED_DISEASES, DiseaseIndex,
+    tokenize, trigrams
+)
+
+QUERIES = [
+    "epilepsy", "Dravet syndrome", "alzheim", "epilepsey", "breast cancer", "neonatal diabetes",
+    "familial neonatal seizures", "Alzheimer's disease", "syndrome", "li fraumeni", "diabtes mellitus", "xyz"
+]
+
+def naive_matches(vocabulary, word):
+    """Weight of every vocabulary word a query word matches, by comparing it with each one"""
+    matches = {}
+    for candidate in vocabulary:
+        if candidate == word:
+            matches[candidate] = 1.0
+        elif len(word) >= 3 and candidate.startswith(word):
+            matches[candidate] = PREFIX_WEIGHT
+        elif len(word) >= 3 and word not in vocabulary:
+            shared = trigrams(word) & trigrams(candidate)
+            similarity = len(shared) / len(trigrams(word) | trigrams(candidate))
+            if shared and similarity >= MIN_SIMILARITY:
+                matches[candidate] = FUZZY_WEIGHT * similarity
+    return matches
+
+def naive_search(diseases, query):
+    """{disease: best score} of a query, scoring every name and synonym in turn"""
+    documents = [(disease, tokenize(term)) for disease, (name, _, names) in enumerate(diseases)
+                 for term in [name] + list(names) if tokenize(term)]
+    frequency = {}
+    for _, words in documents:
+        for word in set(words):
+            frequency[word] = frequency.get(word, 0) + 1
+    words = tokenize(query)
+
+    scores = {}
+    for disease, document_words in documents:
+        score = 0.0
+        for word in dict.fromkeys(words):
+            matches = naive_matches(frequency, word)
+            score += max([weight * math.log(1 + len(documents) / frequency[match])
+                          for match, weight in matches.items() if match in document_words] or [0.0])
+        score /= math.sqrt(len(document_words))
+        if document_words == words:
+            score += EXACT_NAME_BONUS
+        if score > 0:
+            name = diseases[disease][0]
+            scores[name] = max(scores.get(name, 0.0), round(score, 3))
+    return scores
+
+def random_diseases(seed, count=150):
+    rng = random.Random(seed)
+    words = ["syndrome", "familial", "cardiomyopathy", "dystrophy", "muscular", "retinal", "ataxia",
+             "spinocerebellar", "type", "congenital", "neuropathy", "hereditary", "deficiency", "disease"]
+    diseases = {}
+    while len(diseases) < count:
+        name = ' '.join(rng.sample(words, rng.randint(1, 4))) + f" {rng.randint(1, 40)}"
+        synonyms = [' '.join(rng.sample(words, 2))] if rng.random() < 0.3 else []
+        diseases[name] = ([f"GENE{rng.randint(1, 500)}"], synonyms)
+    return [(name, genes, synonyms) for name, (genes, synonyms) in diseases.items()]
+
+@pytest.mark.parametrize("diseases", [SIMULATED_DISEASES, random_diseases(0)], ids=["simulated", "random"])
+def test_search_matches_brute_force(diseases):
+    index = DiseaseIndex(diseases, "test")
+    queries = QUERIES + ["muscular dystrophy", "spinocerebelar ataxia 3", "cardiomyo", "type 12", "heredtary"]
+    for query in queries:
+        expected = naive_search(diseases, query)
+        results = index.search(query, limit=len(diseases))
+        assert {result["disease"]: result["score"] for result in results} == pytest.approx(expected), query
+        assert [result["score"] for result in results] == sorted(expected.values(), reverse=True), query
+
+def test_expand_matches_brute_force():
+    index = DiseaseIndex(random_diseases(1), "test")
+    for word in ["ataxia", "atax", "ataxai", "muscullar", "dystrofy", "type", "ty", "zzz"]:
+        expected = naive_matches(index.vocabulary, word)
+        matches = {index.vocabulary[i]: weight for i, weight in index.expand(word).items()}
+        assert matches == pytest.approx(expected), word
+
+def test_misspellings_prefixes_and_synonyms_find_the_disease():
+    index = DiseaseIndex(SIMULATED_DISEASES, "test")
+    assert index.search("epilepsey")[0]["disease"] == "epilepsy"
+    assert index.search("alzheim")[0]["disease"] == "alzheimer"
+    top = index.search("severe myoclonic epilepsy of infancy")[0]
+    assert (top["disease"], top["genes"]) == ("Dravet syndrome", ["SCN1A"])
+
+def test_open_reuses_the_saved_index(tmp_path):
+    path = tmp_path / "diseases.tsv"
+    path.write_text("disease_name\tgene_symbol\tsynonyms\nDravet syndrome\tSCN1A\tSMEI|severe myoclonic epilepsy\n")
+    built = DiseaseIndex.open(str(path))
+    loaded = DiseaseIndex.open(str(path))
+    assert loaded.__dict__ == built.__dict__
+    assert loaded.search("smei")[0]["disease"] == "Dravet syndrome"
@@ -0,0 +1,81 @@
+"""
+Tests of the streaming ORF scan against a codon-by-codon reference on each strand.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from tools.find_orfs import find_orfs, iter_orfs, orf_frame
+from tools.translate_dna import codon_table
+
+COMPLEMENT = str.maketrans('ACGTN', 'TGCAN')
+
+def naive_orfs(dna, min_length):
+    """
+    ORFs read codon by codon on both strands: the first ATG after a stop
+    codon, a codon with N or the start of the frame, up to the next stop
+    """
+    orfs = []
+    n = len(dna)
+    for strand, strand_dna in (('+', dna), ('-', dna.translate(COMPLEMENT)[::-1])):
+        for phase in range(3):
+            start = None
+            for i in range(phase, n - 2, 3):
+                amino_acid = codon_table.get(strand_dna[i:i + 3], 'X')
+                if amino_acid == '*' and start is not None and (i - start) // 3 >= min_length:
+                    protein = ''.join(codon_table[strand_dna[j:j + 3]] for j in range(start, i, 3))
+                    first, last = (start + 1, i + 3) if strand == '+' else (n - i - 2, n - start)
+                    orfs.append({"strand": strand, "start": first, "end": last, "length": len(protein),
+                                 "protein": protein})
+                if amino_acid in '*X':
+                    start = None
+                elif amino_acid == 'M' and start is None:
+                    start = i
+    return orfs
+
+def sort_key(orf):
+    return orf["strand"], orf["start"], orf["end"]
+
+def random_dna(seed, length):
+    rng = random.Random(seed)
+    # Start codons and N bases more often than chance, for more ORFs and boundaries
+    pieces = rng.choices(['A', 'C', 'G', 'T', 'ATG', 'CAT', 'N'], weights=[10, 10, 10, 10, 2, 2, 1], k=length)
+    return ''.join(pieces)[:length]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 10, 97, 1 << 20])
+@pytest.mark.parametrize("min_length", [0, 3, 12])
+def test_iter_orfs_matches_codon_scan(chunk_size, min_length):
+    for seed in range(5):
+        dna = random_dna(seed, 400 + seed)
+        chunks = [dna[i:i + chunk_size].encode() for i in range(0, len(dna), chunk_size)]
+        found = sorted(iter_orfs(chunks, min_length), key=sort_key)
+        assert found == sorted(naive_orfs(dna, min_length), key=sort_key), seed
+
+def test_stop_free_sequence_and_edges():
+    assert list(iter_orfs([b'ATG' + b'GCC' * 50])) == []
+    assert list(iter_orfs([b''], 0)) == []
+    assert [orf["protein"] for orf in iter_orfs([b'ATGTAA'], 0)] == ['M']
+    assert [orf["protein"] for orf in iter_orfs([b'TTACAT'], 0)] == ['M']
+
+def test_frames_match_translate_dna_numbering():
+    dna = random_dna(20, 1001)
+    for orf in iter_orfs([dna.encode()], 5):
+        frame = orf_frame(orf, len(dna))
+        if frame > 0:
+            assert (orf["start"] - 1) % 3 == frame - 1
+        else:
+            assert (len(dna) - orf["end"]) % 3 == -frame - 1
+
+def test_find_orfs_returns_the_longest(tmp_path):
+    dna = random_dna(21, 3000)
+    expected = sorted(naive_orfs(dna, 10), key=lambda orf: orf["length"], reverse=True)[:5]
+    path = tmp_path / "region.fa"
+    path.write_text(">region\n" + "\n".join(dna[i:i + 70] for i in range(0, len(dna), 70)) + "\n")
+    for result in (find_orfs(sequence=dna, min_length=10, max_orfs=5),
+                   find_orfs(path=str(path), min_length=10, max_orfs=5, chunk_size=64)):
+        assert result["orf_count"] == len(naive_orfs(dna, 10))
+        assert [orf["length"] for orf in result["orfs"]] == [orf["length"] for orf in expected]
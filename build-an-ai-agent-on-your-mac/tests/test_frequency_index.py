@@ -0,0 +1,87 @@
+"""
+Tests of the frequency index against a dictionary of the same variants.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from tools.frequency_index import (
+    FENCE_STRIDE, FrequencyIndex, as_float, build_frequency_index, encode_variant_id, save_index
+)
+
+def random_variants(seed, count):
+    """{variant_id: frequency} with SNVs, indels and alleles too long to pack"""
+    rng = random.Random(seed)
+    variants = {}
+    while len(variants) < count:
+        chrom = rng.choice(['chr1', 'chr2', 'chr17', 'chrX', 'chrM'])
+        # Few positions, so many variants share the fence pages' boundaries
+        pos = rng.randint(1, count // 2)
+        ref = ''.join(rng.choices('ACGT', k=rng.choice([1, 1, 2, 8])))
+        alt = ''.join(rng.choices('ACGT', k=rng.choice([1, 1, 3, 15])))
+        if ref != alt:
+            variants[f"{chrom}:{pos}:{ref}:{alt}"] = round(rng.random(), 6)
+    return variants
+
+@pytest.fixture
+def variants():
+    return random_variants(0, 5 * FENCE_STRIDE + 7)
+
+@pytest.fixture
+def index(tmp_path, variants):
+    prefix = str(tmp_path / "af")
+    keys = [encode_variant_id(variant) for variant in variants]
+    assert save_index(prefix, keys, list(variants.values())) == len(variants)
+    return FrequencyIndex.open(prefix)
+
+def absent_variants(variants):
+    """Neighbours of indexed variants that are not in the index themselves"""
+    absent = []
+    for variant in list(variants)[:500]:
+        chrom, pos, ref, alt = variant.split(':')
+        for candidate in (f"{chrom}:{int(pos) + 100000}:{ref}:{alt}", f"{chrom}:{pos}:{ref}:{alt}A"):
+            if candidate not in variants:
+                absent.append(candidate)
+    return absent
+
+def test_lookup_matches_dict(index, variants):
+    assert len(index) == len(variants)
+    for variant, frequency in variants.items():
+        assert index.lookup(variant) == as_float(frequency), variant
+    for variant in absent_variants(variants):
+        assert index.lookup(variant) is None, variant
+
+def test_lookup_many_matches_lookup(index, variants):
+    queries = list(variants)[::3] + absent_variants(variants) + ["not a variant", "chr99:1:A:C"]
+    random.Random(1).shuffle(queries)
+    for variant, frequency in zip(queries, index.lookup_many(queries)):
+        expected = index.lookup(variant)
+        assert math.isnan(frequency) if expected is None else as_float(frequency) == expected, variant
+
+def test_fence_pages_bound_every_key(index):
+    # The first key of each page, so a key's page is the last fence entry not above it
+    assert np.array_equal(index.fence, np.asarray(index.keys[::FENCE_STRIDE]))
+    assert FrequencyIndex(index.keys, index.frequencies, "copy").fence.tolist() == index.fence.tolist()
+
+def test_from_dict_and_build_agree(tmp_path):
+    variants = random_variants(2, 300)
+    path = tmp_path / "af.tsv"
+    rows = [variant.replace(':', '\t') + f"\t{frequency}\n" for variant, frequency in variants.items()]
+    path.write_text("".join(rows))
+    indexed, skipped = build_frequency_index(str(path), str(tmp_path / "af"), chunk_size=64)
+    assert (indexed, skipped) == (len(variants), 0)
+    built = FrequencyIndex.open(str(tmp_path / "af"))
+    in_memory = FrequencyIndex.from_dict(variants)
+    for variant in variants:
+        assert built.lookup(variant) == in_memory.lookup(variant) == as_float(variants[variant])
+
+def test_duplicate_keys_keep_the_first_frequency(tmp_path):
+    key = encode_variant_id("chr1:100:A:G")
+    assert save_index(str(tmp_path / "af"), [key, key], [0.25, 0.5]) == 1
+    assert FrequencyIndex.open(str(tmp_path / "af")).lookup("1:100:a:g") == 0.25
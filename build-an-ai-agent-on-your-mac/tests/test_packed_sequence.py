@@ -0,0 +1,73 @@
+"""
+Tests of the 2-bit packed sequence against the same operations on strings.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from tools import packed_sequence
+from tools.packed_sequence import PackedSequence, kmer_string
+
+COMPLEMENT = str.maketrans('ACGTN', 'TGCAN')
+
+def random_dna(seed, length):
+    rng = random.Random(seed)
+    return ''.join(rng.choices('ACGTacgtNnR', weights=[10, 10, 10, 10, 2, 2, 2, 2, 1, 1, 1], k=length))
+
+def as_stored(dna):
+    """The string a packed sequence decodes to: upper case, N for anything not ACGT"""
+    return ''.join(base if base in 'ACGT' else 'N' for base in dna.upper())
+
+def naive_kmers(dna, k, canonical):
+    kmers = [dna[i:i + k] for i in range(len(dna) - k + 1) if 'N' not in dna[i:i + k]]
+    if canonical:
+        kmers = [min(kmer, kmer.translate(COMPLEMENT)[::-1]) for kmer in kmers]
+    return Counter(kmers)
+
+@pytest.fixture(params=[1 << 22, 16], ids=["one block", "small blocks"])
+def block_size(request, monkeypatch):
+    # Small blocks (a whole number of packed bytes) put block boundaries inside N runs, k-mers and codons
+    monkeypatch.setattr(packed_sequence, "BLOCK_SIZE", request.param)
+    return request.param
+
+def test_round_trip_and_slices(block_size):
+    for length in list(range(12)) + [97]:
+        dna = random_dna(length, length)
+        packed = PackedSequence.from_dna(dna)
+        assert str(packed) == as_stored(dna)
+        assert packed.masked_bases == as_stored(dna).count('N')
+        assert b''.join(packed.chunks(7)).decode() == as_stored(dna)
+        for start in range(length + 1):
+            end = max(start, length - start // 2)
+            assert packed.to_bytes(start, end).decode() == as_stored(dna)[start:end]
+
+def test_reverse_complement_matches_string(block_size):
+    for length in list(range(12)) + [97, 1000]:
+        dna = as_stored(random_dna(length + 1, length))
+        reverse = PackedSequence.from_dna(dna).reverse_complement()
+        assert str(reverse) == dna.translate(COMPLEMENT)[::-1]
+        assert str(reverse.reverse_complement()) == dna
+
+@pytest.mark.parametrize("k", [1, 3, 7, 13])
+@pytest.mark.parametrize("canonical", [False, True])
+def test_kmer_counts_match_string(block_size, k, canonical):
+    dna = as_stored(random_dna(k, 500))
+    hashes, counts = PackedSequence.from_dna(dna).kmer_counts(k, canonical)
+    assert dict(zip((kmer_string(int(h), k) for h in hashes), counts.tolist())) == naive_kmers(dna, k, canonical)
+
+def test_codon_counts_match_string(block_size):
+    dna = as_stored(random_dna(30, 301))
+    packed = PackedSequence.from_dna(dna)
+    for frame in (1, 2, 3):
+        codons = Counter(dna[i:i + 3] for i in range(frame - 1, len(dna) - 2, 3) if 'N' not in dna[i:i + 3])
+        counts = packed.codon_counts(frame)
+        assert {kmer_string(i, 3): int(count) for i, count in enumerate(counts) if count} == codons
+
+def test_k_out_of_range():
+    with pytest.raises(ValueError):
+        next(PackedSequence.from_dna("ACGT").kmer_hashes(33))
@@ -0,0 +1,93 @@
+"""
+Tests of tool retries, deadlines and LLM hedging.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from resilience import HEDGE_MIN_SAMPLES, DeadlineExceeded, Resilience
+
+class FlakyTool:
+    """Raises the given errors on its first calls, then answers"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, gene):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"gene": gene}
+
+@pytest.fixture
+def resilience():
+    resilience = Resilience(tool_deadline=0.5, tool_retries=2, idempotent_tools={"lookup"})
+    resilience.backoff = lambda attempt: 0
+    return resilience
+
+def test_transient_errors_are_retried(resilience):
+    tool = FlakyTool(OSError("connection reset"), sqlite3.OperationalError("database is locked"))
+    assert resilience.call_tool("lookup", tool, {"gene": "TP53"}) == ({"gene": "TP53"}, True)
+    assert tool.calls == 3
+    assert resilience.metrics["tool_retries"] == 2 and resilience.metrics["tool_failures"] == 0
+
+def test_retries_run_out(resilience):
+    tool = FlakyTool(*[OSError("connection reset")] * 3)
+    result, completed = resilience.call_tool("lookup", tool, {"gene": "TP53"})
+    assert not completed and "after 3 attempt(s)" in result["error"]
+    assert tool.calls == 3
+
+def test_other_errors_fail_at_once(resilience):
+    tool = FlakyTool(TypeError("unexpected keyword argument"))
+    result, completed = resilience.call_tool("lookup", tool, {"gene": "TP53"})
+    assert not completed and "TypeError" in result["error"]
+    assert tool.calls == 1 and resilience.metrics["tool_retries"] == 0
+
+def test_tools_that_are_not_idempotent_run_once(resilience):
+    tool = FlakyTool(OSError("connection reset"))
+    _, completed = resilience.call_tool("write_report", tool, {"gene": "TP53"})
+    assert not completed and tool.calls == 1
+
+def test_tool_deadline(resilience):
+    release = threading.Event()
+    result, completed = resilience.call_tool("write_report", lambda: release.wait(5), {})
+    release.set()
+    assert not completed and "timed out" in result["error"]
+    assert resilience.metrics["tool_timeouts"] == 1
+
+def test_llm_deadline():
+    resilience = Resilience(llm_deadline=0.1)
+    release = threading.Event()
+    with pytest.raises(DeadlineExceeded):
+        resilience.call_llm(lambda **params: release.wait(5), {"messages": []})
+    release.set()
+    assert resilience.metrics["llm_timeouts"] == 1
+
+def test_slow_call_is_hedged_through_create_hedge():
+    resilience = Resilience(hedge=True)
+    for _ in range(HEDGE_MIN_SAMPLES):
+        resilience.call_llm(lambda **params: "fast", {"messages": []})
+    release = threading.Event()
+
+    def slow(**params):
+        release.wait(5)
+        return "slow"
+
+    start = time.perf_counter()
+    assert resilience.call_llm(slow, {"messages": []}, create_hedge=lambda **params: "hedge") == "hedge"
+    release.set()
+    assert time.perf_counter() - start < 1
+    assert resilience.metrics["hedges"] == 1 and resilience.metrics["hedge_wins"] == 1
+
+def test_no_hedge_before_enough_samples():
+    resilience = Resilience(hedge=True)
+    assert resilience.hedge_threshold() is None
+    assert resilience.call_llm(lambda **params: params["timeout"], {"messages": []}) == resilience.llm_deadline
+    assert resilience.metrics["hedges"] == 0
@@ -0,0 +1,174 @@
+"""
+Tests of the router's backend choice and in-flight accounting, with fake
+backends in place of OpenAI clients.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from openai import APIConnectionError, BadRequestError
+
+import router as router_module
+from router import Router
+
+class FakeClient:
+    """An OpenAI client whose completions name the backend that answered, or raise its error"""
+
+    def __init__(self, client_kwargs, asynchronous=False):
+        self.base_url = client_kwargs["base_url"]
+        self.asynchronous = asynchronous
+        self.error = None
+        self.stream_error = None
+        self.models = SimpleNamespace(list=lambda: [])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def response(self, params):
+        if self.error is not None:
+            raise self.error
+        if params.get("stream"):
+            return (AsyncFakeStream if self.asynchronous else FakeStream)(self.base_url, self.stream_error)
+        return self.base_url
+
+    def create(self, **params):
+        if self.asynchronous:
+            async def respond():
+                return self.response(params)
+            return respond()
+        return self.response(params)
+
+class FakeStream:
+    """Three chunks, with an error in place of the last one if one is given"""
+
+    def __init__(self, base_url, error):
+        self.chunks = [base_url, base_url] + ([error] if error else [base_url])
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+class AsyncFakeStream(FakeStream):
+    """The same chunks, as openai's AsyncStream gives them"""
+
+    async def __aiter__(self):
+        for chunk in FakeStream.__iter__(self):
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+def connection_error():
+    return APIConnectionError(request=None)
+
+def bad_request():
+    response = SimpleNamespace(status_code=400, headers={}, request=None)
+    return BadRequestError("bad request", response=response, body=None)
+
+def messages(conversation):
+    return [{"role": "user", "content": f"conversation {conversation}"}]
+
+@pytest.fixture
+def make_router(monkeypatch):
+    monkeypatch.setattr(router_module, "make_client", FakeClient)
+    routers = []
+
+    def make(count=2, asynchronous=False):
+        routers.append(Router([f"http://node{i}/v1" for i in range(count)], asynchronous=asynchronous,
+                              probe_interval=3600))
+        return routers[-1]
+
+    yield make
+    for router in routers:
+        router.close()
+
+def in_flight(router):
+    return [backend.outstanding for backend in router.backends]
+
+def test_conversations_stick_and_new_ones_spread(make_router):
+    router = make_router(3)
+    create = router.chat.completions.create
+    first = [create(messages=messages(i)) for i in range(3)]
+    assert sorted(first) == sorted(backend.base_url for backend in router.backends)
+    for _ in range(3):
+        assert [create(messages=messages(i) + [{"role": "user", "content": "more"}]) for i in range(3)] == first
+    assert router.stats["sticky"] == 9
+
+def test_failover_moves_the_conversation(make_router):
+    router = make_router()
+    create = router.chat.completions.create
+    home = create(messages=messages(0))
+    down = next(backend for backend in router.backends if backend.base_url == home)
+    down.client.error = connection_error()
+    other = create(messages=messages(0))
+    assert other != home and not down.healthy
+    assert router.stats["failovers"] == 1
+    assert create(messages=messages(0)) == other
+    assert in_flight(router) == [0, 0]
+
+def test_client_errors_are_raised_without_failover(make_router):
+    router = make_router()
+    for backend in router.backends:
+        backend.client.error = bad_request()
+    with pytest.raises(BadRequestError):
+        router.chat.completions.create(messages=messages(0))
+    assert all(backend.healthy for backend in router.backends)
+    assert router.stats["failovers"] == 0 and in_flight(router) == [0, 0]
+
+def test_stream_stays_in_flight_until_it_ends(make_router):
+    router = make_router()
+    stream = router.chat.completions.create(messages=messages(0), stream=True)
+    assert sorted(in_flight(router)) == [0, 1]
+    next(stream)
+    assert sorted(in_flight(router)) == [0, 1]
+    assert len(list(stream)) == 2
+    assert in_flight(router) == [0, 0]
+
+    with router.chat.completions.create(messages=messages(0), stream=True) as stream:
+        next(stream)
+    assert stream.closed and in_flight(router) == [0, 0]
+
+def test_error_partway_through_a_stream_is_a_backend_failure(make_router):
+    router = make_router()
+    for backend in router.backends:
+        backend.client.stream_error = connection_error()
+    stream = router.chat.completions.create(messages=messages(0), stream=True)
+    with pytest.raises(APIConnectionError):
+        list(stream)
+    assert in_flight(router) == [0, 0]
+    assert sorted(backend.failures for backend in router.backends) == [0, 1]
+    assert sorted(backend.healthy for backend in router.backends) == [False, True]
+
+def test_async_stream_is_released_when_closed(make_router):
+    router = make_router(asynchronous=True)
+
+    async def read_one():
+        stream = await router.chat.completions.create(messages=messages(0), stream=True)
+        async with stream:
+            await stream.__anext__()
+            assert sorted(in_flight(router)) == [0, 1]
+
+    asyncio.run(read_one())
+    assert in_flight(router) == [0, 0]
+
+def test_hedge_goes_to_another_backend(make_router):
+    router = make_router()
+    home = router.chat.completions.create(messages=messages(0))
+    hedged = router.chat.completions.create_hedge(messages=messages(0))
+    assert hedged != home
+    assert router.stats["hedges"] == 1
+    # The hedge answered, so the conversation follows it
+    assert router.chat.completions.create(messages=messages(0)) == hedged
+
+def test_hedge_with_one_backend_uses_it(make_router):
+    router = make_router(1)
+    home = router.chat.completions.create(messages=messages(0))
+    assert router.chat.completions.create_hedge(messages=messages(0)) == home
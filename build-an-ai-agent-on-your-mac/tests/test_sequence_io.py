@@ -0,0 +1,82 @@
+"""
+Tests of the streaming FASTA/FASTQ parser and chunked translation against
+whole-file references, at chunk sizes that split headers, lines and codons.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import gzip
+import random
+
+import pytest
+
+from tools.sequence_io import iter_records
+from tools.translate_dna import translate_batch, translate_chunks, translate_file
+
+CHUNK_SIZES = [1, 2, 3, 7, 64, 1 << 20]
+
+def random_records(seed, count=20):
+    rng = random.Random(seed)
+    return [(f"seq{i}", ''.join(rng.choices('ACGTN', k=rng.randint(0, 200)))) for i in range(count)]
+
+def write_fasta(path, records, width=60):
+    with open(path, 'w') as handle:
+        for record_id, sequence in records:
+            handle.write(f">{record_id} description\n")
+            for i in range(0, len(sequence), width):
+                handle.write(sequence[i:i + width].lower() + "\n")
+
+def write_fastq(path, records):
+    with open(path, 'w') as handle:
+        for record_id, sequence in records:
+            # Quality lines that start with the FASTQ markers
+            handle.write(f"@{record_id}\n{sequence}\n+\n{'@+' * (len(sequence) // 2)}{'I' * (len(sequence) % 2)}\n")
+
+def parsed(path, chunk_size):
+    return [(record_id, b''.join(chunks).decode()) for record_id, chunks in iter_records(path=path,
+                                                                                       chunk_size=chunk_size)]
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_fasta_records_match(tmp_path, chunk_size):
+    records = random_records(0)
+    path = str(tmp_path / "records.fa")
+    write_fasta(path, records)
+    assert parsed(path, chunk_size) == records
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_fastq_records_match(tmp_path, chunk_size):
+    records = [(record_id, sequence) for record_id, sequence in random_records(1) if sequence]
+    path = str(tmp_path / "records.fq")
+    write_fastq(path, records)
+    assert parsed(path, chunk_size) == records
+
+def test_gzipped_and_windows_line_endings(tmp_path):
+    records = random_records(2, count=5)
+    path = str(tmp_path / "records.fa.gz")
+    with gzip.open(path, 'wt', newline='') as handle:
+        for record_id, sequence in records:
+            handle.write(f">{record_id}\r\n{sequence}\r\n")
+    assert parsed(path, 5) == records
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("not a sequence file\n")
+    with pytest.raises(ValueError):
+        parsed(str(path), 64)
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 4, 5, 9, 1000])
+def test_translate_chunks_matches_whole_sequence(chunk_size):
+    dna = ''.join(random.Random(3).choices('ACGT', k=301)).encode()
+    chunks = [dna[i:i + chunk_size] for i in range(0, len(dna), chunk_size)]
+    assert ''.join(translate_chunks(chunks)) == translate_batch([dna])[0][1]
+
+def test_translate_file_matches_batch(tmp_path):
+    records = random_records(4)
+    path = str(tmp_path / "records.fa")
+    write_fasta(path, records)
+    translated = list(translate_file(path, chunk_size=7))
+    expected = translate_batch([sequence for _, sequence in records], to_stop=True)
+    assert [record["id"] for record in translated] == [record_id for record_id, _ in records]
+    assert [record["protein_sequence"] for record in translated] == [proteins[1] for proteins in expected]
+    assert [record["dna_length"] for record in translated] == [len(sequence) for _, sequence in records]
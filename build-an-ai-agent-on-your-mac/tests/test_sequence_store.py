@@ -0,0 +1,44 @@
+"""
+Tests of the sequence store.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import pytest
+
+from tools.sequence_store import (
+    SequenceStore, get_sequence, get_sequence_store, set_sequence_store, store_inline_sequences
+)
+
+DNA = "ACGTTGCA" * 25
+
+@pytest.fixture
+def store():
+    previous = get_sequence_store()
+    set_sequence_store(SequenceStore())
+    yield get_sequence_store()
+    set_sequence_store(previous)
+
+def test_words_made_of_bases_stay_text(store):
+    text, stored = store_inline_sequences(f"Look at a cat tag {DNA} and at a cat tag")
+    assert text == "Look at a cat tag dna_1 (a 200 bp DNA sequence in the local store) and at a cat tag"
+    assert len(stored) == 1
+    assert store.sequence("dna_1") == DNA.encode()
+
+def test_wrapped_sequence_is_stored_whole(store):
+    wrapped = "\n".join(DNA[i:i + 60].lower() for i in range(0, len(DNA), 60))
+    text, _ = store_inline_sequences(f"Translate this, a cat tag:\n{wrapped}\nat a glance")
+    assert text == "Translate this, a cat tag:\ndna_1 (a 200 bp DNA sequence in the local store)\nat a glance"
+    assert store.sequence("dna_1") == DNA.encode()
+
+def test_short_runs_stay_text(store):
+    text, stored = store_inline_sequences("ACGTACGT and GATTACA")
+    assert text == "ACGTACGT and GATTACA"
+    assert stored == []
+
+def test_get_sequence_rejects_a_start_past_the_end(store):
+    sequence_id = store.put("dna", DNA)
+    assert "error" in get_sequence(sequence_id, start=len(DNA) + 1)
+    assert "error" in get_sequence(sequence_id, start=0)
+    assert get_sequence(sequence_id, start=len(DNA))["sequence"] == DNA[-1]
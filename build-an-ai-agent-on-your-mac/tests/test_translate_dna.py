@@ -0,0 +1,42 @@
+"""
+Tests of the vectorized DNA translation against a codon-by-codon reference.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from tools.translate_dna import FRAMES, codon_table, translate_batch, translate_dna, translate_six_frames
+
+COMPLEMENT = str.maketrans('ACGTN', 'TGCAN')
+
+def translate_loop(dna, frame):
+    """The original codon loop, on the frame's strand"""
+    if frame < 0:
+        dna = dna.translate(COMPLEMENT)[::-1]
+    offset = abs(frame) - 1
+    return ''.join(codon_table.get(dna[i:i + 3], 'X') for i in range(offset, len(dna) - 2, 3))
+
+def random_dna(rng, length, alphabet='ACGT'):
+    return ''.join(rng.choices(alphabet, k=length))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_translate_batch_matches_codon_loop(seed):
+    rng = random.Random(seed)
+    # Lengths around multiples of three, and N bases for unknown codons
+    sequences = [random_dna(rng, rng.randint(0, 40), 'ACGTN') for _ in range(50)]
+    results = translate_batch(sequences, frames=FRAMES)
+    for dna, proteins in zip(sequences, results):
+        for frame in FRAMES:
+            assert proteins[frame] == translate_loop(dna, frame), (dna, frame)
+
+def test_translate_batch_stops_at_the_first_stop_codon():
+    assert translate_batch(["ATGGCCTAAGGG"], to_stop=True) == [{1: "MA"}]
+    assert translate_six_frames("ATGGCCTAAGGG")[1] == "MA*G"
+
+def test_translate_dna_cleans_and_validates():
+    assert translate_dna("atg gcc\ntaa")["protein_sequence"] == "MA"
+    assert "error" in translate_dna("ATGNNN")
@@ -0,0 +1,45 @@
+"""
+Tests of running one turn's tool calls concurrently.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import json
+import threading
+from types import SimpleNamespace
+
+from util import execute_tool_calls
+
+def tool_call(name, arguments):
+    if not isinstance(arguments, str):
+        arguments = json.dumps(arguments)
+    return SimpleNamespace(id=f"call_{name}", function=SimpleNamespace(name=name, arguments=arguments))
+
+def test_results_come_back_in_call_order():
+    # Each call waits for the next one to start, so they only finish if they run at once
+    started = [threading.Event() for _ in range(4)]
+
+    def wait_for_next(number):
+        started[number].set()
+        if number + 1 < len(started):
+            started[number + 1].wait(5)
+        return {"number": number}
+
+    calls = [tool_call("wait_for_next", {"number": number}) for number in range(4)]
+    executed = execute_tool_calls(calls, {"wait_for_next": wait_for_next}, max_concurrency=4)
+    assert [result for _, result, _ in executed] == [{"number": number} for number in range(4)]
+    assert [call for call, _, _ in executed] == calls
+
+def test_a_failing_call_does_not_fail_the_others():
+    def lookup(gene):
+        if gene == "BUG":
+            raise KeyError(gene)
+        return {"gene": gene}
+
+    calls = [tool_call("lookup", {"gene": "TP53"}), tool_call("lookup", '{"gene": '),
+             tool_call("lookup", {"gene": "BUG"}), tool_call("lookup", {"species": "human"})]
+    for max_concurrency in (1, 4):
+        results = [result for _, result, _ in execute_tool_calls(calls, {"lookup": lookup}, max_concurrency)]
+        assert results[0] == {"gene": "TP53"}
+        assert all("error" in result for result in results[1:])
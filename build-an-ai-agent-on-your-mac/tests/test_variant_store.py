@@ -0,0 +1,132 @@
+"""
+Tests of the indexed VCF backend against a scan of every record.
+
+Run from build-an-ai-agent-on-your-mac/:
+    python -m pytest tests
+"""
+
+import os
+import random
+
+import numpy as np
+import pytest
+
+from tools.check_variant import check_variant
+from tools.check_variants import check_variants
+from tools.variant_store import (
+    INDEX_SUFFIX, IndexedVCFBackend, SimulatedVariantBackend, chrom_aliases, parse_vcf_line, set_variant_backend
+)
+
+CHROMS = ['chr1', 'chr2', 'chrX']
+
+# Overlapping, nested, adjacent and far-apart regions, and one on a chromosome with no records
+GENE_INTERVALS = {
+    'A': ('chr1', 1000, 5000),
+    'B': ('chr1', 4000, 4500),
+    'C': ('chr1', 3000, 9000),
+    'D': ('chr1', 9001, 9100),
+    'E': ('chr1', 40000, 49000),
+    'F': ('chr2', 20000, 20000),
+    'G': ('X', 1, 50000),
+    'H': ('chr9', 1, 1000)
+}
+
+def write_vcf(path, seed, count=2000):
+    """A position-sorted VCF with SNVs, long deletions, multi-allelic sites and hom-ref genotypes"""
+    rng = random.Random(seed)
+    lines = ["##fileformat=VCFv4.2\n", "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tSAMPLE\n"]
+    for chrom in CHROMS:
+        positions = sorted(rng.randint(1, 50000) for _ in range(count // len(CHROMS)))
+        for pos in positions:
+            ref = ''.join(rng.choices('ACGT', k=rng.choice([1, 1, 1, 5, 300])))
+            alts = ','.join(rng.choice('ACGT') for _ in range(rng.choice([1, 1, 2])))
+            genotype = rng.choice(['0/1', '1/1', '0|1', '0/0', './.', '1/2'])
+            lines.append(f"{chrom}\t{pos}\t.\t{ref}\t{alts}\t50\tPASS\t.\tGT:DP\t{genotype}:30\n")
+    with open(path, 'w') as handle:
+        handle.writelines(lines)
+    return lines
+
+def scan(lines, chrom, start, end):
+    """Variants whose REF overlaps [start, end], reading every record"""
+    variants = []
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        record_chrom, pos, _, ref = line.split('\t')[:4]
+        if record_chrom in chrom_aliases(chrom) and int(pos) <= end and int(pos) + len(ref) > start:
+            variants.extend(parse_vcf_line(line))
+    return variants
+
+@pytest.fixture
+def vcf(tmp_path):
+    path = str(tmp_path / "patient.vcf")
+    return path, write_vcf(path, 0)
+
+def test_query_matches_scan(vcf):
+    path, lines = vcf
+    backend = IndexedVCFBackend(path)
+    rng = random.Random(1)
+    try:
+        for _ in range(200):
+            chrom = rng.choice(CHROMS + ['2', 'chr9'])
+            start = rng.randint(1, 52000)
+            end = start + rng.choice([0, 10, 500, 5000])
+            assert backend.query(chrom, start, end) == scan(lines, chrom, start, end), (chrom, start, end)
+    finally:
+        backend.close()
+
+def test_index_is_saved_and_rebuilt_when_the_vcf_changes(vcf):
+    path, _ = vcf
+    IndexedVCFBackend(path).close()
+    assert os.path.exists(path + INDEX_SUFFIX)
+    lines = write_vcf(path, 2, count=300)
+    os.utime(path, ns=(1, 1))
+    backend = IndexedVCFBackend(path)
+    assert backend.query('chr2', 1, 60000) == scan(lines, 'chr2', 1, 60000)
+    backend.close()
+
+def test_index_stays_in_memory_when_it_cannot_be_saved(vcf, monkeypatch):
+    path, lines = vcf
+
+    def refuse(*args, **kwargs):
+        raise PermissionError("read-only directory")
+
+    monkeypatch.setattr(np, "savez", refuse)
+    backend = IndexedVCFBackend(path)
+    assert not os.path.exists(path + INDEX_SUFFIX)
+    assert backend.query('chrX', 100, 9000) == scan(lines, 'chrX', 100, 9000)
+    backend.close()
+
+def test_unsorted_vcf_is_rejected(tmp_path):
+    path = tmp_path / "unsorted.vcf"
+    path.write_text("chr1\t200\t.\tA\tG\nchr1\t100\t.\tC\tT\n")
+    with pytest.raises(ValueError):
+        IndexedVCFBackend(str(path))
+
+def test_query_many_matches_query(vcf):
+    path, _ = vcf
+    backend = IndexedVCFBackend(path, GENE_INTERVALS)
+    rng = random.Random(3)
+    try:
+        for _ in range(50):
+            genes = rng.sample(sorted(GENE_INTERVALS) + ['NOT_A_GENE'], rng.randint(1, 9))
+            expected = {gene: backend.query(*GENE_INTERVALS[gene]) for gene in genes if gene in GENE_INTERVALS}
+            assert backend.query_many(genes) == expected, genes
+    finally:
+        backend.close()
+
+@pytest.fixture
+def simulated_patient():
+    set_variant_backend(SimulatedVariantBackend())
+    yield
+    set_variant_backend(None)
+
+def test_check_variants_matches_check_variant(simulated_patient):
+    genes = ['SCN1A', 'kcnq2', 'TP53', 'NOT_A_GENE']
+    result = check_variants(genes)
+    assert result["results"] == {gene.upper(): check_variant(gene) for gene in genes}
+    assert result["genes_with_variants"] == ['SCN1A', 'TP53']
+
+def test_check_variants_rejects_anything_but_a_list_of_genes(simulated_patient):
+    for genes in ['SCN1A', [], ['SCN1A', 7], None]:
+        assert "error" in check_variants(genes)
@@ -0,0 +1,149 @@
+"""
+Cache of tool results, keyed on tool name plus canonicalized arguments.
+
+A bounded in-memory LRU answers repeated lookups within a session; an
+optional SQLite file behind it answers them across sessions. Entries expire
+after a per-tool time to live, and only tools with a TTL are cached.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# How long (in seconds) each lookup tool's results stay valid
+DEFAULT_TTLS = {
+    "search_disease_genes": 24 * 3600,
+    "check_variant": 3600,
+    "check_population_frequency": 7 * 24 * 3600,
+    "query_clinvar": 24 * 3600,
+    "check_variants": 3600,
+    "check_population_frequencies": 7 * 24 * 3600,
+    "query_clinvar_batch": 24 * 3600,
+    "diagnose": 3600
+}
+
+DEFAULT_MAX_ENTRIES = 1024
+
+def make_key(function_name, arguments):
+    """Cache key: the tool name plus its arguments as sorted, compact JSON"""
+    return function_name + ":" + json.dumps(arguments, sort_keys=True, separators=(",", ":"))
+
+class ToolCache:
+    """
+    LRU + TTL cache of tool results with an optional SQLite tier.
+
+    Safe to share between the threads that execute one turn's tool calls.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttls=None, path=None, namespace=""):
+        """
+        Args:
+            max_entries: Maximum number of results held in memory
+            ttls: Dictionary mapping tool names to time to live in seconds
+                (defaults to DEFAULT_TTLS); other tools are never cached
+            path: Optional SQLite file that persists results across sessions
+            namespace: Prefix for every key, naming the data the tools read
+                (e.g. the patient VCF), so results from other data never match
+        """
+        self.max_entries = max_entries
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.namespace = namespace
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, result TEXT NOT NULL)"
+            )
+            self._db.execute("DELETE FROM tool_results WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    def cacheable(self, function_name):
+        return function_name in self.ttls
+
+    def get(self, function_name, arguments):
+        """
+        Look up a cached result.
+
+        Returns:
+            (found, result) tuple
+        """
+        key = self.namespace + make_key(function_name, arguments)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return True, result
+                del self._entries[key]
+                self.stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, result FROM tool_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[0] > now:
+                    result = json.loads(row[1])
+                    self._remember(key, row[0], result)
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return True, result
+                if row:
+                    self._db.execute("DELETE FROM tool_results WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats["expirations"] += 1
+
+            self.stats["misses"] += 1
+            return False, None
+
+    def contains(self, function_name, arguments):
+        """Whether an unexpired result is held in memory, without counting a lookup"""
+        key = self.namespace + make_key(function_name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def put(self, function_name, arguments, result):
+        """Cache a tool result (error results are not cached)"""
+        if not self.cacheable(function_name) or (isinstance(result, dict) and "error" in result):
+            return
+        key = self.namespace + make_key(function_name, arguments)
+        expires_at = time.time() + self.ttls[function_name]
+        with self._lock:
+            self._remember(key, expires_at, result)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tool_results (key, expires_at, result) VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(result))
+                )
+                self._db.commit()
+
+    def _remember(self, key, expires_at, result):
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def summary(self):
+        """One-line description of the cache counters"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"Tool cache: {self.stats['hits']} hit(s) ({self.stats['disk_hits']} from disk), "
+            f"{self.stats['misses']} miss(es), {self.stats['evictions']} eviction(s), "
+            f"{self.stats['expirations']} expiration(s), hit rate {hit_rate:.0%}"
+        )
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
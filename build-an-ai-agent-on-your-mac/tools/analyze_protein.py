@@ -1,3 +1,9 @@
+import time
+
+import numpy as np
+
+from tools.sequence_store import resolve_sequence, sequence_fields
+
 analyze_protein_schema = {
     "type": "function",
     "function": {
@@ -8,7 +14,11 @@ analyze_protein_schema = {
             "properties": {
                 "sequence": {
                     "type": "string",
-                    "description": "The protein sequence to analyze (single-letter amino acid codes, e.g., 'MAIVMGR')"
+                    "description": "The protein sequence to analyze (single-letter amino acid codes, e.g., 'MAIVMGR'), or the ID of a stored one (e.g., 'protein_1')"
+                },
+                "hydropathy_window": {
+                    "type": "integer",
+                    "description": "Optional Kyte-Doolittle sliding window size (e.g., 19 to look for transmembrane segments)"
                 }
             },
             "required": ["sequence"]
@@ -16,69 +26,243 @@ analyze_protein_schema = {
     }
 }
 
-def analyze_protein(sequence):
+# Molecular weights of amino acids (in Daltons)
+aa_weights = {
+    'A': 89.1, 'R': 174.2, 'N': 132.1, 'D': 133.1, 'C': 121.2,
+    'Q': 146.2, 'E': 147.1, 'G': 75.1, 'H': 155.2, 'I': 131.2,
+    'L': 131.2, 'K': 146.2, 'M': 149.2, 'F': 165.2, 'P': 115.1,
+    'S': 105.1, 'T': 119.1, 'W': 204.2, 'Y': 181.2, 'V': 117.1
+}
+
+# pKa values for rough pI estimation
+aa_charge = {
+    'D': -1, 'E': -1,  # Acidic
+    'K': 1, 'R': 1, 'H': 0.5  # Basic
+}
+
+# Hydrophobicity scale (Kyte-Doolittle)
+hydrophobicity = {
+    'I': 4.5, 'V': 4.2, 'L': 3.8, 'F': 2.8, 'C': 2.5,
+    'M': 1.9, 'A': 1.8, 'G': -0.4, 'T': -0.7, 'S': -0.8,
+    'W': -0.9, 'Y': -1.3, 'P': -1.6, 'H': -3.2, 'E': -3.5,
+    'Q': -3.5, 'D': -3.5, 'N': -3.5, 'K': -3.9, 'R': -4.5
+}
+
+# pKa values of the termini and ionizable side chains (EMBOSS)
+N_TERMINUS_PKA = 8.6
+C_TERMINUS_PKA = 3.6
+positive_pka = {'K': 10.8, 'R': 12.5, 'H': 6.5}
+negative_pka = {'D': 3.9, 'E': 4.1, 'C': 8.5, 'Y': 10.1}
+
+WATER_WEIGHT = 18.015
+
+# Kyte-Doolittle window score above which a segment may span a membrane
+TRANSMEMBRANE_THRESHOLD = 1.6
+
+# Columns of the composition matrix: the standard amino acids, then everything else
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+COMPOSITION_COLUMNS = list(AMINO_ACIDS) + ['other']
+COMPOSITION_COLUMN = np.full(256, len(AMINO_ACIDS), dtype=np.int64)
+for _column, _amino_acid in enumerate(AMINO_ACIDS):
+    COMPOSITION_COLUMN[ord(_amino_acid)] = _column
+
+def _column_values(table):
+    return np.array([table.get(column, 0.0) for column in COMPOSITION_COLUMNS])
+
+# Per-column property vectors, so properties are composition @ vector
+WEIGHT_BY_COLUMN = _column_values(aa_weights)
+CHARGE_BY_COLUMN = _column_values(aa_charge)
+HYDROPHOBICITY_BY_COLUMN = _column_values(hydrophobicity)
+
+def _pka_columns(table):
+    columns = [COMPOSITION_COLUMNS.index(amino_acid) for amino_acid in table]
+    return columns, np.array(list(table.values()))
+
+POSITIVE_COLUMNS, POSITIVE_PKA = _pka_columns(positive_pka)
+NEGATIVE_COLUMNS, NEGATIVE_PKA = _pka_columns(negative_pka)
+
+# Kyte-Doolittle value of every byte value
+HYDROPHOBICITY_LUT = np.zeros(256)
+for _amino_acid, _value in hydrophobicity.items():
+    HYDROPHOBICITY_LUT[ord(_amino_acid)] = _value
+
+def encode_proteins(sequences):
     """
-    Analyze protein sequence properties including molecular weight,
-    isoelectric point estimate, and amino acid composition.
+    Concatenate protein sequences into one byte array.
+
+    Returns:
+        (residues, sequence_ids, lengths): the uint8 residues, the index of
+        the sequence each residue belongs to, and the length of each sequence
     """
-    # Molecular weights of amino acids (in Daltons)
-    aa_weights = {
-        'A': 89.1, 'R': 174.2, 'N': 132.1, 'D': 133.1, 'C': 121.2,
-        'Q': 146.2, 'E': 147.1, 'G': 75.1, 'H': 155.2, 'I': 131.2,
-        'L': 131.2, 'K': 146.2, 'M': 149.2, 'F': 165.2, 'P': 115.1,
-        'S': 105.1, 'T': 119.1, 'W': 204.2, 'Y': 181.2, 'V': 117.1
-    }
-    
-    # pKa values for rough pI estimation
-    aa_charge = {
-        'D': -1, 'E': -1,  # Acidic
-        'K': 1, 'R': 1, 'H': 0.5  # Basic
+    cleaned = [sequence.upper().strip().encode('ascii', errors='replace') for sequence in sequences]
+    lengths = np.array([len(sequence) for sequence in cleaned], dtype=np.int64)
+    residues = np.frombuffer(b''.join(cleaned), dtype=np.uint8)
+    sequence_ids = np.repeat(np.arange(len(cleaned)), lengths)
+    return residues, sequence_ids, lengths
+
+def charge_at_ph(composition, ph):
+    """
+    Henderson-Hasselbalch net charge of each protein at the given pH(s).
+
+    Args:
+        composition: n x 21 composition matrix from analyze_proteins_batch
+        ph: Scalar or length-n array of pH values
+    """
+    ph = np.asarray(ph, dtype=float).reshape(-1, 1)
+    has_residues = composition.sum(axis=1) > 0
+    positive = (
+        has_residues / (1 + 10 ** (ph[:, 0] - N_TERMINUS_PKA))
+        + (composition[:, POSITIVE_COLUMNS] / (1 + 10 ** (ph - POSITIVE_PKA))).sum(axis=1)
+    )
+    negative = (
+        has_residues / (1 + 10 ** (C_TERMINUS_PKA - ph[:, 0]))
+        + (composition[:, NEGATIVE_COLUMNS] / (1 + 10 ** (NEGATIVE_PKA - ph))).sum(axis=1)
+    )
+    return positive - negative
+
+def isoelectric_points(composition, tolerance=1e-3, max_iterations=100):
+    """
+    Solve for the isoelectric point of every protein at once by bisection.
+
+    Net charge falls monotonically with pH, so each protein's [low, high]
+    bracket is halved per iteration until all brackets are narrower than
+    tolerance. Every protein is updated in the same array operation.
+
+    Returns:
+        Dictionary with the pI array (NaN for empty sequences), the number
+        of iterations and the elapsed time in seconds
+    """
+    start = time.perf_counter()
+    n = len(composition)
+    low = np.zeros(n)
+    high = np.full(n, 14.0)
+    iterations = 0
+    while iterations < max_iterations and n and (high - low).max() > tolerance:
+        middle = (low + high) / 2
+        positive = charge_at_ph(composition, middle) > 0
+        low = np.where(positive, middle, low)
+        high = np.where(positive, high, middle)
+        iterations += 1
+
+    pI = (low + high) / 2
+    pI[composition.sum(axis=1) == 0] = np.nan
+    return {
+        "pI": pI,
+        "iterations": iterations,
+        "elapsed_s": time.perf_counter() - start
     }
-    
-    # Hydrophobicity scale (Kyte-Doolittle)
-    hydrophobicity = {
-        'I': 4.5, 'V': 4.2, 'L': 3.8, 'F': 2.8, 'C': 2.5,
-        'M': 1.9, 'A': 1.8, 'G': -0.4, 'T': -0.7, 'S': -0.8,
-        'W': -0.9, 'Y': -1.3, 'P': -1.6, 'H': -3.2, 'E': -3.5,
-        'Q': -3.5, 'D': -3.5, 'N': -3.5, 'K': -3.9, 'R': -4.5
+
+def analyze_proteins_batch(sequences):
+    """
+    Compute protein properties for many sequences at once.
+
+    Every residue is visited once, by a single bincount that builds the
+    composition matrix; molecular weight, net charge and hydrophobicity are
+    then matrix-vector products of that matrix with per-amino-acid tables.
+
+    Returns:
+        Dictionary of columnar arrays, one entry per input sequence:
+        length, molecular_weight_da, net_charge, avg_hydrophobicity,
+        isoelectric_point and composition (an n x 21 count matrix with
+        COMPOSITION_COLUMNS columns), plus the isoelectric point solver's
+        isoelectric_point_iterations and isoelectric_point_seconds
+    """
+    residues, sequence_ids, lengths = encode_proteins(sequences)
+    n = len(lengths)
+    width = len(COMPOSITION_COLUMNS)
+
+    composition = np.bincount(
+        sequence_ids * width + COMPOSITION_COLUMN[residues],
+        minlength=n * width
+    ).reshape(n, width)
+
+    # Subtract water for peptide bonds
+    molecular_weight = composition @ WEIGHT_BY_COLUMN - (lengths - 1) * WATER_WEIGHT
+    net_charge = composition @ CHARGE_BY_COLUMN
+    total_hydrophobicity = composition @ HYDROPHOBICITY_BY_COLUMN
+    avg_hydrophobicity = np.divide(
+        total_hydrophobicity, lengths,
+        out=np.zeros(n), where=lengths > 0
+    )
+    solution = isoelectric_points(composition)
+
+    return {
+        "length": lengths,
+        "molecular_weight_da": molecular_weight,
+        "net_charge": net_charge,
+        "avg_hydrophobicity": avg_hydrophobicity,
+        "isoelectric_point": solution["pI"],
+        "composition": composition,
+        "isoelectric_point_iterations": solution["iterations"],
+        "isoelectric_point_seconds": solution["elapsed_s"]
     }
-    
+
+def hydropathy_profile(sequence, window=9):
+    """
+    Kyte-Doolittle hydropathy averaged over a sliding window.
+
+    Uses a cumulative sum, so each window costs one subtraction regardless of
+    window size. Element i is the mean over residues i to i + window - 1.
+    """
+    residues = np.frombuffer(sequence.upper().strip().encode('ascii', errors='replace'), dtype=np.uint8)
+    if window < 1 or len(residues) < window:
+        return np.empty(0)
+    cumulative = np.concatenate(([0.0], np.cumsum(HYDROPHOBICITY_LUT[residues])))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+def analyze_protein(sequence, hydropathy_window=None):
+    """
+    Analyze protein sequence properties including molecular weight,
+    isoelectric point estimate, and amino acid composition.
+    """
+    try:
+        sequence = resolve_sequence(sequence, "protein")
+    except ValueError as e:
+        return {"error": str(e)}
     sequence = sequence.upper().strip()
-    
-    # Calculate molecular weight
-    mw = sum(aa_weights.get(aa, 0) for aa in sequence)
-    # Subtract water for peptide bonds
-    mw -= (len(sequence) - 1) * 18.015
-    
-    # Count amino acids
-    aa_composition = {}
-    for aa in sequence:
-        aa_composition[aa] = aa_composition.get(aa, 0) + 1
-    
-    # Rough charge estimate
-    net_charge = sum(aa_charge.get(aa, 0) for aa in sequence)
-    
-    # Average hydrophobicity
-    avg_hydrophobicity = sum(hydrophobicity.get(aa, 0) for aa in sequence) / len(sequence) if sequence else 0
-    
-    # Rough pI estimate (simplified)
+    properties = analyze_proteins_batch([sequence])
+    avg_hydrophobicity = float(properties["avg_hydrophobicity"][0])
+
+    # Count amino acids, including any non-standard letters, in order of first appearance
+    codes, first, counts = np.unique(
+        np.frombuffer(sequence.encode('ascii', errors='replace'), dtype=np.uint8), return_index=True, return_counts=True
+    )
+    order = np.argsort(first)
+    aa_composition = {chr(code): int(count) for code, count in zip(codes[order], counts[order])}
+
+    # Rough pI estimate (simplified); isoelectric_point below is the solved value
     acidic_count = aa_composition.get('D', 0) + aa_composition.get('E', 0)
     basic_count = aa_composition.get('K', 0) + aa_composition.get('R', 0) + aa_composition.get('H', 0)
-    
+
     if acidic_count > basic_count:
         pI_estimate = "< 7 (acidic)"
     elif basic_count > acidic_count:
         pI_estimate = "> 7 (basic)"
     else:
         pI_estimate = "~ 7 (neutral)"
-    
-    return {
-        "protein_sequence": sequence,
+    pI = float(properties["isoelectric_point"][0])
+
+    result = {
+        **sequence_fields("protein_sequence", "protein", sequence),
         "length": len(sequence),
-        "molecular_weight_da": round(mw, 2),
-        "net_charge": round(net_charge, 1),
+        "molecular_weight_da": round(float(properties["molecular_weight_da"][0]), 2),
+        "net_charge": round(float(properties["net_charge"][0]), 1),
+        "isoelectric_point": round(pI, 2) if sequence else None,
         "pI_estimate": pI_estimate,
         "avg_hydrophobicity": round(avg_hydrophobicity, 2),
         "hydrophobicity_classification": "hydrophobic" if avg_hydrophobicity > 0 else "hydrophilic",
         "amino_acid_composition": aa_composition
     }
+
+    if hydropathy_window:
+        profile = hydropathy_profile(sequence, hydropathy_window)
+        if profile.size:
+            peak = int(np.argmax(profile))
+            result["hydropathy_profile"] = {
+                "window": hydropathy_window,
+                "max_score": round(float(profile[peak]), 2),
+                "max_window_start": peak + 1,
+                "windows_above_transmembrane_threshold": int(np.count_nonzero(profile > TRANSMEMBRANE_THRESHOLD))
+            }
+
+    return result
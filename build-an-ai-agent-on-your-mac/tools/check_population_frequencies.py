@@ -0,0 +1,45 @@
+import math
+
+from tools.check_population_frequency import frequency_result
+from tools.frequency_index import as_float, get_frequency_index
+
+check_population_frequencies_schema = {
+    "type": "function",
+    "function": {
+        "name": "check_population_frequencies",
+        "description": "Check allele frequencies of several variants in gnomAD population database in one call",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "variants": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Variant IDs (e.g., ['chr2:166245425:T:C', 'chr17:43094464:G:A'])"
+                }
+            },
+            "required": ["variants"]
+        }
+    }
+}
+
+def check_population_frequencies(variants):
+    """
+    Check the allele frequencies of many variants with one index lookup.
+    Returns each variant's check_population_frequency result, keyed by variant ID.
+    """
+    variants = list(dict.fromkeys(variants))
+    
+    # Look up all frequencies at once (NaN when a variant is not in the database)
+    frequencies = get_frequency_index().lookup_many(variants)
+    
+    results = {}
+    for variant, frequency in zip(variants, frequencies):
+        found = None if math.isnan(frequency) else as_float(frequency)
+        results[variant] = frequency_result(variant, found)
+    
+    return {
+        "results": results,
+        "count": len(results),
+        "rare_variants": [variant for variant, result in results.items()
+                          if result["classification"] in ("ultra-rare", "rare")]
+    }
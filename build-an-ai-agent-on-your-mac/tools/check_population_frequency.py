@@ -1,3 +1,5 @@
+from tools.frequency_index import get_frequency_index
+
 check_population_frequency_schema = {
     "type": "function",
     "function": {
@@ -16,35 +18,26 @@ check_population_frequency_schema = {
     }
 }
 
-def check_population_frequency(variant):
-    """
-    Check the allele frequency of a variant in population databases.
-    Returns frequency and rarity classification.
-    """
-    # Simulated gnomAD frequency data
-    frequency_database = {
-        'chr2:166245425:T:C': 0.00001,
-        'chr17:43094464:G:A': 0.0002,
-        'chr17:7675088:C:T': 0.15,
-        'chr19:44905796:C:T': 0.25
-    }
-    
-    # Look up frequency
-    frequency = frequency_database.get(variant, 0.0)
-    
-    # Classify rarity
-    if frequency == 0.0:
-        classification = "not found in database"
-        rarity = "unknown"
+def classify_frequency(frequency):
+    """(classification, rarity) of an allele frequency, None meaning not found"""
+    if frequency is None:
+        return "not found in database", "unknown"
+    elif frequency == 0.0:
+        # In the database, but the allele was never observed
+        return "not observed", "absent"
     elif frequency < 0.0001:
-        classification = "ultra-rare"
-        rarity = "very rare"
+        return "ultra-rare", "very rare"
     elif frequency < 0.01:
-        classification = "rare"
-        rarity = "rare"
+        return "rare", "rare"
     else:
-        classification = "common"
-        rarity = "common"
+        return "common", "common"
+
+def frequency_result(variant, found):
+    """check_population_frequency's result for a variant, given its frequency (None if not found)"""
+    frequency = 0.0 if found is None else found
+    
+    # Classify rarity
+    classification, rarity = classify_frequency(found)
     
     return {
         "variant_id": variant,
@@ -53,3 +46,11 @@ def check_population_frequency(variant):
         "rarity": rarity,
         "interpretation": f"Variant has allele frequency of {frequency} ({rarity})"
     }
+
+def check_population_frequency(variant):
+    """
+    Check the allele frequency of a variant in population databases.
+    Returns frequency and rarity classification.
+    """
+    # Look up frequency (0.0 when the variant is not in the database)
+    return frequency_result(variant, get_frequency_index().lookup(variant))
@@ -1,8 +1,10 @@
+from tools.variant_store import get_variant_backend
+
 check_variant_schema = {
     "type": "function",
     "function": {
         "name": "check_variant",
-        "description": "Check if patient has a variant in a specific gene",
+        "description": "Check if patient has variants in a specific gene (returns all variants in the gene)",
         "parameters": {
             "type": "object",
             "properties": {
@@ -16,35 +18,58 @@ check_variant_schema = {
     }
 }
 
-def check_variant(gene):
+# Variants listed in one result; the rest are counted but not listed
+MAX_VARIANTS_RETURNED = 50
+
+def variant_result(gene, variants):
     """
-    Check if a patient has a variant in the specified gene.
-    Returns variant information if found.
+    The check_variant result of a gene from its region's variants
+    (None when the gene is not in the interval table).
     """
-    # Simulated patient variant data
-    patient_variants = {
-        'SCN1A': 'chr2:166245425:T:C',
-        'BRCA1': 'chr17:43094464:G:A',
-        'TP53': 'chr17:7675088:C:T'
-    }
-    
-    # Normalize gene symbol
-    gene_upper = gene.upper().strip()
-    
-    # Check for variant
-    variant = patient_variants.get(gene_upper)
-    
-    if variant:
+    if variants is None:
         return {
-            "gene": gene_upper,
+            "gene": gene,
+            "variant_found": False,
+            "variant_id": None,
+            "variants": [],
+            "message": f"Gene {gene} is not in the gene interval table"
+        }
+    
+    if variants:
+        variant = variants[0]["variant_id"]
+        result = {
+            "gene": gene,
             "variant_found": True,
             "variant_id": variant,
-            "message": f"Patient has variant {variant} in gene {gene_upper}"
+            "variant_count": len(variants),
+            "variants": variants[:MAX_VARIANTS_RETURNED],
+            "message": (
+                f"Patient has variant {variant} in gene {gene}" if len(variants) == 1
+                else f"Patient has {len(variants)} variants in gene {gene}"
+            )
         }
+        if len(variants) > MAX_VARIANTS_RETURNED:
+            result["truncated"] = True
+        return result
     else:
         return {
-            "gene": gene_upper,
+            "gene": gene,
             "variant_found": False,
             "variant_id": None,
-            "message": f"No variant found in gene {gene_upper}"
+            "variants": [],
+            "message": f"No variant found in gene {gene}"
         }
+
+def check_variant(gene):
+    """
+    Check if a patient has a variant in the specified gene.
+    Returns every variant found in the gene's region (variant_id is the first).
+    """
+    backend = get_variant_backend()
+    
+    # Normalize gene symbol
+    gene_upper = gene.upper().strip()
+    
+    # Look up the gene's region and query the patient's variants in it
+    interval = backend.gene_intervals.get(gene_upper)
+    return variant_result(gene_upper, None if interval is None else backend.query(*interval))
@@ -0,0 +1,41 @@
+from tools.check_variant import variant_result
+from tools.variant_store import get_variant_backend
+
+check_variants_schema = {
+    "type": "function",
+    "function": {
+        "name": "check_variants",
+        "description": "Check if patient has variants in several genes in one call (returns all variants in each gene)",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "genes": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Gene symbols (e.g., ['SCN1A', 'KCNQ2'])"
+                }
+            },
+            "required": ["genes"]
+        }
+    }
+}
+
+def check_variants(genes):
+    """
+    Check many genes for patient variants with one backend query.
+    Returns each gene's check_variant result, keyed by gene symbol, plus every variant found.
+    """
+    if not isinstance(genes, list) or not genes or not all(isinstance(gene, str) for gene in genes):
+        return {"error": "genes must be a non-empty list of gene symbols"}
+    genes = list(dict.fromkeys(gene.upper().strip() for gene in genes))
+    
+    # One pass over each chromosome's regions, in genomic order
+    found = get_variant_backend().query_many(genes)
+    results = {gene: variant_result(gene, found.get(gene)) for gene in genes}
+    
+    return {
+        "results": results,
+        "count": len(results),
+        "genes_with_variants": [gene for gene, result in results.items() if result["variant_found"]],
+        "variant_ids": [variant["variant_id"] for result in results.values() for variant in result["variants"]]
+    }
@@ -0,0 +1,290 @@
+"""
+SQLite-backed ClinVar store for query_clinvar.
+
+A bulk loader streams ClinVar's variant_summary.txt(.gz) or its VCF into an
+SQLite file keyed by chrN:pos:ref:alt. Rows are inserted in large batches
+into an unindexed staging table inside one transaction, then copied in key
+order into a WITHOUT ROWID table, which is much faster than keeping a
+B-tree index up to date row by row.
+
+Queries go through fixed SQL strings, which sqlite3 keeps as prepared
+statements on each connection. Every thread gets its own read-only
+connection. Many variants are looked up in one query through json_each.
+
+Load a release, run from build-an-ai-agent-on-your-mac/:
+    python -m tools.clinvar_store variant_summary.txt.gz clinvar.sqlite
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Rows per executemany batch while loading
+LOAD_BATCH_SIZE = 50_000
+
+# ClinVar review statuses, as the number of stars ClinVar shows for them
+REVIEW_STARS = {
+    "practice guideline": 4,
+    "reviewed by expert panel": 3,
+    "criteria provided, multiple submitters, no conflicts": 2,
+    "criteria provided, conflicting classifications": 1,
+    "criteria provided, conflicting interpretations": 1,
+    "criteria provided, single submitter": 1
+}
+
+SELECT_ONE = "SELECT variant_id, significance, stars, condition, gene FROM clinvar WHERE variant_id = ?"
+SELECT_MANY = (
+    "SELECT variant_id, significance, stars, condition, gene FROM clinvar "
+    "WHERE variant_id IN (SELECT value FROM json_each(?))"
+)
+
+# Simulated ClinVar data, served when no database is configured
+SIMULATED_CLINVAR = {
+    'chr2:166245425:T:C': {
+        'significance': 'Pathogenic',
+        'review_status': '3-star',
+        'condition': 'Dravet syndrome'
+    },
+    'chr17:43094464:G:A': {
+        'significance': 'Likely pathogenic',
+        'review_status': '2-star',
+        'condition': 'Breast-ovarian cancer, familial'
+    },
+    'chr17:7675088:C:T': {
+        'significance': 'Benign',
+        'review_status': '2-star',
+        'condition': 'Li-Fraumeni syndrome'
+    },
+    'chr19:44905796:C:T': {
+        'significance': 'Benign/Likely benign',
+        'review_status': '2-star',
+        'condition': 'not provided'
+    }
+}
+
+def normalize_variant_id(variant):
+    """chrN:pos:REF:ALT form of a variant id, whatever its chr prefix and case"""
+    parts = variant.strip().split(':')
+    if len(parts) != 4:
+        return variant.strip()
+    chrom, pos, ref, alt = parts
+    if chrom.lower().startswith('chr'):
+        chrom = chrom[3:]
+    return f"chr{chrom.upper()}:{pos}:{ref.upper()}:{alt.upper()}"
+
+def review_stars(review_status):
+    return REVIEW_STARS.get(review_status.strip().lower(), 0)
+
+def _open(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    return opener(path, 'rt', encoding='utf-8', errors='replace')
+
+def iter_variant_summary(path, assembly="GRCh38"):
+    """Stream (variant_id, significance, stars, condition, gene) rows from variant_summary.txt"""
+    with _open(path) as handle:
+        header = handle.readline().lstrip('#').rstrip('\n').split('\t')
+        column = {name: i for i, name in enumerate(header)}
+        for line in handle:
+            fields = line.rstrip('\n').split('\t')
+            if fields[column['Assembly']] != assembly:
+                continue
+            pos = fields[column['PositionVCF']]
+            ref = fields[column['ReferenceAlleleVCF']]
+            alt = fields[column['AlternateAlleleVCF']]
+            if not pos.isdigit() or ref in ('na', '-') or alt in ('na', '-'):
+                continue
+            yield (
+                normalize_variant_id(f"{fields[column['Chromosome']]}:{pos}:{ref}:{alt}"),
+                fields[column['ClinicalSignificance']],
+                review_stars(fields[column['ReviewStatus']]),
+                fields[column['PhenotypeList']].replace('|', '; '),
+                fields[column['GeneSymbol']]
+            )
+
+def iter_clinvar_vcf(path):
+    """Stream (variant_id, significance, stars, condition, gene) rows from the ClinVar VCF"""
+    with _open(path) as handle:
+        for line in handle:
+            if line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t', 8)
+            info = dict(item.split('=', 1) for item in fields[7].split(';') if '=' in item)
+            if 'CLNSIG' not in info or fields[4] == '.':
+                continue
+            gene = info.get('GENEINFO', '').split(':')[0]
+            for alt in fields[4].split(','):
+                yield (
+                    normalize_variant_id(f"{fields[0]}:{fields[1]}:{fields[3]}:{alt}"),
+                    info['CLNSIG'].replace('_', ' '),
+                    review_stars(info.get('CLNREVSTAT', '').replace('_', ' ')),
+                    info.get('CLNDN', '').replace('_', ' ').replace('|', '; '),
+                    gene
+                )
+
+def load_clinvar(source_path, db_path, assembly="GRCh38", batch_size=LOAD_BATCH_SIZE):
+    """
+    Bulk-load a ClinVar release into an SQLite file, replacing its contents.
+
+    Args:
+        source_path: variant_summary.txt(.gz), or a ClinVar VCF (.vcf/.vcf.gz)
+        db_path: SQLite file to write
+        assembly: Assembly whose coordinates are kept (variant_summary only)
+        batch_size: Rows per executemany call
+
+    Returns:
+        (rows_read, variants_stored) tuple
+    """
+    is_vcf = '.vcf' in os.path.basename(source_path)
+    rows = iter_clinvar_vcf(source_path) if is_vcf else iter_variant_summary(source_path, assembly)
+
+    db = sqlite3.connect(db_path)
+    try:
+        # Durability is pointless for a file rebuilt from source
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        db.execute("PRAGMA cache_size = -262144")
+        db.execute("DROP TABLE IF EXISTS clinvar")
+        db.execute("DROP TABLE IF EXISTS metadata")
+        db.execute(
+            "CREATE TEMP TABLE staging (variant_id TEXT, significance TEXT, stars INTEGER, condition TEXT, gene TEXT)"
+        )
+
+        rows_read = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                db.executemany("INSERT INTO staging VALUES (?, ?, ?, ?, ?)", batch)
+                rows_read += len(batch)
+                batch = []
+        db.executemany("INSERT INTO staging VALUES (?, ?, ?, ?, ?)", batch)
+        rows_read += len(batch)
+
+        # Copy in key order; for a variant listed more than once the best-reviewed row wins
+        db.execute(
+            "CREATE TABLE clinvar (variant_id TEXT PRIMARY KEY, significance TEXT, stars INTEGER, "
+            "condition TEXT, gene TEXT) WITHOUT ROWID"
+        )
+        db.execute("INSERT OR REPLACE INTO clinvar SELECT * FROM staging ORDER BY variant_id, stars")
+        db.execute("DROP TABLE staging")
+        stored = db.execute("SELECT COUNT(*) FROM clinvar").fetchone()[0]
+
+        db.execute("CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)")
+        db.executemany("INSERT INTO metadata VALUES (?, ?)", [
+            ("source", os.path.abspath(source_path)),
+            ("assembly", assembly),
+            ("loaded_at", time.strftime("%Y-%m-%dT%H:%M:%S")),
+            ("variants", str(stored))
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return rows_read, stored
+
+def _entry(row):
+    variant_id, significance, stars, condition, gene = row
+    return {
+        "significance": significance,
+        "review_status": f"{stars}-star",
+        "condition": condition or "not provided",
+        "gene": gene or None
+    }
+
+class ClinVarStore:
+    """Read-only lookups in a database written by load_clinvar"""
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"ClinVar database {path} does not exist; build it with load_clinvar")
+        self.path = path
+        self.source = f"{os.path.abspath(path)}@{os.stat(path).st_mtime_ns}"
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """This thread's connection, opened on first use"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def lookup(self, variant):
+        """ClinVar entry of one variant id, or None"""
+        row = self._connection().execute(SELECT_ONE, (normalize_variant_id(variant),)).fetchone()
+        return _entry(row) if row else None
+
+    def lookup_many(self, variants):
+        """Dictionary mapping each variant id found in ClinVar to its entry, in one query"""
+        normalized = {normalize_variant_id(variant): variant for variant in variants}
+        rows = self._connection().execute(SELECT_MANY, (json.dumps(list(normalized)),)).fetchall()
+        return {normalized[row[0]]: _entry(row) for row in rows}
+
+    def close(self):
+        with self._lock:
+            for db in self._connections:
+                db.close()
+            self._connections = []
+
+class SimulatedClinVarStore:
+    """The built-in four-variant table, with the same interface as ClinVarStore"""
+
+    source = "simulated"
+
+    def lookup(self, variant):
+        return SIMULATED_CLINVAR.get(normalize_variant_id(variant))
+
+    def lookup_many(self, variants):
+        return {
+            variant: SIMULATED_CLINVAR[normalize_variant_id(variant)]
+            for variant in variants if normalize_variant_id(variant) in SIMULATED_CLINVAR
+        }
+
+    def close(self):
+        pass
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_clinvar_store():
+    """
+    The store query_clinvar uses: the one set with set_clinvar_store, or else
+    the database at CLINVAR_DB (the simulated table when it is unset)
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.environ.get("CLINVAR_DB")
+            _store = ClinVarStore(path) if path else SimulatedClinVarStore()
+        return _store
+
+def set_clinvar_store(store):
+    """Make query_clinvar use store, closing the previous one"""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = store
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-load a ClinVar release into SQLite")
+    parser.add_argument('source', help="variant_summary.txt(.gz) or clinvar.vcf(.gz)")
+    parser.add_argument('db', help="SQLite file to write")
+    parser.add_argument('--assembly', default="GRCh38", help="assembly to keep from variant_summary")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows, stored = load_clinvar(args.source, args.db, args.assembly)
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {rows:,} row(s) into {stored:,} variant(s) in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+if __name__ == '__main__':
+    main()
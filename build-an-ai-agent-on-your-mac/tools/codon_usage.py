@@ -0,0 +1,109 @@
+import numpy as np
+
+from tools.packed_sequence import PackedSequence
+from tools.sequence_io import iter_records, DEFAULT_CHUNK_SIZE
+from tools.sequence_store import resolve_stored
+from tools.translate_dna import CODON_LUT, UNKNOWN_CODON, codon_index, codon_table
+
+codon_usage_schema = {
+    "type": "function",
+    "function": {
+        "name": "codon_usage",
+        "description": (
+            "Count codon usage in a coding DNA sequence, or summed over every record of a FASTA/FASTQ file of "
+            "coding sequences, read in forward frame 1, 2 or 3 from the start of each sequence. Returns each "
+            "codon's count, frequency per thousand codons and relative synonymous codon usage (RSCU)."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sequence": {
+                    "type": "string",
+                    "description": "The coding DNA sequence, or the ID of a stored one (give either sequence or path)"
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Path to a FASTA/FASTQ file (optionally gzipped) of coding sequences"
+                },
+                "frame": {
+                    "type": "integer",
+                    "description": "Forward reading frame, 1 to 3 (default 1)"
+                }
+            }
+        }
+    }
+}
+
+# Codons grouped by amino acid, as in a codon usage table
+CODONS = sorted(codon_table, key=lambda codon: (codon_table[codon], codon))
+
+def _codon_counts(records, frame, totals):
+    """Codon counts summed over records, packing one chunk (plus the previous partial codon) at a time"""
+    counts = np.zeros(UNKNOWN_CODON, dtype=np.int64)
+    for _, chunks in records:
+        totals["records"] += 1
+        skip = frame - 1
+        carry = b''
+        for chunk in chunks:
+            totals["bases"] += len(chunk)
+            data = carry + chunk
+            # The first frame - 1 bases of a record come before its first codon
+            if skip:
+                data, skip = data[skip:], max(skip - len(data), 0)
+            usable = len(data) - len(data) % 3
+            counts += PackedSequence.from_dna(data[:usable]).codon_counts()
+            carry = data[usable:]
+    return counts
+
+def codon_usage(sequence=None, path=None, frame=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Count the codons of a coding sequence or a FASTA/FASTQ file of them.
+    Returns a codon usage table grouped by amino acid.
+    """
+    if (sequence is None) == (path is None):
+        return {"error": "Give either a DNA sequence or the path of a FASTA/FASTQ file"}
+    if frame not in (1, 2, 3):
+        return {"error": "frame must be 1, 2 or 3"}
+    try:
+        sequence = resolve_stored(sequence, "dna")
+    except ValueError as e:
+        return {"error": str(e)}
+
+    try:
+        if isinstance(sequence, PackedSequence):
+            # A stored sequence is already packed
+            totals = {"records": 1, "bases": len(sequence)}
+            counts = sequence.codon_counts(frame)
+        else:
+            totals = {"records": 0, "bases": 0}
+            counts = _codon_counts(iter_records(sequence, path, chunk_size), frame, totals)
+    except (OSError, ValueError) as e:
+        return {"error": f"Could not read {path}: {e}"}
+
+    # RSCU: a codon's count relative to the mean count of its amino acid's codons
+    amino_acids = CODON_LUT[:UNKNOWN_CODON]
+    amino_acid_counts = np.bincount(amino_acids, weights=counts, minlength=256)
+    synonymous = np.bincount(amino_acids, minlength=256)
+    total = int(counts.sum())
+    table = []
+    for codon in CODONS:
+        count = int(counts[codon_index(codon)])
+        amino_acid = ord(codon_table[codon])
+        expected = amino_acid_counts[amino_acid] / synonymous[amino_acid]
+        table.append({
+            "codon": codon,
+            "amino_acid": codon_table[codon],
+            "count": count,
+            "per_thousand": round(1000 * count / total, 2) if total else 0.0,
+            "rscu": round(count / expected, 2) if expected else None
+        })
+
+    return {
+        "source": path if path is not None else "sequence",
+        "record_count": totals["records"],
+        "sequence_length": totals["bases"],
+        "frame": frame,
+        "codon_count": total,
+        "stop_codons": int(sum(counts[codon_index(codon)] for codon in CODONS if codon_table[codon] == '*')),
+        "codons": table
+    }
@@ -0,0 +1,105 @@
+import numpy as np
+
+from tools.packed_sequence import MAX_K, PackedSequence, count_hashes, kmer_string
+from tools.sequence_io import iter_records, DEFAULT_CHUNK_SIZE
+from tools.sequence_store import resolve_stored
+
+count_kmers_schema = {
+    "type": "function",
+    "function": {
+        "name": "count_kmers",
+        "description": (
+            "Count the k-mers (substrings of length k) of a DNA sequence or of every record of a FASTA/FASTQ "
+            "file, skipping those that contain N or other ambiguous bases, and return the most frequent ones. "
+            "Use this for sequence composition, repeats or GC/dinucleotide content (k=1 or k=2)."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sequence": {
+                    "type": "string",
+                    "description": "The DNA sequence, or the ID of a stored one (give either sequence or path)"
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Path to a FASTA/FASTQ file (optionally gzipped), read as a stream"
+                },
+                "k": {
+                    "type": "integer",
+                    "description": f"k-mer length, 1 to {MAX_K} (default 6)"
+                },
+                "canonical": {
+                    "type": "boolean",
+                    "description": "Count a k-mer and its reverse complement together, as for double-stranded DNA"
+                },
+                "top": {
+                    "type": "integer",
+                    "description": "Number of most frequent k-mers returned (default 20)"
+                }
+            }
+        }
+    }
+}
+
+DEFAULT_K = 6
+DEFAULT_TOP = 20
+
+def _hash_arrays(records, k, canonical, totals):
+    """k-mer hashes of every record, packing one chunk (plus the last k-1 bases of the previous) at a time"""
+    for _, chunks in records:
+        totals["records"] += 1
+        carry = b''
+        for chunk in chunks:
+            totals["bases"] += len(chunk)
+            data = carry + chunk
+            yield from PackedSequence.from_dna(data).kmer_hashes(k, canonical)
+            carry = data[max(len(data) - k + 1, 0):] if k > 1 else b''
+
+def count_kmers(sequence=None, path=None, k=DEFAULT_K, canonical=False, top=DEFAULT_TOP,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Count the k-mers of a DNA sequence or a FASTA/FASTQ file.
+    Returns totals and the most frequent k-mers.
+    """
+    if (sequence is None) == (path is None):
+        return {"error": "Give either a DNA sequence or the path of a FASTA/FASTQ file"}
+    if not 1 <= k <= MAX_K:
+        return {"error": f"k must be between 1 and {MAX_K}"}
+    try:
+        sequence = resolve_stored(sequence, "dna")
+    except ValueError as e:
+        return {"error": str(e)}
+
+    if isinstance(sequence, PackedSequence):
+        # A stored sequence is already packed
+        totals = {"records": 1, "bases": len(sequence)}
+        hash_arrays = sequence.kmer_hashes(k, canonical)
+    else:
+        totals = {"records": 0, "bases": 0}
+        hash_arrays = _hash_arrays(iter_records(sequence, path, chunk_size), k, canonical, totals)
+    try:
+        hashes, counts = count_hashes(hash_arrays, k)
+    except (OSError, ValueError) as e:
+        return {"error": f"Could not read {path}: {e}"}
+
+    # Most frequent first, ties in k-mer order
+    total = int(counts.sum())
+    order = np.argsort(-counts, kind='stable')[:top]
+    return {
+        "source": path if path is not None else "sequence",
+        "record_count": totals["records"],
+        "sequence_length": totals["bases"],
+        "k": k,
+        "canonical": canonical,
+        "kmer_count": total,
+        "distinct_kmers": len(hashes),
+        "top_kmers": [
+            {
+                "kmer": kmer_string(int(hashes[i]), k),
+                "count": int(counts[i]),
+                "fraction": round(int(counts[i]) / total, 6)
+            }
+            for i in order
+        ],
+        "top_truncated": len(hashes) > len(order)
+    }
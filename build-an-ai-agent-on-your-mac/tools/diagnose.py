@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.search_disease_genes import search_disease_genes
+from tools.variant_store import get_variant_backend
+from tools.check_population_frequencies import check_population_frequencies
+from tools.query_clinvar_batch import query_clinvar_batch
+
+diagnose_schema = {
+    "type": "function",
+    "function": {
+        "name": "diagnose",
+        "description": (
+            "Find candidate causal variants for a disease in one call: searches the disease's genes, "
+            "checks the patient's variants in each, and ranks them by ClinVar significance and "
+            "population frequency"
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "disease": {
+                    "type": "string",
+                    "description": "Disease name (e.g., 'epilepsy', 'Dravet syndrome')"
+                }
+            },
+            "required": ["disease"]
+        }
+    }
+}
+
+# Genes checked at the same time
+MAX_PIPELINE_CONCURRENCY = 8
+
+# Candidate rows returned; the rest are counted
+MAX_CANDIDATES = 20
+
+# Rank of ClinVar significances, most suspicious first (unlisted ones rank with uncertain)
+SIGNIFICANCE_RANK = {
+    'Pathogenic': 0,
+    'Pathogenic/Likely pathogenic': 1,
+    'Likely pathogenic': 2,
+    'Uncertain significance': 3,
+    'Not in ClinVar': 4,
+    'Likely benign': 6,
+    'Benign/Likely benign': 7,
+    'Benign': 8
+}
+
+# Rank of frequency classifications, rarest first
+RARITY_RANK = {
+    'ultra-rare': 0,
+    'rare': 1,
+    'not observed': 1,
+    'not found in database': 1,
+    'common': 2
+}
+
+CANDIDATE_COLUMNS = [
+    "gene", "variant_id", "frequency", "classification", "significance", "review_status", "condition"
+]
+
+def candidate_rank(candidate):
+    """Sort key of a candidate row: ClinVar significance, then rarity, then frequency"""
+    gene, variant, frequency, classification, significance = candidate[:5]
+    return (SIGNIFICANCE_RANK.get(significance, 5), RARITY_RANK.get(classification, 1), frequency)
+
+def gene_variants(gene):
+    """Every patient variant in a gene's region (none for genes without an interval)"""
+    backend = get_variant_backend()
+    interval = backend.gene_intervals.get(gene.upper().strip())
+    return backend.query(*interval) if interval else []
+
+def diagnose(disease):
+    """
+    Run the whole search_disease_genes -> check_variant ->
+    check_population_frequency / query_clinvar chain for a disease.
+    Returns a ranked table of candidate variants.
+    """
+    # Find the disease's genes
+    genes = search_disease_genes(disease)["genes"]
+    if not genes:
+        return {
+            "disease": disease,
+            "genes": [],
+            "candidates": [],
+            "message": f"No known genes found for '{disease}'"
+        }
+
+    # Check every gene for patient variants at the same time
+    with ThreadPoolExecutor(max_workers=min(MAX_PIPELINE_CONCURRENCY, len(genes))) as executor:
+        gene_results = list(executor.map(gene_variants, genes))
+
+    variant_genes = {}
+    for gene, variants in zip(genes, gene_results):
+        for variant in variants:
+            variant_genes.setdefault(variant["variant_id"], gene)
+    variants = list(variant_genes)
+
+    # Annotate all variants with frequencies and ClinVar at once
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        frequencies = executor.submit(check_population_frequencies, variants)
+        clinvar = executor.submit(query_clinvar_batch, variants)
+        frequencies = frequencies.result()["results"]
+        clinvar = clinvar.result()["results"]
+
+    # Rank candidates, most likely causal first
+    candidates = sorted((
+        [variant_genes[variant], variant, frequencies[variant]["frequency"], frequencies[variant]["classification"],
+         clinvar[variant]["significance"], clinvar[variant]["review_status"], clinvar[variant]["condition"]]
+        for variant in variants
+    ), key=candidate_rank)
+
+    result = {
+        "disease": disease,
+        "genes": genes,
+        "genes_without_variants": [gene for gene, variants in zip(genes, gene_results) if not variants],
+        "columns": CANDIDATE_COLUMNS,
+        "candidates": candidates[:MAX_CANDIDATES],
+        "candidate_count": len(candidates)
+    }
+    if candidates:
+        gene, variant, frequency, classification, significance, review_status, condition = candidates[0]
+        result["top_candidate"] = (
+            f"{variant} in {gene}: {significance}" + (f" for {condition}" if condition else "")
+            + f", allele frequency {frequency} ({classification})"
+        )
+    else:
+        result["message"] = f"No patient variants found in the genes for '{disease}'"
+    return result
@@ -0,0 +1,352 @@
+"""
+Disease name index for search_disease_genes.
+
+Every disease name and synonym is a document. Documents are tokenized into
+lowercase words, and each word of the vocabulary has an inverted list of the
+documents containing it. A query word matches:
+
+- the same word (full weight)
+- longer words it is a prefix of, e.g. 'alzheim' -> 'alzheimer'
+- when it is not in the vocabulary at all, words sharing enough character
+  trigrams with it, e.g. 'epilepsey' -> 'epilepsy'
+
+Documents are ranked by the summed IDF of their matched words, divided by
+the square root of their length so 'epilepsy' outranks 'severe myoclonic
+epilepsy of infancy', and a document equal to the whole query ranks first.
+Inverted lists are ordered shortest name first and words are processed
+rarest first: rare words collect the candidate documents, and a common word
+such as 'syndrome' is only intersected with those candidates instead of
+having its whole list read, which keeps queries under a millisecond.
+
+The built index is pickled next to its source file and reused until the
+source changes, so startup does not rebuild it.
+
+Build one ahead of time, run from build-an-ai-agent-on-your-mac/:
+    python -m tools.disease_index phenotype_to_genes.txt
+"""
+
+import bisect
+import heapq
+import itertools
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter, defaultdict
+
+INDEX_SUFFIX = '.dindex.pkl'
+
+# Bumped whenever the pickled layout changes, so old files are rebuilt
+INDEX_VERSION = 1
+
+STOPWORDS = {'a', 'an', 'and', 'in', 'of', 'the', 'to', 'with'}
+
+# Weights of prefix and fuzzy (trigram) word matches, relative to exact ones
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.7
+
+# Smallest trigram similarity (Jaccard) for a fuzzy word match
+MIN_SIMILARITY = 0.4
+
+# Vocabulary words one query word may expand to by prefix or fuzzy match
+MAX_EXPANSIONS = 50
+
+# Documents read from the inverted lists of one query word; for words in
+# more documents than this only the candidates found so far are rescored
+MAX_POSTINGS_SCANNED = 500
+
+# Score added to a document equal to the whole query
+EXACT_NAME_BONUS = 10.0
+
+# Column names recognized in a TSV header
+NAME_COLUMNS = ('disease_name', 'hpo_name', 'disease', 'name')
+GENE_COLUMNS = ('gene_symbol', 'genes', 'gene')
+SYNONYM_COLUMNS = ('synonyms',)
+
+# Simulated gene-disease database: (disease, genes, synonyms)
+SIMULATED_DISEASES = [
+    ('epilepsy', ['SCN1A', 'KCNQ2'], ['seizure disorder']),
+    ('Dravet syndrome', ['SCN1A'], ['severe myoclonic epilepsy of infancy']),
+    ('developmental and epileptic encephalopathy', ['SCN1A', 'KCNQ2'], ['epileptic encephalopathy']),
+    ('benign familial neonatal seizures', ['KCNQ2'], ['self-limited familial neonatal epilepsy']),
+    ('cancer', ['TP53', 'BRCA1', 'BRCA2'], ['hereditary cancer predisposition']),
+    ('hereditary breast and ovarian cancer', ['BRCA1', 'BRCA2'], ['breast-ovarian cancer, familial', 'HBOC']),
+    ('Li-Fraumeni syndrome', ['TP53'], []),
+    ('diabetes', ['INS', 'GCK', 'HNF1A'], ['diabetes mellitus']),
+    ('maturity-onset diabetes of the young', ['GCK', 'HNF1A'], ['MODY']),
+    ('permanent neonatal diabetes mellitus', ['INS'], []),
+    ('alzheimer', ['APP', 'PSEN1', 'PSEN2', 'APOE'], ["Alzheimer's disease", 'alzheimer disease'])
+]
+
+def tokenize(text):
+    """Lowercase words of text, without possessives and stopwords"""
+    words = re.split(r'[^a-z0-9]+', text.lower().replace("'s", ''))
+    return [word for word in words if word and word not in STOPWORDS]
+
+def trigrams(word):
+    """Character trigrams of a word padded with '$' at both ends"""
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def read_disease_genes(path):
+    """
+    Read a disease-gene association file into (disease, genes, synonyms) entries.
+
+    A TSV with a header naming a disease column (disease_name, hpo_name,
+    disease or name) and a gene column (gene_symbol, genes or gene) is read
+    by column name, which covers HPO's phenotype_to_genes.txt and
+    genes_to_phenotype.txt; an optional synonyms column holds '|'-separated
+    names. Without such a header the columns are disease, genes and
+    synonyms. Gene cells may hold several comma-separated symbols, and rows
+    naming the same disease are merged.
+    """
+    genes = defaultdict(dict)
+    synonyms = defaultdict(dict)
+    with open(path) as handle:
+        first = handle.readline()
+        header = [column.strip().lower() for column in first.lstrip('#').rstrip('\n').split('\t')]
+        name_column = next((header.index(name) for name in NAME_COLUMNS if name in header), None)
+        gene_column = next((header.index(name) for name in GENE_COLUMNS if name in header), None)
+        if name_column is None or gene_column is None:
+            # No header: the first line is data
+            name_column, gene_column, synonym_column = 0, 1, 2
+            lines = itertools.chain([first], handle)
+        else:
+            synonym_column = next((header.index(name) for name in SYNONYM_COLUMNS if name in header), None)
+            lines = handle
+
+        for line in lines:
+            fields = line.rstrip('\n').split('\t')
+            if line.startswith('#') or len(fields) <= max(name_column, gene_column):
+                continue
+            name = fields[name_column].strip()
+            for gene in fields[gene_column].split(','):
+                if gene.strip() and gene.strip() != '-':
+                    genes[name][gene.strip()] = None
+            if synonym_column is not None and synonym_column < len(fields):
+                for synonym in fields[synonym_column].split('|'):
+                    if synonym.strip():
+                        synonyms[name][synonym.strip()] = None
+
+    return [(name, list(genes[name]), list(synonyms[name])) for name in genes]
+
+class DiseaseIndex:
+    """Inverted index of disease names and synonyms, with the genes of each disease"""
+
+    def __init__(self, diseases, source):
+        """
+        Args:
+            diseases: List of (disease, genes, synonyms) entries
+            source: Name of the data, for cache keys
+        """
+        self.source = source
+        self.diseases = [name for name, _, _ in diseases]
+        self.genes = [tuple(genes) for _, genes, _ in diseases]
+
+        # One document per disease name or synonym
+        self.documents = []
+        self.document_disease = []
+        self.document_lengths = []
+        self.normalized_names = {}
+        postings = defaultdict(list)
+        for disease, (name, _, names) in enumerate(diseases):
+            for term in [name] + list(names):
+                words = tokenize(term)
+                if not words:
+                    continue
+                document = len(self.documents)
+                self.documents.append(term)
+                self.document_disease.append(disease)
+                self.document_lengths.append(len(words))
+                self.normalized_names.setdefault(' '.join(words), document)
+                for word in set(words):
+                    postings[word].append(document)
+
+        # Sorted vocabulary, so prefixes are ranges found by bisection
+        self.vocabulary = sorted(postings)
+        self.word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+        # Shortest names first: for a single word they are also the best scoring
+        self.postings = [sorted(postings[word], key=self.document_lengths.__getitem__) for word in self.vocabulary]
+        self.length_norms = [1 / math.sqrt(length) for length in self.document_lengths]
+
+        # Common words' documents as sets too, for intersecting with candidates
+        self.posting_sets = {
+            i: set(documents) for i, documents in enumerate(self.postings) if len(documents) > MAX_POSTINGS_SCANNED
+        }
+        self.idf = [math.log(1 + len(self.documents) / len(documents)) for documents in self.postings]
+        self.trigram_words = defaultdict(list)
+        for i, word in enumerate(self.vocabulary):
+            for trigram in trigrams(word):
+                self.trigram_words[trigram].append(i)
+        self.trigram_words = dict(self.trigram_words)
+
+    def __len__(self):
+        return len(self.diseases)
+
+    @classmethod
+    def build(cls, path):
+        """Index a disease-gene association file (see read_disease_genes)"""
+        return cls(read_disease_genes(path), f"{os.path.abspath(path)}@{os.stat(path).st_mtime_ns}")
+
+    def save(self, path):
+        with open(path, 'wb') as handle:
+            pickle.dump((INDEX_VERSION, self.__dict__), handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved index, or return None if it was saved by another version"""
+        with open(path, 'rb') as handle:
+            version, state = pickle.load(handle)
+        if version != INDEX_VERSION:
+            return None
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+    @classmethod
+    def open(cls, path):
+        """
+        Index of a disease-gene association file, loaded from the pickle next
+        to it when that is up to date, else built and saved there
+        """
+        source = f"{os.path.abspath(path)}@{os.stat(path).st_mtime_ns}"
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            index = cls.load(index_path)
+            if index is not None and index.source == source:
+                return index
+        index = cls.build(path)
+        index.save(index_path)
+        return index
+
+    def expand(self, word):
+        """(word id, weight) pairs of the vocabulary words a query word matches"""
+        matches = {}
+        exact = self.word_ids.get(word)
+        if exact is not None:
+            matches[exact] = 1.0
+
+        # Words starting with the query word
+        if len(word) >= 3:
+            start = bisect.bisect_left(self.vocabulary, word)
+            end = min(bisect.bisect_left(self.vocabulary, word + '\uffff'), start + MAX_EXPANSIONS)
+            for i in range(start, end):
+                matches.setdefault(i, PREFIX_WEIGHT)
+
+        # Words with similar spelling, only when the word itself is unknown
+        if exact is None and len(word) >= 3:
+            query_trigrams = trigrams(word)
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self.trigram_words.get(trigram, ()))
+            for i, count in shared.most_common(MAX_EXPANSIONS):
+                similarity = count / (len(query_trigrams) + len(trigrams(self.vocabulary[i])) - count)
+                if similarity >= MIN_SIMILARITY:
+                    matches.setdefault(i, FUZZY_WEIGHT * similarity)
+        return matches
+
+    def search(self, query, limit=10):
+        """
+        Diseases best matching a query, at most one entry per disease.
+
+        Returns:
+            List of {"disease", "matched", "score", "genes"} dictionaries,
+            best first; matched is the name or synonym that matched
+        """
+        words = tokenize(query)
+        expanded = [matches for matches in map(self.expand, dict.fromkeys(words)) if matches]
+
+        # Rarest words first: their short inverted lists pick the candidates
+        expanded.sort(key=lambda matches: sum(len(self.postings[i]) for i in matches))
+        scores = defaultdict(float)
+        for matches in expanded:
+            best = {}
+            if scores and sum(len(self.postings[i]) for i in matches) > MAX_POSTINGS_SCANNED:
+                # A common word only adds to the candidates it occurs in
+                for i, weight in matches.items():
+                    score = weight * self.idf[i]
+                    documents = self.posting_sets.get(i) or set(self.postings[i])
+                    for document in documents.intersection(scores):
+                        if score > best.get(document, 0.0):
+                            best[document] = score
+            else:
+                # Best matching vocabulary words first, until the scan budget is spent
+                budget = MAX_POSTINGS_SCANNED
+                for i in sorted(matches, key=lambda i: matches[i] * self.idf[i], reverse=True):
+                    score = matches[i] * self.idf[i]
+                    for document in self.postings[i][:budget]:
+                        if score > best.get(document, 0.0):
+                            best[document] = score
+                    budget -= len(self.postings[i])
+                    if budget <= 0:
+                        break
+            for document, score in best.items():
+                scores[document] += score
+
+        for document in scores:
+            scores[document] *= self.length_norms[document]
+        exact = self.normalized_names.get(' '.join(words))
+        if exact is not None:
+            scores[exact] += EXACT_NAME_BONUS
+
+        # Several names of one disease may score, so look a little past limit
+        ranked = heapq.nlargest(limit * 4, scores, key=scores.get)
+        if len(ranked) < len(scores) and len({self.document_disease[document] for document in ranked}) < limit:
+            ranked = sorted(scores, key=scores.get, reverse=True)
+
+        results = []
+        seen = set()
+        for document in ranked:
+            disease = self.document_disease[document]
+            if disease in seen:
+                continue
+            seen.add(disease)
+            results.append({
+                "disease": self.diseases[disease],
+                "matched": self.documents[document],
+                "score": round(scores[document], 3),
+                "genes": list(self.genes[disease])
+            })
+            if len(results) == limit:
+                break
+        return results
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_disease_index():
+    """
+    The index search_disease_genes uses: the one set with set_disease_index,
+    or else one of the file at DISEASE_GENES (the simulated diseases when it
+    is unset)
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = os.environ.get("DISEASE_GENES")
+            _index = DiseaseIndex.open(path) if path else DiseaseIndex(SIMULATED_DISEASES, "simulated")
+        return _index
+
+def set_disease_index(index):
+    """Make search_disease_genes use index"""
+    global _index
+    with _index_lock:
+        _index = index
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build the disease name index of a disease-gene association file")
+    parser.add_argument('source', help="TSV such as HPO's phenotype_to_genes.txt, or disease, genes, synonyms")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = DiseaseIndex.build(args.source)
+    index.save(args.source + INDEX_SUFFIX)
+    print(f"Indexed {len(index):,} disease(s), {len(index.documents):,} name(s) and "
+          f"{len(index.vocabulary):,} word(s) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+import heapq
+from operator import itemgetter
+
+import numpy as np
+
+from tools.packed_sequence import PackedSequence
+from tools.sequence_io import iter_records, DEFAULT_CHUNK_SIZE
+from tools.translate_dna import (
+    BASES, CODON_LUT, UNKNOWN_CODON, clean_dna, codon_index, codon_indices, codon_table, encode_dna
+)
+from tools.analyze_protein import analyze_proteins_batch
+from tools.sequence_store import resolve_stored, sequence_fields
+
+find_orfs_schema = {
+    "type": "function",
+    "function": {
+        "name": "find_orfs",
+        "description": (
+            "Find open reading frames (ATG to stop codon) in all six reading frames of a DNA sequence or of a "
+            "FASTA/FASTQ file, and return the longest ones with their coordinates and protein sequences. "
+            "Use this to find coding regions in a genomic region."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sequence": {
+                    "type": "string",
+                    "description": "The DNA sequence to search, or the ID of a stored one (give either sequence or path)"
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Path to a FASTA/FASTQ file (optionally gzipped), read as a stream"
+                },
+                "min_length": {
+                    "type": "integer",
+                    "description": "Minimum ORF length in amino acids, not counting the stop codon (default 100)"
+                },
+                "max_orfs": {
+                    "type": "integer",
+                    "description": "Maximum number of ORFs returned, longest first (default 10)"
+                },
+                "analyze": {
+                    "type": "boolean",
+                    "description": "Also compute molecular weight, isoelectric point and hydrophobicity of each returned ORF's protein"
+                }
+            }
+        }
+    }
+}
+
+DEFAULT_MIN_LENGTH = 100
+DEFAULT_MAX_ORFS = 10
+
+def reverse_complement(codon):
+    return codon[::-1].translate(str.maketrans(BASES, BASES[::-1]))
+
+# Codon classes by codon index. A reverse strand ORF reads, in forward strand
+# coordinates, from a reverse-complemented stop codon up to a CAT (reverse
+# complement of ATG), so both strands are found in one forward pass.
+STOP_CODONS = [codon for codon, amino_acid in codon_table.items() if amino_acid == '*']
+
+def _codon_mask(codons):
+    mask = np.zeros(UNKNOWN_CODON + 1, dtype=bool)
+    mask[[codon_index(codon) for codon in codons]] = True
+    return mask
+
+FORWARD_START = codon_index('ATG')
+REVERSE_START = codon_index(reverse_complement('ATG'))
+FORWARD_STOP = _codon_mask(STOP_CODONS)
+REVERSE_STOP = _codon_mask([reverse_complement(codon) for codon in STOP_CODONS])
+
+# Amino acid of every codon index read on the reverse strand
+REVERSE_CODON_LUT = np.full(UNKNOWN_CODON + 1, ord('X'), dtype=np.uint8)
+for _codon, _amino_acid in codon_table.items():
+    REVERSE_CODON_LUT[codon_index(reverse_complement(_codon))] = ord(_amino_acid)
+
+def _forward_orfs(codons, min_length):
+    """
+    ORFs of one forward frame, as (start, stop) codon numbers within it.
+
+    An ORF runs from the first ATG after a stop codon (or a codon with an
+    unknown base, or the start of the frame) up to the next stop codon.
+
+    Returns:
+        (starts, stops, last_boundary): arrays of ORF start and stop codon
+        numbers, and the codon number of the frame's last boundary (-1 if none)
+    """
+    boundaries = np.flatnonzero(FORWARD_STOP[codons] | (codons == UNKNOWN_CODON))
+    starts = np.flatnonzero(codons == FORWARD_START)
+    if not boundaries.size:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), -1
+    previous = np.concatenate(([-1], boundaries[:-1]))
+    first_start = np.searchsorted(starts, previous + 1)
+    has_start = first_start < len(starts)
+    orf_starts = np.where(has_start, starts[np.minimum(first_start, len(starts) - 1)] if starts.size else 0, -1)
+    keep = has_start & (orf_starts < boundaries) & (codons[boundaries] != UNKNOWN_CODON)
+    keep &= boundaries - orf_starts >= min_length
+    return orf_starts[keep], boundaries[keep], int(boundaries[-1])
+
+def _reverse_orfs(codons, min_length, final):
+    """
+    ORFs of one reverse strand frame, as (stop, start) codon numbers in forward order.
+
+    Read right to left, an ORF starts at the first CAT before the next
+    boundary to its right and runs down to a reverse-complemented stop codon.
+    Until final, the stretch after the last boundary is left for later.
+
+    Returns:
+        (stops, starts, last_boundary), as for _forward_orfs
+    """
+    boundaries = np.flatnonzero(REVERSE_STOP[codons] | (codons == UNKNOWN_CODON))
+    starts = np.flatnonzero(codons == REVERSE_START)
+    if not boundaries.size:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), -1
+    # The boundary to the right of each one; past the last, the end of the sequence if it has ended
+    right = np.concatenate((boundaries[1:], [len(codons)])) if final else boundaries[1:]
+    left = boundaries[:len(right)]
+    last_start = np.searchsorted(starts, right) - 1
+    has_start = last_start >= 0
+    orf_starts = np.where(has_start, starts[np.maximum(last_start, 0)] if starts.size else 0, -1)
+    keep = has_start & (orf_starts > left) & (codons[left] != UNKNOWN_CODON)
+    keep &= orf_starts - left >= min_length
+    return left[keep], orf_starts[keep], int(boundaries[-1])
+
+def iter_orfs(chunks, min_length=DEFAULT_MIN_LENGTH, with_protein=True):
+    """
+    Find the ORFs of a sequence that arrives as a stream of byte chunks.
+
+    Each block is integer-encoded once and the codon at every position
+    computed with the same vectorized lookup translate_batch uses; start and
+    stop codons are then boolean masks over each frame's codons. Per frame
+    only the stretch after its last stop codon is carried into the next
+    block, so memory depends on the chunk size plus the longest stretch
+    that some frame reads without a stop codon or N. In genomic DNA that is
+    at most a few kilobases, but a long stop-free stretch (e.g. megabases
+    of poly-A) is carried whole and re-encoded with every chunk, which
+    takes memory proportional to it and time quadratic in it.
+
+    Args:
+        chunks: Iterable of DNA byte chunks of one sequence
+        min_length: Minimum ORF length in amino acids, not counting the stop codon
+        with_protein: Include each ORF's protein sequence
+
+    Yields:
+        One dictionary per ORF, in the order they are found: strand ('+' or
+        '-'), 1-based start and end on the forward strand (the stop codon
+        included), length in amino acids and, with_protein, the protein
+    """
+    # Forward-strand position each of the six frames resumes scanning from: at its
+    # last boundary, which is already resolved, or at the first codon of the sequence
+    resume = {(strand, phase): phase for strand in '+-' for phase in range(3)}
+    data = b''
+    offset = 0
+    chunks = iter(chunks)
+    chunk = next(chunks, None)
+    while chunk is not None:
+        following = next(chunks, None)
+        final = following is None
+        data += clean_dna(chunk)
+        codons = codon_indices(encode_dna(data))
+
+        for (strand, phase), position in resume.items():
+            frame_codons = codons[position - offset::3]
+            if strand == '+':
+                starts, stops, last = _forward_orfs(frame_codons, min_length)
+                ends = stops + 1
+            else:
+                stops, starts, last = _reverse_orfs(frame_codons, min_length, final)
+                ends = starts + 1
+                starts = stops
+            for first, end in zip(starts.tolist(), ends.tolist()):
+                orf = {
+                    "strand": strand,
+                    "start": position + 3 * first + 1,
+                    "end": position + 3 * end,
+                    "length": end - first - 1
+                }
+                if with_protein:
+                    if strand == '+':
+                        amino_acids = CODON_LUT[frame_codons[first:end - 1]]
+                    else:
+                        amino_acids = REVERSE_CODON_LUT[frame_codons[first + 1:end]][::-1]
+                    orf["protein"] = amino_acids.tobytes().decode('ascii')
+                yield orf
+            if last >= 0:
+                resume[(strand, phase)] = position + 3 * last
+
+        # Keep the bases from the earliest frame's last boundary on
+        keep_from = min(resume.values())
+        data = data[keep_from - offset:]
+        offset = keep_from
+        chunk = following
+
+def orf_frame(orf, sequence_length):
+    """Reading frame of an ORF, numbered as in translate_dna.FRAMES"""
+    if orf["strand"] == '+':
+        return (orf["start"] - 1) % 3 + 1
+    return -((sequence_length - orf["end"]) % 3 + 1)
+
+def _count_bases(chunks, record):
+    for chunk in chunks:
+        record["length"] += len(chunk)
+        yield chunk
+
+def find_orfs(sequence=None, path=None, min_length=DEFAULT_MIN_LENGTH, max_orfs=DEFAULT_MAX_ORFS, analyze=False,
+              chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Find the ORFs in all six frames of a DNA sequence or a FASTA/FASTQ file.
+    Returns the longest ones with coordinates and proteins, optionally
+    with the properties analyze_protein reports for each protein.
+    """
+    if (sequence is None) == (path is None):
+        return {"error": "Give either a DNA sequence or the path of a FASTA/FASTQ file"}
+    try:
+        sequence = resolve_stored(sequence, "dna")
+    except ValueError as e:
+        return {"error": str(e)}
+    if isinstance(sequence, PackedSequence):
+        # Unpack a stored sequence a chunk at a time, as a file is read
+        records = [(None, sequence.chunks(chunk_size))]
+    else:
+        records = iter_records(sequence, path, chunk_size)
+
+    # Keep only the longest ORFs, however many there are
+    longest = []
+    orf_count = 0
+    record_count = 0
+    total_length = 0
+    try:
+        for record_id, chunks in records:
+            record = {"length": 0}
+            for orf in iter_orfs(_count_bases(chunks, record), min_length):
+                orf_count += 1
+                orf["record"] = record_id
+                item = (orf["length"], -orf_count, orf)
+                if len(longest) < max_orfs:
+                    heapq.heappush(longest, item)
+                else:
+                    heapq.heappushpop(longest, item)
+            # Reverse strand frames are numbered from the end of the record, known only now
+            for _, _, orf in longest:
+                if orf["record"] == record_id and "frame" not in orf:
+                    orf["frame"] = orf_frame(orf, record["length"])
+            record_count += 1
+            total_length += record["length"]
+    except (OSError, ValueError) as e:
+        return {"error": f"Could not read {path}: {e}"}
+
+    orfs = [
+        {
+            **({"record": orf["record"]} if path is not None else {}),
+            "frame": orf["frame"],
+            "strand": orf["strand"],
+            "start": orf["start"],
+            "end": orf["end"],
+            "length": orf["length"]
+        }
+        for _, _, orf in sorted(longest, key=itemgetter(0, 1), reverse=True)
+    ]
+
+    # Long proteins go to the sequence store, where analyze_protein can take them by ID
+    proteins = [orf["protein"] for _, _, orf in sorted(longest, key=itemgetter(0, 1), reverse=True)]
+    for orf, protein in zip(orfs, proteins):
+        orf.update(sequence_fields("protein", "protein", protein))
+
+    # Hand the proteins to analyze_protein's batched engine
+    if analyze and orfs:
+        properties = analyze_proteins_batch(proteins)
+        for i, orf in enumerate(orfs):
+            orf["molecular_weight_da"] = round(float(properties["molecular_weight_da"][i]), 2)
+            orf["isoelectric_point"] = round(float(properties["isoelectric_point"][i]), 2)
+            orf["avg_hydrophobicity"] = round(float(properties["avg_hydrophobicity"][i]), 2)
+
+    return {
+        "source": path if path is not None else "sequence",
+        "record_count": record_count,
+        "sequence_length": total_length,
+        "min_length": min_length,
+        "orf_count": orf_count,
+        "orfs": orfs,
+        "orfs_truncated": orf_count > len(orfs)
+    }
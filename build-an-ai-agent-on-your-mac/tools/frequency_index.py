@@ -0,0 +1,291 @@
+"""
+Compact, memory-mapped population frequency index.
+
+Every variant chrom:pos:ref:alt is encoded as one 64-bit integer key:
+
+    bits 59-63  chromosome (1-22, X=23, Y=24, M=25)
+    bits 31-58  position (up to 2^28, longer than any human chromosome)
+    bits 0-30   alleles: ref and alt packed at 2 bits per base when they
+                total at most 12 bases, otherwise a 30-bit CRC of "ref>alt"
+                with bit 30 set
+
+The index is a sorted uint64 key array plus a parallel float32 frequency
+array, saved as <prefix>.keys.npy and <prefix>.freqs.npy, and a small
+<prefix>.fence.npy holding the first key of every 4 KB page of keys.
+Opening it memory-maps the two big files and loads only the fence, so
+startup takes milliseconds. A lookup binary-searches the fence in memory and
+then a single page of keys, so resident memory grows with the pages actually
+touched. Many variants are looked up at once with np.searchsorted.
+
+Build an index from a gnomAD-style sites VCF (AF in INFO) or a TSV of
+chrom, pos, ref, alt, frequency, run from build-an-ai-agent-on-your-mac/:
+    python -m tools.frequency_index gnomad.sites.vcf.gz gnomad_af
+"""
+
+import gzip
+import mmap
+import os
+import threading
+import zlib
+
+import numpy as np
+
+CHROMOSOME_CODES = {str(number): number for number in range(1, 23)}
+CHROMOSOME_CODES.update({'X': 23, 'Y': 24, 'M': 25, 'MT': 25})
+
+# Bases as base-4 digits, so int(..., 4) packs them at 2 bits per base
+BASE_DIGITS = str.maketrans('ACGT', '0123')
+
+MAX_POSITION = (1 << 28) - 1
+
+# Alleles with at most this many bases in total are packed exactly
+MAX_PACKED_BASES = 12
+
+HASHED_ALLELES = 1 << 30
+
+# Keys per 4 KB page, and so per fence entry
+FENCE_STRIDE = 512
+
+# Rows encoded per chunk while building
+BUILD_CHUNK_SIZE = 1 << 20
+
+# Simulated gnomAD frequency data, served when no index file is configured
+SIMULATED_FREQUENCIES = {
+    'chr2:166245425:T:C': 0.00001,
+    'chr17:43094464:G:A': 0.0002,
+    'chr17:7675088:C:T': 0.15,
+    'chr19:44905796:C:T': 0.25
+}
+
+def encode_alleles(ref, alt):
+    """31-bit code of a ref/alt pair"""
+    bases = ref + alt
+    if len(bases) <= MAX_PACKED_BASES:
+        try:
+            # A leading 1 bit marks where the bases start; the ref length splits them
+            return (len(ref) << 25) | int('1' + bases.translate(BASE_DIGITS), 4)
+        except ValueError:
+            # Not all bases are A, C, G or T
+            pass
+    return HASHED_ALLELES | (zlib.crc32(f"{ref}>{alt}".encode()) & (HASHED_ALLELES - 1))
+
+def encode_variant(chrom, pos, ref, alt):
+    """64-bit key of a variant, or None if it cannot be encoded"""
+    chrom_code = CHROMOSOME_CODES.get(chrom[3:] if chrom.startswith('chr') else chrom)
+    if chrom_code is None or not 0 < pos <= MAX_POSITION:
+        return None
+    return (chrom_code << 59) | (pos << 31) | encode_alleles(ref.upper(), alt.upper())
+
+def encode_variant_id(variant):
+    """64-bit key of a chrom:pos:ref:alt variant id, or None if it is malformed"""
+    parts = variant.strip().split(':')
+    if len(parts) != 4 or not parts[1].isdigit():
+        return None
+    chrom, pos, ref, alt = parts
+    return encode_variant(chrom, int(pos), ref, alt)
+
+def save_index(prefix, keys, frequencies):
+    """
+    Sort and save an index from parallel key and frequency arrays.
+
+    When a key occurs more than once, its first frequency is kept.
+
+    Returns:
+        Number of variants in the saved index
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    frequencies = np.asarray(frequencies, dtype=np.float32)
+    order = np.argsort(keys, kind='stable')
+    keys, frequencies = keys[order], frequencies[order]
+    unique = np.ones(len(keys), dtype=bool)
+    unique[1:] = keys[1:] != keys[:-1]
+    np.save(prefix + '.keys.npy', keys[unique])
+    np.save(prefix + '.freqs.npy', frequencies[unique])
+    np.save(prefix + '.fence.npy', keys[unique][::FENCE_STRIDE])
+    return int(unique.sum())
+
+def iter_frequency_rows(path):
+    """
+    Stream (chrom, pos, ref, alt, frequency) rows from a sites VCF (AF from
+    INFO, one row per ALT allele) or a TSV of chrom, pos, ref, alt, frequency
+    """
+    opener = gzip.open if path.endswith(('.gz', '.bgz')) else open
+    with opener(path, 'rt') as handle:
+        for line in handle:
+            if line.startswith('#') or not line.strip():
+                continue
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) >= 8:
+                # VCF: CHROM POS ID REF ALT QUAL FILTER INFO
+                info = dict(item.split('=', 1) for item in fields[7].split(';') if '=' in item)
+                if 'AF' not in info:
+                    continue
+                for alt, frequency in zip(fields[4].split(','), info['AF'].split(',')):
+                    if frequency != '.':
+                        yield fields[0], int(fields[1]), fields[3], alt, float(frequency)
+            else:
+                chrom, pos, ref, alt, frequency = fields[:5]
+                yield chrom, int(pos), ref, alt, float(frequency)
+
+def build_frequency_index(source_path, prefix, chunk_size=BUILD_CHUNK_SIZE):
+    """
+    Build an index from a sites VCF or TSV (see iter_frequency_rows).
+
+    Rows are encoded in chunks into fixed-width arrays, so the peak memory is
+    that of the arrays themselves rather than of Python objects per variant.
+
+    Returns:
+        (variants_indexed, rows_skipped) tuple
+    """
+    key_chunks, frequency_chunks = [], []
+    keys = np.empty(chunk_size, dtype=np.uint64)
+    frequencies = np.empty(chunk_size, dtype=np.float32)
+    filled = 0
+    skipped = 0
+    for chrom, pos, ref, alt, frequency in iter_frequency_rows(source_path):
+        key = encode_variant(chrom, pos, ref, alt)
+        if key is None:
+            skipped += 1
+            continue
+        keys[filled] = key
+        frequencies[filled] = frequency
+        filled += 1
+        if filled == chunk_size:
+            key_chunks.append(keys.copy())
+            frequency_chunks.append(frequencies.copy())
+            filled = 0
+    key_chunks.append(keys[:filled])
+    frequency_chunks.append(frequencies[:filled])
+
+    indexed = save_index(prefix, np.concatenate(key_chunks), np.concatenate(frequency_chunks))
+    return indexed, skipped
+
+def map_npy(path):
+    """
+    Memory-map a .npy file read-only, advising the kernel that access is
+    random so it maps only the pages touched rather than reading ahead
+    """
+    with open(path, 'rb') as handle:
+        version = np.lib.format.read_magic(handle)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(handle)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(handle)
+        offset = handle.tell()
+        count = int(np.prod(shape))
+        if count == 0:
+            return np.empty(shape, dtype=dtype)
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_RANDOM'):
+        mapped.madvise(mmap.MADV_RANDOM)
+    return np.frombuffer(mapped, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+def as_float(frequency):
+    """A float32 frequency as the Python float with the same shortest digits (1e-05, not 9.99e-06)"""
+    return float(str(np.float32(frequency)))
+
+class FrequencyIndex:
+    """Sorted variant keys with their allele frequencies"""
+
+    def __init__(self, keys, frequencies, source, fence=None):
+        self.keys = keys
+        self.frequencies = frequencies
+        self.source = source
+        self.fence = keys[::FENCE_STRIDE].copy() if fence is None else fence
+
+    @classmethod
+    def open(cls, prefix):
+        """Memory-map an index saved by save_index or build_frequency_index"""
+        keys = map_npy(prefix + '.keys.npy')
+        frequencies = map_npy(prefix + '.freqs.npy')
+        if len(keys) != len(frequencies):
+            raise ValueError(f"{prefix}: key and frequency arrays differ in length")
+        fence = np.load(prefix + '.fence.npy')
+        mtime = os.stat(prefix + '.keys.npy').st_mtime_ns
+        return cls(keys, frequencies, f"{os.path.abspath(prefix)}@{mtime}", fence)
+
+    @classmethod
+    def from_dict(cls, frequencies):
+        """In-memory index of a {variant_id: frequency} dictionary"""
+        pairs = [(encode_variant_id(variant), frequency) for variant, frequency in frequencies.items()]
+        pairs.sort()
+        keys = np.array([key for key, _ in pairs], dtype=np.uint64)
+        values = np.array([frequency for _, frequency in pairs], dtype=np.float32)
+        return cls(keys, values, "simulated")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, variant):
+        """Frequency of one variant id, or None if it is not in the index"""
+        key = encode_variant_id(variant)
+        if key is None:
+            return None
+        key = np.uint64(key)
+        # The fence picks the one page of keys that can hold the key
+        page = max(int(self.fence.searchsorted(key, side='right')) - 1, 0)
+        start = page * FENCE_STRIDE
+        i = start + int(self.keys[start:start + FENCE_STRIDE].searchsorted(key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return as_float(self.frequencies[i])
+        return None
+
+    def lookup_many(self, variants):
+        """
+        Frequencies of many variant ids at once.
+
+        Returns:
+            float32 array in the order of variants, NaN where not found
+        """
+        encoded = [encode_variant_id(variant) for variant in variants]
+        valid = np.array([key is not None for key in encoded], dtype=bool)
+        keys = np.array([key or 0 for key in encoded], dtype=np.uint64)
+        result = np.full(len(keys), np.nan, dtype=np.float32)
+        if not len(self.keys) or not len(keys):
+            return result
+
+        # Search in sorted order so the binary searches walk the file forwards
+        order = np.argsort(keys)
+        positions = np.searchsorted(self.keys, keys[order])
+        clipped = np.minimum(positions, len(self.keys) - 1)
+        found = (positions < len(self.keys)) & (np.asarray(self.keys[clipped]) == keys[order]) & valid[order]
+        result[order[found]] = self.frequencies[clipped[found]]
+        return result
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_frequency_index():
+    """
+    The index check_population_frequency uses: the one set with
+    set_frequency_index, or else the one at the FREQUENCY_INDEX prefix (the
+    simulated frequencies when it is unset)
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            prefix = os.environ.get("FREQUENCY_INDEX")
+            _index = FrequencyIndex.open(prefix) if prefix else FrequencyIndex.from_dict(SIMULATED_FREQUENCIES)
+        return _index
+
+def set_frequency_index(index):
+    """Make check_population_frequency use index"""
+    global _index
+    with _index_lock:
+        _index = index
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build a memory-mapped population frequency index")
+    parser.add_argument('source', help="sites VCF(.gz) with AF in INFO, or TSV of chrom, pos, ref, alt, frequency")
+    parser.add_argument('prefix', help="output prefix: writes PREFIX.keys.npy and PREFIX.freqs.npy")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    indexed, skipped = build_frequency_index(args.source, args.prefix)
+    print(f"Indexed {indexed:,} variant(s) ({skipped:,} skipped) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""
+Compact 2-bit DNA sequences.
+
+A PackedSequence stores four bases per byte (A=0, C=1, G=2, T=3, the base
+codes of translate_dna, first base in the high bits) and keeps the runs of N
+and other non-ACGT bases aside as (start, end) arrays, so a chromosome takes
+a quarter of its length in bytes however many assembly gaps it has. Masked
+bases are stored as A and decode as N.
+
+Complementing a packed base is flipping both of its bits, so the reverse
+complement is a bitwise NOT, a byte lookup that reverses the four bases in
+each byte, and a shift that drops the padding. k-mers are hashed by shifting
+base codes into an integer, which NumPy does for every window at once, and
+counted with np.bincount; windows that touch a masked base are skipped.
+"""
+
+import numpy as np
+
+from tools.translate_dna import UNKNOWN_CODON, codon_indices, encode_dna
+
+# Longest k-mer whose hash fits in a uint64 at 2 bits per base
+MAX_K = 32
+
+# Up to this k every possible k-mer gets a counter (4^12 = 16.8M);
+# longer k-mers are counted with np.unique over the ones present
+DENSE_K = 12
+
+# Bases unpacked at a time while hashing k-mers or counting codons
+BLOCK_SIZE = 1 << 22
+
+LETTERS = np.frombuffer(b'ACGTN', dtype=np.uint8)
+
+# Each byte with its four bases in the opposite order
+REVERSED_BASES = np.array(
+    [((b & 3) << 6) | (((b >> 2) & 3) << 4) | (((b >> 4) & 3) << 2) | (b >> 6) for b in range(256)],
+    dtype=np.uint8
+)
+
+def pack_codes(codes):
+    """Pack base codes 0-3 at four per byte, padding the last byte with A"""
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+def masked_runs(codes, offset=0):
+    """(starts, ends) of the runs of non-ACGT base codes, shifted by offset"""
+    invalid = codes > 3
+    edges = np.flatnonzero(invalid[1:] != invalid[:-1]) + 1
+    if len(invalid) and invalid[0]:
+        edges = np.concatenate(([0], edges))
+    if len(invalid) and invalid[-1]:
+        edges = np.concatenate((edges, [len(invalid)]))
+    return edges[0::2] + offset, edges[1::2] + offset
+
+def kmer_string(kmer_id, k):
+    """The k-mer a hash stands for"""
+    return ''.join('ACGT'[(kmer_id >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+class PackedSequence:
+    """A DNA sequence at 2 bits per base, with its runs of non-ACGT bases"""
+
+    def __init__(self, packed, length, mask_starts, mask_ends):
+        self.packed = packed
+        self.length = length
+        self.mask_starts = mask_starts
+        self.mask_ends = mask_ends
+
+    @classmethod
+    def from_codes(cls, codes):
+        """Pack an array of translate_dna base codes (4 for anything not ACGT)"""
+        starts, ends = masked_runs(codes)
+        return cls(pack_codes(np.where(codes > 3, 0, codes)), len(codes), starts, ends)
+
+    @classmethod
+    def from_dna(cls, sequence):
+        """
+        Pack a DNA string or bytes object (either case, no whitespace),
+        BLOCK_SIZE bases at a time so the temporary arrays stay small
+        """
+        if isinstance(sequence, str):
+            sequence = sequence.encode('ascii', errors='replace')
+        view = memoryview(sequence)
+        packed, starts, ends = [], [], []
+        for start in range(0, len(view), BLOCK_SIZE):
+            codes = encode_dna(view[start:start + BLOCK_SIZE])
+            block_starts, block_ends = masked_runs(codes, start)
+            packed.append(pack_codes(np.where(codes > 3, 0, codes)))
+            starts.append(block_starts)
+            ends.append(block_ends)
+        if not packed:
+            return cls.from_codes(np.empty(0, dtype=np.uint8))
+        starts = np.concatenate(starts)
+        ends = np.concatenate(ends)
+        # Join runs split across blocks
+        if len(starts):
+            joined = ends[:-1] == starts[1:]
+            starts = starts[np.concatenate(([True], ~joined))]
+            ends = ends[np.concatenate((~joined, [True]))]
+        return cls(np.concatenate(packed), len(view), starts, ends)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        """Bytes held by the packed bases and the mask"""
+        return self.packed.nbytes + self.mask_starts.nbytes + self.mask_ends.nbytes
+
+    @property
+    def masked_bases(self):
+        return int((self.mask_ends - self.mask_starts).sum())
+
+    def mask(self, start=0, end=None):
+        """Boolean array, True at the masked bases of [start, end)"""
+        end = self.length if end is None else end
+        # Only the runs that overlap the range
+        first = np.searchsorted(self.mask_ends, start, side='right')
+        last = np.searchsorted(self.mask_starts, end)
+        edges = np.zeros(end - start + 1, dtype=np.int8)
+        edges[np.maximum(self.mask_starts[first:last], start) - start] += 1
+        edges[np.minimum(self.mask_ends[first:last], end) - start] -= 1
+        return np.cumsum(edges[:-1]) > 0
+
+    def codes(self, start=0, end=None, masked=True):
+        """
+        Base codes of [start, end), 4 at masked bases (or, with masked=False,
+        the A they are stored as)
+        """
+        end = self.length if end is None else end
+        packed = self.packed[start // 4:-(-end // 4)]
+        unpacked = np.empty((len(packed), 4), dtype=np.uint8)
+        for i in range(4):
+            unpacked[:, i] = (packed >> (6 - 2 * i)) & 3
+        codes = unpacked.ravel()[start % 4:start % 4 + end - start]
+        if masked and len(self.mask_starts):
+            codes[self.mask(start, end)] = 4
+        return codes
+
+    def to_bytes(self, start=0, end=None):
+        return LETTERS[self.codes(start, end)].tobytes()
+
+    def chunks(self, chunk_size=BLOCK_SIZE):
+        """The sequence as bytes, chunk_size bases at a time"""
+        for start in range(0, self.length, chunk_size):
+            yield self.to_bytes(start, min(start + chunk_size, self.length))
+
+    def __str__(self):
+        return self.to_bytes().decode('ascii')
+
+    def reverse_complement(self):
+        """The reverse complement, computed on the packed bytes"""
+        reversed_bytes = REVERSED_BASES[~self.packed[::-1]]
+        # The padding of the last byte is now at the front; shift it out
+        shift = 2 * (len(self.packed) * 4 - self.length)
+        if shift:
+            following = np.zeros_like(reversed_bytes)
+            following[:-1] = reversed_bytes[1:] >> (8 - shift)
+            reversed_bytes = (reversed_bytes << shift) | following
+        return PackedSequence(
+            reversed_bytes, self.length, self.length - self.mask_ends[::-1], self.length - self.mask_starts[::-1]
+        )
+
+    def _blocks(self, overlap):
+        """Base codes in blocks of BLOCK_SIZE, each extended by overlap bases into the next"""
+        for start in range(0, max(self.length - overlap, 1), BLOCK_SIZE):
+            yield self.codes(start, min(start + BLOCK_SIZE + overlap, self.length))
+
+    def kmer_hashes(self, k, canonical=False):
+        """
+        Hash of every k-mer that has no masked base, block by block.
+
+        The hash packs the k-mer at 2 bits per base (see kmer_string). With
+        canonical, a k-mer and its reverse complement share the smaller hash.
+
+        Yields:
+            uint64 arrays of k-mer hashes
+        """
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}")
+        for codes in self._blocks(k - 1):
+            n = len(codes) - k + 1
+            if n <= 0:
+                continue
+            invalid = codes > 3
+            codes = np.where(invalid, 0, codes).astype(np.uint64)
+            forward = np.zeros(n, dtype=np.uint64)
+            for i in range(k):
+                forward = (forward << np.uint64(2)) | codes[i:i + n]
+            if canonical:
+                # The reverse complement's first base is the complement of the k-mer's last
+                reverse = np.zeros(n, dtype=np.uint64)
+                for i in reversed(range(k)):
+                    reverse = (reverse << np.uint64(2)) | (np.uint64(3) - codes[i:i + n])
+                forward = np.minimum(forward, reverse)
+            # Windows with a masked base in them
+            masked_before = np.concatenate(([0], np.cumsum(invalid)))
+            yield forward[masked_before[k:] == masked_before[:n]]
+
+    def kmer_counts(self, k, canonical=False):
+        """
+        Count the k-mers that have no masked base.
+
+        Returns:
+            (hashes, counts): sorted hashes of the k-mers present and their counts
+        """
+        return count_hashes(self.kmer_hashes(k, canonical), k)
+
+    def codon_counts(self, frame=1):
+        """Counts of the 64 codons of forward reading frame 1, 2 or 3, skipping codons with masked bases"""
+        counts = np.zeros(UNKNOWN_CODON + 1, dtype=np.int64)
+        # Whole codons per block, so every block starts in frame
+        block_size = BLOCK_SIZE - BLOCK_SIZE % 3
+        for start in range(frame - 1, self.length, block_size):
+            codes = self.codes(start, min(start + block_size, self.length))
+            counts += np.bincount(codon_indices(codes, step=3), minlength=UNKNOWN_CODON + 1)
+        return counts[:UNKNOWN_CODON]
+
+def count_hashes(hash_arrays, k):
+    """
+    Add up k-mer hashes from several arrays.
+
+    Returns:
+        (hashes, counts): sorted hashes of the k-mers present and their counts
+    """
+    if k <= DENSE_K:
+        counts = np.zeros(4 ** k, dtype=np.int64)
+        for hashes in hash_arrays:
+            counts += np.bincount(hashes.astype(np.int64), minlength=4 ** k)
+        present = np.flatnonzero(counts)
+        return present.astype(np.uint64), counts[present]
+    # Too many possible k-mers for a counter each: merge the distinct ones of every array
+    hashes = np.empty(0, dtype=np.uint64)
+    counts = np.empty(0, dtype=np.int64)
+    for array in hash_arrays:
+        unique, unique_counts = np.unique(array, return_counts=True)
+        merged, inverse = np.unique(np.concatenate((hashes, unique)), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate((counts, unique_counts)), minlength=len(merged))
+        hashes, counts = merged, counts.astype(np.int64)
+    return hashes, counts
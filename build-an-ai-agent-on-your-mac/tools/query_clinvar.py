@@ -1,3 +1,5 @@
+from tools.clinvar_store import get_clinvar_store
+
 query_clinvar_schema = {
     "type": "function",
     "function": {
@@ -16,40 +18,10 @@ query_clinvar_schema = {
     }
 }
 
-def query_clinvar(variant):
-    """
-    Query ClinVar for clinical significance of a variant.
-    Returns clinical interpretation and evidence.
-    """
-    # Simulated ClinVar data
-    clinvar_database = {
-        'chr2:166245425:T:C': {
-            'significance': 'Pathogenic',
-            'review_status': '3-star',
-            'condition': 'Dravet syndrome'
-        },
-        'chr17:43094464:G:A': {
-            'significance': 'Likely pathogenic',
-            'review_status': '2-star',
-            'condition': 'Breast-ovarian cancer, familial'
-        },
-        'chr17:7675088:C:T': {
-            'significance': 'Benign',
-            'review_status': '2-star',
-            'condition': 'Li-Fraumeni syndrome'
-        },
-        'chr19:44905796:C:T': {
-            'significance': 'Benign/Likely benign',
-            'review_status': '2-star',
-            'condition': 'not provided'
-        }
-    }
-    
-    # Look up variant
-    clinvar_entry = clinvar_database.get(variant)
-    
+def clinvar_result(variant, clinvar_entry):
+    """query_clinvar's result for a variant, given its ClinVar entry (None if absent)"""
     if clinvar_entry:
-        return {
+        result = {
             "variant_id": variant,
             "in_clinvar": True,
             "significance": clinvar_entry['significance'],
@@ -57,6 +29,9 @@ def query_clinvar(variant):
             "condition": clinvar_entry['condition'],
             "interpretation": f"ClinVar: {clinvar_entry['significance']} for {clinvar_entry['condition']}"
         }
+        if clinvar_entry.get('gene'):
+            result["gene"] = clinvar_entry['gene']
+        return result
     else:
         return {
             "variant_id": variant,
@@ -66,3 +41,11 @@ def query_clinvar(variant):
             "condition": None,
             "interpretation": "Variant not found in ClinVar database"
         }
+
+def query_clinvar(variant):
+    """
+    Query ClinVar for clinical significance of a variant.
+    Returns clinical interpretation and evidence.
+    """
+    # Look up variant (in the simulated table unless a ClinVar database is configured)
+    return clinvar_result(variant, get_clinvar_store().lookup(variant))
@@ -0,0 +1,39 @@
+from tools.clinvar_store import get_clinvar_store
+from tools.query_clinvar import clinvar_result
+
+query_clinvar_batch_schema = {
+    "type": "function",
+    "function": {
+        "name": "query_clinvar_batch",
+        "description": "Check clinical significance of several variants in ClinVar database in one call",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "variants": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Variant IDs (e.g., ['chr2:166245425:T:C', 'chr17:43094464:G:A'])"
+                }
+            },
+            "required": ["variants"]
+        }
+    }
+}
+
+def query_clinvar_batch(variants):
+    """
+    Query ClinVar for many variants with one database query.
+    Returns each variant's query_clinvar result, keyed by variant ID.
+    """
+    variants = list(dict.fromkeys(variants))
+    
+    # Look up all variants at once
+    entries = get_clinvar_store().lookup_many(variants)
+    
+    results = {variant: clinvar_result(variant, entries.get(variant)) for variant in variants}
+    
+    return {
+        "results": results,
+        "count": len(results),
+        "in_clinvar": [variant for variant, result in results.items() if result["in_clinvar"]]
+    }
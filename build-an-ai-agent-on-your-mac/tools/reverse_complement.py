@@ -0,0 +1,42 @@
+from tools.packed_sequence import PackedSequence
+from tools.sequence_store import resolve_stored, sequence_fields
+from tools.translate_dna import clean_dna
+
+reverse_complement_schema = {
+    "type": "function",
+    "function": {
+        "name": "reverse_complement",
+        "description": (
+            "Reverse complement a DNA sequence, e.g. to read a gene on the minus strand. "
+            "N and other ambiguous bases come back as N. A long result is returned as an ID in the local "
+            "sequence store with a preview."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sequence": {
+                    "type": "string",
+                    "description": "The DNA sequence to reverse complement, or the ID of a stored one"
+                }
+            },
+            "required": ["sequence"]
+        }
+    }
+}
+
+def reverse_complement(sequence):
+    """
+    Reverse complement a DNA sequence on its 2-bit packed form.
+    Returns the reverse complement and its length.
+    """
+    try:
+        sequence = resolve_stored(sequence, "dna")
+    except ValueError as e:
+        return {"error": str(e)}
+    # A stored sequence is already packed
+    packed = sequence if isinstance(sequence, PackedSequence) else PackedSequence.from_dna(clean_dna(sequence))
+    return {
+        **sequence_fields("reverse_complement", "dna", packed.reverse_complement()),
+        "length": len(packed),
+        "masked_bases": packed.masked_bases
+    }
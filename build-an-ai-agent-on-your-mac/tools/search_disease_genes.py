@@ -1,3 +1,5 @@
+from tools.disease_index import get_disease_index
+
 search_disease_genes_schema = {
     "type": "function",
     "function": {
@@ -16,34 +18,44 @@ search_disease_genes_schema = {
     }
 }
 
+# Matches whose genes are returned: those scoring at least this fraction of the best
+RELATIVE_SCORE_CUTOFF = 0.5
+
+# Matches listed when the query is not itself a disease name
+MAX_MATCHES_LISTED = 5
+
 def search_disease_genes(disease):
     """
     Search for genes associated with a disease.
     Returns a list of gene symbols.
     """
-    # Simulated gene-disease database
-    gene_database = {
-        'epilepsy': ['SCN1A', 'KCNQ2'],
-        'cancer': ['TP53', 'BRCA1', 'BRCA2'],
-        'diabetes': ['INS', 'GCK', 'HNF1A'],
-        'alzheimer': ['APP', 'PSEN1', 'PSEN2', 'APOE']
-    }
+    # Search disease names and synonyms, allowing prefixes and misspellings
+    matches = get_disease_index().search(disease)
     
-    # Normalize disease name
-    disease_lower = disease.lower().strip()
-    
-    # Search for genes
-    genes = gene_database.get(disease_lower, [])
-    
-    if not genes:
+    if not matches:
         return {
             "disease": disease,
             "genes": [],
             "message": f"No known genes found for '{disease}'"
         }
     
-    return {
+    # Genes of the close matches, best match first
+    cutoff = matches[0]["score"] * RELATIVE_SCORE_CUTOFF
+    genes = []
+    for match in matches:
+        if match["score"] >= cutoff:
+            genes.extend(gene for gene in match["genes"] if gene not in genes)
+    
+    result = {
         "disease": disease,
         "genes": genes,
         "count": len(genes)
     }
+    
+    # Say how the query was interpreted when it was not an exact disease name
+    if matches[0]["matched"].lower() != disease.lower().strip():
+        result["matched_diseases"] = [
+            {"disease": match["disease"], "matched": match["matched"], "genes": match["genes"]}
+            for match in matches[:MAX_MATCHES_LISTED] if match["score"] >= cutoff
+        ]
+    return result
@@ -0,0 +1,138 @@
+"""
+Streaming FASTA/FASTQ readers.
+
+Files are read in fixed-size chunks (through mmap for plain files, through
+gzip for .gz files) and parsed incrementally, so memory use does not depend
+on file or record size.
+"""
+
+import gzip
+import mmap
+import os
+from itertools import chain, groupby
+from operator import itemgetter
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Parser states
+_HEADER, _SEQUENCE, _PLUS, _QUALITY, _RECORD_START = range(5)
+
+def iter_raw_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the raw bytes of a (possibly gzipped) file in fixed-size chunks"""
+    with open(path, 'rb') as handle:
+        is_gzip = handle.read(2) == b'\x1f\x8b'
+    if is_gzip:
+        with gzip.open(path, 'rb') as handle:
+            while chunk := handle.read(chunk_size):
+                yield chunk
+        return
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for start in range(0, len(mapped), chunk_size):
+            yield mapped[start:start + chunk_size]
+
+def iter_sequence_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream the sequences of a FASTA or FASTQ file.
+
+    Yields (record_index, record_id, sequence_bytes) tuples. A record's
+    sequence may arrive over several tuples; every record yields at least one
+    (possibly empty) tuple, so consumers can group by record_index. Sequence
+    bytes are uppercased and stripped of whitespace. FASTQ records are
+    expected in the usual four-line layout.
+    """
+    state = None
+    is_fastq = False
+    at_line_start = True
+    header = []
+    record_index = -1
+    record_id = None
+
+    for chunk in iter_raw_chunks(path, chunk_size):
+        pos = 0
+        size = len(chunk)
+        pieces = []
+        while pos < size:
+            if state is None or state == _RECORD_START:
+                # Expect a header marker, skipping blank lines
+                marker = chunk[pos:pos + 1]
+                if marker in (b'\n', b'\r', b' '):
+                    pos += 1
+                    continue
+                if state is None:
+                    if marker not in (b'>', b'@'):
+                        raise ValueError(f"{path} is not a FASTA or FASTQ file")
+                    is_fastq = marker == b'@'
+                state = _HEADER
+                pos += 1
+            elif state == _HEADER:
+                newline = chunk.find(b'\n', pos)
+                if newline == -1:
+                    header.append(chunk[pos:])
+                    break
+                header.append(chunk[pos:newline])
+                pos = newline + 1
+                fields = b''.join(header).strip().split(maxsplit=1)
+                header = []
+                record_index += 1
+                record_id = fields[0].decode() if fields else ''
+                yield record_index, record_id, b''
+                state = _SEQUENCE
+                at_line_start = True
+            elif state == _SEQUENCE:
+                if at_line_start:
+                    marker = chunk[pos:pos + 1]
+                    if not is_fastq and marker == b'>':
+                        if pieces:
+                            yield record_index, record_id, _clean(pieces)
+                            pieces = []
+                        state = _HEADER
+                        pos += 1
+                        continue
+                    if is_fastq and marker == b'+':
+                        if pieces:
+                            yield record_index, record_id, _clean(pieces)
+                            pieces = []
+                        state = _PLUS
+                        continue
+                newline = chunk.find(b'\n', pos)
+                end = size if newline == -1 else newline
+                pieces.append(chunk[pos:end])
+                at_line_start = newline != -1
+                pos = end + 1
+            else:
+                # Skip the '+' line, then the quality line
+                newline = chunk.find(b'\n', pos)
+                if newline == -1:
+                    break
+                pos = newline + 1
+                state = _QUALITY if state == _PLUS else _RECORD_START
+
+        if pieces:
+            yield record_index, record_id, _clean(pieces)
+
+    # A final header line without a trailing newline
+    if state == _HEADER and header:
+        fields = b''.join(header).strip().split(maxsplit=1)
+        yield record_index + 1, fields[0].decode() if fields else '', b''
+
+def iter_records(sequence=None, path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream either one sequence given directly or the records of a FASTA/FASTQ file.
+
+    Yields:
+        (record_id, chunks) for each record, where chunks iterates over its
+        cleaned sequence bytes; the record_id of a direct sequence is None
+    """
+    if sequence is not None:
+        if isinstance(sequence, str):
+            sequence = sequence.encode('ascii', errors='replace')
+        yield None, [sequence.translate(None, b' \n\r\t').upper()]
+        return
+    for _, items in groupby(iter_sequence_chunks(path, chunk_size), key=itemgetter(0)):
+        first = next(items)
+        yield first[1], chain([first[2]], (chunk for _, _, chunk in items))
+
+def _clean(pieces):
+    return b''.join(pieces).translate(None, b' \r\t').upper()
@@ -0,0 +1,312 @@
+"""
+Local store of the sequences the DNA tools work on, so that long sequences
+never have to travel through the LLM context.
+
+A stored sequence gets a short ID (dna_1, protein_1, ...). Tools accept an
+ID wherever they take a sequence, and return an ID with a short preview
+instead of any sequence longer than INLINE_LENGTH, so the size of the
+prompt no longer depends on the size of the sequences. Sequences pasted
+into the REPL and records loaded from files are stored the same way. DNA is
+held as a 2-bit PackedSequence (ambiguous bases come back as N), proteins
+as bytes; the same sequence stored twice keeps its first ID. The least
+recently used sequences are dropped once the store holds MAX_BYTES.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from tools.packed_sequence import PackedSequence
+from tools.sequence_io import iter_records
+
+load_sequences_schema = {
+    "type": "function",
+    "function": {
+        "name": "load_sequences",
+        "description": (
+            "Load the records of a FASTA/FASTQ file (optionally gzipped) into the local sequence store and "
+            "return a short ID, length and preview for each. Pass the IDs to the other tools instead of "
+            "the sequences themselves."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "Path to the FASTA/FASTQ file"
+                },
+                "kind": {
+                    "type": "string",
+                    "enum": ["dna", "protein"],
+                    "description": "Whether the file holds DNA or protein sequences (default dna)"
+                },
+                "max_records": {
+                    "type": "integer",
+                    "description": "Maximum number of records loaded (default 100)"
+                }
+            },
+            "required": ["path"]
+        }
+    }
+}
+
+get_sequence_schema = {
+    "type": "function",
+    "function": {
+        "name": "get_sequence",
+        "description": (
+            "Read part of a stored sequence by its ID (e.g. dna_1 or protein_2), only when the actual "
+            "letters are needed. At most 1000 residues are returned per call."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sequence_id": {
+                    "type": "string",
+                    "description": "ID of a stored sequence"
+                },
+                "start": {
+                    "type": "integer",
+                    "description": "1-based first position (default 1)"
+                },
+                "end": {
+                    "type": "integer",
+                    "description": "1-based last position, inclusive (default start + 999)"
+                }
+            },
+            "required": ["sequence_id"]
+        }
+    }
+}
+
+# Sequences up to this long are returned in full; longer ones as an ID and a preview
+INLINE_LENGTH = 120
+PREVIEW_LENGTH = 30
+
+# Most residues get_sequence returns at once
+MAX_SLICE = 1000
+
+DEFAULT_MAX_RECORDS = 100
+
+# Bytes of sequence held before the least recently used sequences are dropped
+MAX_BYTES = 1 << 30
+
+SEQUENCE_ID = re.compile(r'(dna|protein)_\d+')
+
+# DNA in free text: a block of lines made only of bases (a wrapped sequence, as
+# in FASTA), or a single run of bases with no whitespace in it. Words that are
+# also bases ("a", "cat") stay text, since runs shorter than INLINE_LENGTH are kept.
+DNA_RUN = re.compile(
+    r'^[ \t]*[ACGTN]+(?:[ \t]*\r?\n[ \t]*[ACGTN]+)+[ \t]*$|(?<!\w)[ACGTN]+(?!\w)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+class SequenceStore:
+    """DNA and protein sequences by ID, least recently used last out"""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._ids_by_digest = {}
+        self._counters = {"dna": 0, "protein": 0}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, sequence_id):
+        return sequence_id in self._entries
+
+    def put(self, kind, sequence, name=None):
+        """
+        Store a DNA sequence (str, bytes or PackedSequence) or a protein sequence (str or bytes).
+
+        Returns:
+            The sequence's ID
+        """
+        if kind == "dna":
+            data = sequence if isinstance(sequence, PackedSequence) else PackedSequence.from_dna(sequence)
+            digest = hashlib.sha1(data.packed.tobytes() + data.mask_starts.tobytes() + data.mask_ends.tobytes())
+            digest.update(str(data.length).encode())
+            size = data.nbytes
+        elif kind == "protein":
+            data = sequence.encode('ascii', errors='replace') if isinstance(sequence, str) else bytes(sequence)
+            digest = hashlib.sha1(data)
+            size = len(data)
+        else:
+            raise ValueError(f"Unknown sequence kind {kind!r}")
+        key = (kind, digest.hexdigest())
+
+        with self._lock:
+            if key in self._ids_by_digest:
+                sequence_id = self._ids_by_digest[key]
+                self._entries.move_to_end(sequence_id)
+                if name and not self._entries[sequence_id]["name"]:
+                    self._entries[sequence_id]["name"] = name
+                return sequence_id
+            self._counters[kind] += 1
+            sequence_id = f"{kind}_{self._counters[kind]}"
+            self._entries[sequence_id] = {"kind": kind, "data": data, "name": name, "size": size, "key": key}
+            self._ids_by_digest[key] = sequence_id
+            self.nbytes += size
+            # Drop the least recently used sequences, never the one just stored
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                del self._ids_by_digest[evicted["key"]]
+                self.nbytes -= evicted["size"]
+        return sequence_id
+
+    def get(self, sequence_id):
+        """The stored entry: kind, data (PackedSequence or bytes) and name"""
+        with self._lock:
+            if sequence_id not in self._entries:
+                raise KeyError(f"No stored sequence {sequence_id!r}; it may have been dropped, so load it again")
+            self._entries.move_to_end(sequence_id)
+            return self._entries[sequence_id]
+
+    def sequence(self, sequence_id, start=0, end=None):
+        """Residues [start, end) of a stored sequence as bytes"""
+        entry = self.get(sequence_id)
+        if entry["kind"] == "dna":
+            data = entry["data"]
+            end = len(data) if end is None else min(end, len(data))
+            return data.to_bytes(min(start, end), end)
+        return entry["data"][start:end]
+
+    def summary(self, sequence_id):
+        """Short description of a stored sequence for a tool result"""
+        entry = self.get(sequence_id)
+        length = len(entry["data"])
+        result = {"sequence_id": sequence_id, "kind": entry["kind"], "length": length}
+        if entry["name"]:
+            result["name"] = entry["name"]
+        result["preview"] = self.sequence(sequence_id, 0, PREVIEW_LENGTH).decode('ascii') + (
+            "..." if length > PREVIEW_LENGTH else ""
+        )
+        return result
+
+_store = SequenceStore()
+
+def get_sequence_store():
+    return _store
+
+def set_sequence_store(store):
+    """Replace the store the tools use, e.g. with one of a different size"""
+    global _store
+    _store = store
+
+def resolve_stored(sequence, kind):
+    """
+    The sequence a tool argument stands for: the stored data (a PackedSequence
+    for DNA, bytes for protein) if it is an ID, otherwise the argument itself.
+
+    Raises:
+        ValueError: for an unknown ID or an ID of the wrong kind
+    """
+    if not isinstance(sequence, str) or not SEQUENCE_ID.fullmatch(sequence.strip()):
+        return sequence
+    sequence_id = sequence.strip()
+    try:
+        entry = _store.get(sequence_id)
+    except KeyError as e:
+        raise ValueError(e.args[0]) from None
+    if entry["kind"] != kind:
+        raise ValueError(f"{sequence_id} is a {entry['kind']} sequence, not {kind}")
+    return entry["data"]
+
+def resolve_sequence(sequence, kind):
+    """Like resolve_stored, but a stored sequence is decoded to a str"""
+    sequence = resolve_stored(sequence, kind)
+    if isinstance(sequence, PackedSequence):
+        return str(sequence)
+    return sequence.decode('ascii') if isinstance(sequence, bytes) else sequence
+
+def sequence_fields(field, kind, sequence, name=None):
+    """
+    Tool result fields for a sequence: {field: sequence} if it is short,
+    otherwise the sequence is stored and {field_id, field_length, field_preview}
+    stand in for it.
+    """
+    if len(sequence) <= INLINE_LENGTH:
+        if isinstance(sequence, bytes):
+            sequence = sequence.decode('ascii')
+        return {field: str(sequence)}
+    summary = _store.summary(_store.put(kind, sequence, name))
+    return {
+        f"{field}_id": summary["sequence_id"],
+        f"{field}_length": summary["length"],
+        f"{field}_preview": summary["preview"]
+    }
+
+def store_inline_sequences(text, min_length=INLINE_LENGTH):
+    """
+    Replace every DNA run of at least min_length bases in free text (e.g. a
+    pasted sequence) with the ID of the stored sequence.
+
+    Returns:
+        (text, stored): the new text and the summaries of the stored sequences
+    """
+    stored = []
+
+    def replace(match):
+        dna = re.sub(r'\s', '', match.group())
+        if len(dna) < min_length:
+            return match.group()
+        sequence_id = _store.put("dna", dna.upper())
+        stored.append(_store.summary(sequence_id))
+        return f"{sequence_id} (a {len(dna):,} bp DNA sequence in the local store)"
+
+    return DNA_RUN.sub(replace, text), stored
+
+def load_sequences(path, kind="dna", max_records=DEFAULT_MAX_RECORDS):
+    """
+    Load the records of a FASTA/FASTQ file into the sequence store.
+    Returns an ID and summary per record, never the sequences themselves.
+    """
+    if kind not in ("dna", "protein"):
+        return {"error": "kind must be 'dna' or 'protein'"}
+    records = []
+    record_count = 0
+    try:
+        for record_id, chunks in iter_records(path=path):
+            record_count += 1
+            if len(records) < max_records:
+                records.append(_store.summary(_store.put(kind, b''.join(chunks), record_id)))
+            else:
+                # Count the rest of the file without storing it
+                for _ in chunks:
+                    pass
+    except (OSError, ValueError) as e:
+        return {"error": f"Could not read {path}: {e}"}
+    return {
+        "path": path,
+        "record_count": record_count,
+        "records": records,
+        "records_truncated": record_count > len(records)
+    }
+
+def get_sequence(sequence_id, start=1, end=None):
+    """
+    Read positions start to end (1-based, inclusive) of a stored sequence.
+    Returns at most MAX_SLICE residues.
+    """
+    try:
+        entry = _store.get(sequence_id)
+    except KeyError as e:
+        return {"error": e.args[0]}
+    length = len(entry["data"])
+    if not 1 <= start <= length:
+        return {"error": f"start must be between 1 and {length:,}, the length of {sequence_id}"}
+    if end is not None and end < start:
+        return {"error": "end must not be before start"}
+    end = min(length if end is None else end, start + MAX_SLICE - 1, length)
+    return {
+        "sequence_id": sequence_id,
+        "kind": entry["kind"],
+        "length": length,
+        "start": start,
+        "end": end,
+        "sequence": _store.sequence(sequence_id, start - 1, end).decode('ascii')
+    }
@@ -1,14 +1,21 @@
+from itertools import chain, groupby
+from operator import itemgetter
+
+import numpy as np
+
+from tools.sequence_io import iter_sequence_chunks, DEFAULT_CHUNK_SIZE
+
 translate_dna_schema = {
     "type": "function",
     "function": {
         "name": "translate_dna",
-        "description": "Translate a DNA sequence into its corresponding protein sequence. The DNA sequence should contain only A, T, C, G nucleotides.",
+        "description": "Translate a DNA sequence into its corresponding protein sequence. The DNA sequence should contain only A, T, C, G nucleotides. Long sequences are returned as an ID in the local sequence store with a preview.",
         "parameters": {
             "type": "object",
             "properties": {
                 "sequence": {
                     "type": "string",
-                    "description": "The DNA sequence to translate (e.g., 'ATGGCCATTGTAATGGGCCGC')"
+                    "description": "The DNA sequence to translate (e.g., 'ATGGCCATTGTAATGGGCCGC'), or the ID of a stored one (e.g., 'dna_1')"
                 }
             },
             "required": ["sequence"]
@@ -16,49 +23,283 @@ translate_dna_schema = {
     }
 }
 
+translate_dna_file_schema = {
+    "type": "function",
+    "function": {
+        "name": "translate_dna_file",
+        "description": "Translate every record of a FASTA or FASTQ file (optionally gzipped) on disk and return a per-record summary. Use this instead of translate_dna for files or long sequences.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "Path to the FASTA/FASTQ file (e.g., 'transcripts.fa.gz')"
+                },
+                "max_records": {
+                    "type": "integer",
+                    "description": "Maximum number of records to summarize individually (default 10)"
+                }
+            },
+            "required": ["path"]
+        }
+    }
+}
+
+# Codon to amino acid mapping
+codon_table = {
+    'ATA':'I', 'ATC':'I', 'ATT':'I', 'ATG':'M',
+    'ACA':'T', 'ACC':'T', 'ACG':'T', 'ACT':'T',
+    'AAC':'N', 'AAT':'N', 'AAA':'K', 'AAG':'K',
+    'AGC':'S', 'AGT':'S', 'AGA':'R', 'AGG':'R',
+    'CTA':'L', 'CTC':'L', 'CTG':'L', 'CTT':'L',
+    'CCA':'P', 'CCC':'P', 'CCG':'P', 'CCT':'P',
+    'CAC':'H', 'CAT':'H', 'CAA':'Q', 'CAG':'Q',
+    'CGA':'R', 'CGC':'R', 'CGG':'R', 'CGT':'R',
+    'GTA':'V', 'GTC':'V', 'GTG':'V', 'GTT':'V',
+    'GCA':'A', 'GCC':'A', 'GCG':'A', 'GCT':'A',
+    'GAC':'D', 'GAT':'D', 'GAA':'E', 'GAG':'E',
+    'GGA':'G', 'GGC':'G', 'GGG':'G', 'GGT':'G',
+    'TCA':'S', 'TCC':'S', 'TCG':'S', 'TCT':'S',
+    'TTC':'F', 'TTT':'F', 'TTA':'L', 'TTG':'L',
+    'TAC':'Y', 'TAT':'Y', 'TAA':'*', 'TAG':'*',
+    'TGC':'C', 'TGT':'C', 'TGA':'*', 'TGG':'W',
+}
+
+# Reading frames: 1-3 on the forward strand, -1 to -3 on the reverse complement
+FRAMES = (1, 2, 3, -1, -2, -3)
+
+# Integer code of every byte value: A=0, C=1, G=2, T=3 (either case), 4 for anything else
+BASES = 'ACGT'
+BASE_CODES = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate(BASES):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+# Complement of each base code (4 stays 4)
+COMPLEMENT_CODES = np.array([3, 2, 1, 0, 4], dtype=np.uint8)
+
+# Codon index 16*b0 + 4*b1 + b2, with 64 reserved for codons containing a non-ACGT base
+UNKNOWN_CODON = 64
+
+def codon_index(codon):
+    """Index of a three-letter codon in CODON_LUT"""
+    b0, b1, b2 = (BASES.index(base) for base in codon)
+    return 16 * b0 + 4 * b1 + b2
+
+# Amino acid (as an ASCII byte) of every codon index; X for unknown codons
+CODON_LUT = np.full(UNKNOWN_CODON + 1, ord('X'), dtype=np.uint8)
+for _codon, _amino_acid in codon_table.items():
+    CODON_LUT[codon_index(_codon)] = ord(_amino_acid)
+
+def clean_dna(sequence):
+    """Strip whitespace from a DNA string or bytes object, returning bytes"""
+    if isinstance(sequence, str):
+        sequence = sequence.encode('ascii', errors='replace')
+    return sequence.translate(None, b' \n\r\t')
+
+def encode_dna(sequence):
+    """Encode cleaned DNA bytes as an array of base codes"""
+    return BASE_CODES[np.frombuffer(sequence, dtype=np.uint8)]
+
+def codon_indices(codes, step=1):
+    """
+    Codon index of every codon in an encoded sequence.
+
+    step=1 gives the codon starting at every position (all three frames
+    interleaved); step=3 gives frame 1 only.
+    """
+    n = len(codes) - 2
+    if n <= 0:
+        return np.empty(0, dtype=np.uint8)
+    b0 = codes[0:n:step]
+    b1 = codes[1:n + 1:step]
+    b2 = codes[2:n + 2:step]
+    index = (b0 << 4) | (b1 << 2) | b2
+    # Any base code of 4 sets bit 2 of the OR
+    index[(b0 | b1 | b2) > 3] = UNKNOWN_CODON
+    return index
+
+def reverse_complement_codes(codes):
+    """Reverse complement of an encoded sequence"""
+    return COMPLEMENT_CODES[codes[::-1]]
+
+def _to_protein(amino_acids, to_stop):
+    protein = amino_acids.tobytes().decode('ascii')
+    if to_stop:
+        stop = protein.find('*')
+        if stop != -1:
+            protein = protein[:stop]
+    return protein
+
+def translate_batch(sequences, frames=(1,), to_stop=False):
+    """
+    Translate many DNA sequences in one vectorized pass.
+
+    All sequences are concatenated into a single encoded buffer, the codon at
+    every position is mapped to its amino acid with one table lookup, and each
+    requested reading frame is then a strided slice of that array. Codons that
+    straddle two sequences are computed but never sliced.
+
+    Args:
+        sequences: Iterable of DNA strings (or bytes)
+        frames: Reading frames to translate (see FRAMES)
+        to_stop: Truncate each protein at its first stop codon
+
+    Returns:
+        List with one {frame: protein_sequence} dictionary per input sequence
+    """
+    cleaned = [clean_dna(sequence) for sequence in sequences]
+    ends = np.cumsum([len(sequence) for sequence in cleaned])
+    total = int(ends[-1]) if len(ends) else 0
+    codes = encode_dna(b''.join(cleaned))
+
+    forward = CODON_LUT[codon_indices(codes)]
+    if any(frame < 0 for frame in frames):
+        reverse = CODON_LUT[codon_indices(reverse_complement_codes(codes))]
+
+    results = []
+    start = 0
+    for end in ends:
+        end = int(end)
+        proteins = {}
+        for frame in frames:
+            if frame > 0:
+                amino_acids = forward[start + frame - 1:max(end - 2, start):3]
+            else:
+                # Sequence occupies [total - end, total - start) of the reverse complement
+                rc_start, rc_end = total - end, total - start
+                amino_acids = reverse[rc_start - frame - 1:max(rc_end - 2, rc_start):3]
+            proteins[frame] = _to_protein(amino_acids, to_stop)
+        results.append(proteins)
+        start = end
+    return results
+
+def translate_six_frames(sequence, to_stop=False):
+    """Translate one DNA sequence in all six reading frames"""
+    return translate_batch([sequence], frames=FRAMES, to_stop=to_stop)[0]
+
 def translate_dna(sequence):
     """
-    Translate a DNA sequence to protein.
-    Returns the amino acid sequence.
+    Translate a DNA sequence (or the ID of a stored one) to protein.
+    Returns the amino acid sequence, or its ID and a preview if it is long.
     """
-    # Codon to amino acid mapping
-    codon_table = {
-        'ATA':'I', 'ATC':'I', 'ATT':'I', 'ATG':'M',
-        'ACA':'T', 'ACC':'T', 'ACG':'T', 'ACT':'T',
-        'AAC':'N', 'AAT':'N', 'AAA':'K', 'AAG':'K',
-        'AGC':'S', 'AGT':'S', 'AGA':'R', 'AGG':'R',
-        'CTA':'L', 'CTC':'L', 'CTG':'L', 'CTT':'L',
-        'CCA':'P', 'CCC':'P', 'CCG':'P', 'CCT':'P',
-        'CAC':'H', 'CAT':'H', 'CAA':'Q', 'CAG':'Q',
-        'CGA':'R', 'CGC':'R', 'CGG':'R', 'CGT':'R',
-        'GTA':'V', 'GTC':'V', 'GTG':'V', 'GTT':'V',
-        'GCA':'A', 'GCC':'A', 'GCG':'A', 'GCT':'A',
-        'GAC':'D', 'GAT':'D', 'GAA':'E', 'GAG':'E',
-        'GGA':'G', 'GGC':'G', 'GGG':'G', 'GGT':'G',
-        'TCA':'S', 'TCC':'S', 'TCG':'S', 'TCT':'S',
-        'TTC':'F', 'TTT':'F', 'TTA':'L', 'TTG':'L',
-        'TAC':'Y', 'TAT':'Y', 'TAA':'*', 'TAG':'*',
-        'TGC':'C', 'TGT':'C', 'TGA':'*', 'TGG':'W',
-    }
-    
+    # Imported here: the store packs DNA with tools.packed_sequence, which builds on this module
+    from tools.sequence_store import resolve_sequence, sequence_fields
+    try:
+        sequence = resolve_sequence(sequence, "dna")
+    except ValueError as e:
+        return {"error": str(e)}
+
     # Clean and uppercase the sequence
-    sequence = sequence.upper().replace(" ", "").replace("\n", "")
-    
+    dna = clean_dna(sequence).upper()
+    codes = encode_dna(dna)
+
     # Validate DNA sequence
-    if not all(base in 'ATCG' for base in sequence):
+    if codes.size and codes.max() > 3:
         return {"error": "Invalid DNA sequence. Only A, T, C, G are allowed."}
-    
-    # Translate
-    protein = []
-    for i in range(0, len(sequence) - 2, 3):
-        codon = sequence[i:i+3]
-        amino_acid = codon_table.get(codon, 'X')  # X for unknown
-        if amino_acid == '*':  # Stop codon
-            break
-        protein.append(amino_acid)
-    
+
+    # Translate frame 1, stopping at the first stop codon
+    protein = _to_protein(CODON_LUT[codon_indices(codes, step=3)], to_stop=True)
+
     return {
-        "dna_sequence": sequence,
-        "protein_sequence": ''.join(protein),
+        **sequence_fields("dna_sequence", "dna", dna),
+        **sequence_fields("protein_sequence", "protein", protein),
         "length": len(protein)
     }
+
+def translate_chunks(chunks):
+    """
+    Translate frame 1 of a sequence that arrives as a stream of byte chunks.
+
+    Bases left over after the last whole codon of a chunk are carried into the
+    next chunk. Yields one protein piece per chunk, with stop codons as '*'.
+    """
+    carry = b''
+    for chunk in chunks:
+        data = carry + chunk if carry else chunk
+        usable = len(data) - len(data) % 3
+        carry = data[usable:]
+        if usable:
+            codes = encode_dna(data[:usable])
+            yield CODON_LUT[codon_indices(codes, step=3)].tobytes().decode('ascii')
+
+def _count_bases(items, record):
+    for _, _, chunk in items:
+        record["dna_length"] += len(chunk)
+        yield chunk
+
+def translate_file(path, to_stop=True, keep_protein=True, preview_length=60, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Translate the records of a FASTA/FASTQ file one at a time.
+
+    The file is streamed in chunk_size pieces, so memory stays constant
+    regardless of file size (plus the protein itself when keep_protein is set).
+    Once a stop codon is reached with to_stop, the rest of the record is
+    counted but not translated.
+
+    Yields:
+        One dictionary per record with its id, DNA and protein lengths, a
+        protein preview and, if keep_protein, the full protein sequence
+    """
+    for _, items in groupby(iter_sequence_chunks(path, chunk_size), key=itemgetter(0)):
+        first = next(items)
+        record = {
+            "id": first[1],
+            "dna_length": 0,
+            "protein_length": 0,
+            "stop_codon_found": False
+        }
+        protein = []
+        preview = []
+        preview_remaining = preview_length
+
+        counted = _count_bases(chain([first], items), record)
+        for piece in translate_chunks(counted):
+            stop = piece.find('*') if to_stop else -1
+            if stop != -1:
+                piece = piece[:stop]
+            record["protein_length"] += len(piece)
+            if preview_remaining > 0:
+                preview.append(piece[:preview_remaining])
+                preview_remaining -= len(preview[-1])
+            if keep_protein:
+                protein.append(piece)
+            if stop != -1:
+                record["stop_codon_found"] = True
+                break
+        # Count the rest of the record without translating it
+        for _ in counted:
+            pass
+
+        record["protein_preview"] = ''.join(preview)
+        if keep_protein:
+            record["protein_sequence"] = ''.join(protein)
+        yield record
+
+def translate_dna_file(path, max_records=10):
+    """
+    Translate a FASTA/FASTQ file and summarize the result.
+    Only summaries are returned, never full sequences.
+    """
+    try:
+        records = []
+        record_count = 0
+        total_bases = 0
+        total_protein = 0
+        for record in translate_file(path, keep_protein=False):
+            record_count += 1
+            total_bases += record["dna_length"]
+            total_protein += record["protein_length"]
+            if len(records) < max_records:
+                records.append(record)
+    except (OSError, ValueError) as e:
+        return {"error": f"Could not translate {path}: {e}"}
+
+    return {
+        "path": path,
+        "record_count": record_count,
+        "total_dna_length": total_bases,
+        "total_protein_length": total_protein,
+        "records": records,
+        "records_truncated": record_count > max_records
+    }
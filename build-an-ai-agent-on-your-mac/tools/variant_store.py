@@ -0,0 +1,462 @@
+"""
+Pluggable variant backends for check_variant.
+
+A backend answers "which of the patient's variants fall in this region?".
+Genes are turned into regions with a gene interval table that is loaded
+once. Three backends are available:
+
+- SimulatedVariantBackend: the built-in demo patient (the default)
+- IndexedVCFBackend: a plain-text, position-sorted VCF with a sidecar index
+  of every BLOCK_SIZE-th record's position and byte offset, so a region
+  query is a binary search plus a short read from a memory map. The index
+  also keeps each chromosome's longest REF, so a deletion that starts
+  before a region but reaches into it is found too
+- TabixVCFBackend: a bgzipped, tabix-indexed VCF read through pysam (an
+  optional dependency)
+
+Either way a query never scans the whole file, so its latency does not grow
+with the number of records. query_many answers many genes at once with one
+pass (one tabix fetch) per chromosome. Each backend's source names the data
+it reads, for cache keys.
+"""
+
+import mmap
+import os
+import threading
+
+import numpy as np
+
+# Approximate GRCh38 gene extents (1-based, inclusive) for the genes the
+# simulated tools know about
+GENE_INTERVALS = {
+    'SCN1A': ('chr2', 166149214, 166284524),
+    'KCNQ2': ('chr20', 63400208, 63472677),
+    'TP53': ('chr17', 7661779, 7687550),
+    'BRCA1': ('chr17', 43044295, 43125364),
+    'BRCA2': ('chr13', 32315508, 32400268),
+    'INS': ('chr11', 2159779, 2161209),
+    'GCK': ('chr7', 44143213, 44198170),
+    'HNF1A': ('chr12', 120978543, 121002512),
+    'APP': ('chr21', 25880550, 26171128),
+    'PSEN1': ('chr14', 73136434, 73223691),
+    'PSEN2': ('chr1', 226870184, 226927726),
+    'APOE': ('chr19', 44905796, 44909393)
+}
+
+# Records between consecutive entries of the sidecar index
+BLOCK_SIZE = 64
+
+INDEX_SUFFIX = '.vidx.npz'
+
+def load_gene_intervals(path):
+    """
+    Read a gene interval table from a BED-like file.
+
+    Each line holds chrom, start (0-based), end and gene symbol, separated by
+    tabs; lines starting with '#', 'track' or 'browser' are skipped.
+
+    Returns:
+        Dictionary mapping upper-case gene symbols to (chrom, start, end),
+        with 1-based inclusive coordinates
+    """
+    intervals = {}
+    with open(path) as handle:
+        for line in handle:
+            if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                continue
+            chrom, start, end, gene = line.rstrip('\n').split('\t')[:4]
+            intervals[gene.upper()] = (chrom, int(start) + 1, int(end))
+    return intervals
+
+def variant_id(chrom, pos, ref, alt):
+    """Variant id in the chrN:pos:ref:alt form the other tools expect"""
+    if not chrom.startswith('chr'):
+        chrom = 'chr' + chrom
+    return f"{chrom}:{pos}:{ref}:{alt}"
+
+def chrom_aliases(chrom):
+    """The chromosome name with and without its 'chr' prefix"""
+    return (chrom, chrom[3:]) if chrom.startswith('chr') else (chrom, 'chr' + chrom)
+
+def regions_by_chrom(gene_intervals, genes):
+    """
+    The regions of the genes in the interval table, grouped by chromosome.
+
+    Returns:
+        Dictionary mapping each chromosome to its (gene, start, end) regions, sorted by start
+    """
+    regions = {}
+    for gene in genes:
+        if gene in gene_intervals:
+            chrom, start, end = gene_intervals[gene]
+            regions.setdefault(chrom, []).append((gene, start, end))
+    return {chrom: sorted(chrom_regions, key=lambda region: region[1:]) for chrom, chrom_regions in regions.items()}
+
+def merge_regions(regions):
+    """The (start, end) spans covered by (gene, start, end) regions sorted by start"""
+    spans = []
+    for _, start, end in regions:
+        if spans and start <= spans[-1][1] + 1:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return spans
+
+def overlapping_genes(regions, pos, ref):
+    """The genes of the regions that a record's REF overlaps"""
+    return [gene for gene, start, end in regions if pos <= end and pos + len(ref) > start]
+
+def parse_vcf_line(line):
+    """
+    Variants of one VCF data line, one per ALT allele the patient carries.
+
+    When the line has a sample column, ALT alleles absent from the first
+    sample's genotype (e.g. 0/0 or ./.) are skipped.
+    """
+    fields = line.rstrip('\r\n').split('\t')
+    chrom, pos, _, ref, alts = fields[:5]
+    genotype = None
+    if len(fields) > 9:
+        keys = fields[8].split(':')
+        values = fields[9].split(':')
+        if 'GT' in keys and keys.index('GT') < len(values):
+            genotype = values[keys.index('GT')]
+
+    carried = None
+    if genotype is not None:
+        carried = {int(allele) for allele in genotype.replace('|', '/').split('/') if allele.isdigit()}
+
+    variants = []
+    for number, alt in enumerate(alts.split(','), 1):
+        if alt == '.' or (carried is not None and number not in carried):
+            continue
+        variant = {
+            "variant_id": variant_id(chrom, pos, ref, alt),
+            "chrom": chrom,
+            "pos": int(pos),
+            "ref": ref,
+            "alt": alt
+        }
+        if genotype is not None:
+            variant["genotype"] = genotype
+        variants.append(variant)
+    return variants
+
+class SimulatedVariantBackend:
+    """The demo patient: one variant in each of SCN1A, BRCA1 and TP53"""
+
+    patient_variants = {
+        'SCN1A': 'chr2:166245425:T:C',
+        'BRCA1': 'chr17:43094464:G:A',
+        'TP53': 'chr17:7675088:C:T'
+    }
+
+    source = "simulated"
+
+    def __init__(self, gene_intervals=GENE_INTERVALS):
+        self.gene_intervals = gene_intervals
+
+    def query(self, chrom, start, end):
+        variants = []
+        for variant in self.patient_variants.values():
+            variant_chrom, pos, ref, alt = variant.split(':')
+            if variant_chrom in chrom_aliases(chrom) and start - len(ref) < int(pos) <= end:
+                variants.append({"variant_id": variant, "chrom": variant_chrom, "pos": int(pos),
+                                 "ref": ref, "alt": alt})
+        return variants
+
+    def query_many(self, genes):
+        """Variants in the region of each gene in the interval table"""
+        return {gene: self.query(*self.gene_intervals[gene]) for gene in genes if gene in self.gene_intervals}
+
+    def close(self):
+        pass
+
+def index_vcf(path, block_size=BLOCK_SIZE):
+    """
+    Build the sidecar index of a plain-text VCF in memory.
+
+    The VCF must be sorted by position within each chromosome, with each
+    chromosome's records contiguous (as bcftools sort produces).
+
+    Returns:
+        Dictionary of the index arrays
+    """
+    chroms = []
+    chrom_starts = []
+    max_ref_lengths = []
+    positions = []
+    offsets = []
+
+    with open(path, 'rb') as handle:
+        offset = 0
+        previous_chrom = None
+        previous_pos = 0
+        in_block = 0
+        for line in handle:
+            if line.startswith(b'#') or not line.strip():
+                offset += len(line)
+                continue
+            chrom, pos, _, ref = line.split(b'\t', 4)[:4]
+            pos = int(pos)
+            if chrom != previous_chrom:
+                if chrom.decode() in chroms:
+                    raise ValueError(f"{path}: records of {chrom.decode()} are not contiguous; sort the VCF first")
+                chroms.append(chrom.decode())
+                chrom_starts.append(len(positions))
+                max_ref_lengths.append(1)
+                previous_chrom, previous_pos, in_block = chrom, 0, 0
+            elif pos < previous_pos:
+                raise ValueError(f"{path}: {chrom.decode()}:{pos} is out of order; sort the VCF first")
+            max_ref_lengths[-1] = max(max_ref_lengths[-1], len(ref))
+            if in_block == 0:
+                positions.append(pos)
+                offsets.append(offset)
+            in_block = (in_block + 1) % block_size
+            previous_pos = pos
+            offset += len(line)
+
+    stat = os.stat(path)
+    return {
+        "chroms": np.array(chroms, dtype=str),
+        "chrom_starts": np.array(chrom_starts + [len(positions)], dtype=np.int64),
+        "max_ref_lengths": np.array(max_ref_lengths, dtype=np.int64),
+        "positions": np.array(positions, dtype=np.int64),
+        "offsets": np.array(offsets, dtype=np.int64),
+        "source": np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    }
+
+def build_vcf_index(path, block_size=BLOCK_SIZE):
+    """
+    Build the sidecar index of a plain-text VCF and save it next to the file.
+
+    Returns:
+        Path of the index file
+    """
+    index_path = path + INDEX_SUFFIX
+    np.savez(index_path, **index_vcf(path, block_size))
+    return index_path
+
+def load_vcf_index(index_path):
+    """The arrays of a sidecar index, or None if there is none or it cannot be read"""
+    try:
+        with np.load(index_path) as index:
+            return {name: index[name] for name in index.files}
+    except (OSError, ValueError):
+        return None
+
+class IndexedVCFBackend:
+    """Region queries on a plain-text VCF through a sidecar block index"""
+
+    def __init__(self, path, gene_intervals=GENE_INTERVALS):
+        """
+        Args:
+            path: Position-sorted, uncompressed VCF; its index is built on
+                first use and rebuilt whenever the VCF changes, and kept in
+                memory only when it cannot be saved next to the VCF (e.g. in
+                a read-only data directory)
+            gene_intervals: Dictionary mapping gene symbols to (chrom, start, end)
+        """
+        self.path = path
+        self.gene_intervals = gene_intervals
+        index_path = path + INDEX_SUFFIX
+        stat = os.stat(path)
+        self.source = f"{os.path.abspath(path)}@{stat.st_mtime_ns}"
+        index = load_vcf_index(index_path)
+        # Rebuild indexes of an older VCF, and older indexes without REF lengths
+        if (index is None or "max_ref_lengths" not in index
+                or list(index["source"]) != [stat.st_size, stat.st_mtime_ns]):
+            index = index_vcf(path)
+            try:
+                np.savez(index_path, **index)
+            except OSError:
+                pass
+
+        chrom_starts = index["chrom_starts"]
+        positions = index["positions"]
+        offsets = index["offsets"]
+        self._blocks = {
+            chrom: (
+                positions[chrom_starts[i]:chrom_starts[i + 1]],
+                offsets[chrom_starts[i]:chrom_starts[i + 1]],
+                int(index["max_ref_lengths"][i])
+            )
+            for i, chrom in enumerate(index["chroms"].tolist())
+        }
+        self._handle = open(path, 'rb')
+        self._mapped = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b''
+
+    def _chrom_name(self, chrom):
+        """The chromosome's name in the VCF, or None if it has no records"""
+        return next((name for name in chrom_aliases(chrom) if name in self._blocks), None)
+
+    def _first_offset(self, name, start):
+        """Offset of the last block that begins before any record whose REF can reach start"""
+        positions, offsets, max_ref_length = self._blocks[name]
+        block = max(int(np.searchsorted(positions, start - max_ref_length + 1, side='left')) - 1, 0)
+        return int(offsets[block])
+
+    def _records(self, name, offset):
+        """
+        Records of chrom name from offset to the end of the chromosome.
+
+        Yields:
+            (offset, pos, ref, line) of each record
+        """
+        prefix = name.encode() + b'\t'
+        while offset < len(self._mapped):
+            line_end = self._mapped.find(b'\n', offset)
+            if line_end == -1:
+                line_end = len(self._mapped)
+            line = self._mapped[offset:line_end]
+            if not line.startswith(prefix):
+                return
+            _, pos, _, ref = line.split(b'\t', 4)[:4]
+            yield offset, int(pos), ref, line
+            offset = line_end + 1
+
+    def query(self, chrom, start, end):
+        """Variants on chrom whose REF overlaps [start, end]"""
+        name = self._chrom_name(chrom)
+        if name is None:
+            return []
+        variants = []
+        for _, pos, ref, line in self._records(name, self._first_offset(name, start)):
+            if pos > end:
+                break
+            if pos + len(ref) > start:
+                variants.extend(parse_vcf_line(line.decode()))
+        return variants
+
+    def query_many(self, genes):
+        """
+        Variants in the region of each gene in the interval table: one forward
+        pass over each chromosome's records, jumping over the gaps between
+        regions through the index.
+        """
+        results = {}
+        for chrom, regions in regions_by_chrom(self.gene_intervals, genes).items():
+            results.update((gene, []) for gene, _, _ in regions)
+            name = self._chrom_name(chrom)
+            if name is None:
+                continue
+            offset = 0
+            for span_start, span_end in merge_regions(regions):
+                offset = max(offset, self._first_offset(name, span_start))
+                for record_offset, pos, ref, line in self._records(name, offset):
+                    if pos > span_end:
+                        # Read again for the next span
+                        offset = record_offset
+                        break
+                    genes_hit = overlapping_genes(regions, pos, ref)
+                    if genes_hit:
+                        variants = parse_vcf_line(line.decode())
+                        for gene in genes_hit:
+                            results[gene].extend(variants)
+                else:
+                    # The chromosome's records ran out
+                    break
+        return results
+
+    def close(self):
+        if isinstance(self._mapped, mmap.mmap):
+            self._mapped.close()
+        self._handle.close()
+
+class TabixVCFBackend:
+    """Region queries on a bgzipped, tabix-indexed VCF through pysam"""
+
+    def __init__(self, path, gene_intervals=GENE_INTERVALS):
+        """
+        Args:
+            path: bgzipped VCF with a .tbi or .csi index next to it
+            gene_intervals: Dictionary mapping gene symbols to (chrom, start, end)
+        """
+        try:
+            import pysam
+        except ImportError as e:
+            raise ImportError("Reading bgzipped VCFs needs pysam: pip install pysam") from e
+        self.path = path
+        self.gene_intervals = gene_intervals
+        self.source = f"{os.path.abspath(path)}@{os.stat(path).st_mtime_ns}"
+        self._pysam = pysam
+        self._contigs = set(pysam.TabixFile(path).contigs)
+        # pysam file handles must not be shared between threads
+        self._local = threading.local()
+
+    def query(self, chrom, start, end):
+        """Variants on chrom whose REF overlaps [start, end] (tabix indexes the REF span)"""
+        name = next((name for name in chrom_aliases(chrom) if name in self._contigs), None)
+        if name is None:
+            return []
+        if not hasattr(self._local, "tabix"):
+            self._local.tabix = self._pysam.TabixFile(self.path)
+        variants = []
+        for line in self._local.tabix.fetch(name, start - 1, end):
+            variants.extend(parse_vcf_line(line))
+        return variants
+
+    def query_many(self, genes):
+        """Variants in the region of each gene in the interval table, with one tabix fetch per chromosome"""
+        if not hasattr(self._local, "tabix"):
+            self._local.tabix = self._pysam.TabixFile(self.path)
+        results = {}
+        for chrom, regions in regions_by_chrom(self.gene_intervals, genes).items():
+            results.update((gene, []) for gene, _, _ in regions)
+            name = next((name for name in chrom_aliases(chrom) if name in self._contigs), None)
+            if name is None:
+                continue
+            first = min(start for _, start, _ in regions)
+            last = max(end for _, _, end in regions)
+            for line in self._local.tabix.fetch(name, first - 1, last):
+                _, pos, _, ref = line.split('\t', 4)[:4]
+                genes_hit = overlapping_genes(regions, int(pos), ref)
+                if genes_hit:
+                    variants = parse_vcf_line(line)
+                    for gene in genes_hit:
+                        results[gene].extend(variants)
+        return results
+
+    def close(self):
+        if hasattr(self._local, "tabix"):
+            self._local.tabix.close()
+
+def open_variant_backend(vcf_path=None, gene_intervals_path=None):
+    """
+    Open the backend for a patient VCF.
+
+    Args:
+        vcf_path: .vcf (indexed with a sidecar index) or .vcf.gz (bgzipped
+            and tabix-indexed); None for the simulated patient
+        gene_intervals_path: Optional BED-like gene interval table replacing
+            the built-in GENE_INTERVALS
+    """
+    gene_intervals = load_gene_intervals(gene_intervals_path) if gene_intervals_path else GENE_INTERVALS
+    if vcf_path is None:
+        return SimulatedVariantBackend(gene_intervals)
+    if vcf_path.endswith(('.gz', '.bgz')):
+        return TabixVCFBackend(vcf_path, gene_intervals)
+    return IndexedVCFBackend(vcf_path, gene_intervals)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_variant_backend():
+    """
+    The backend check_variant uses: the one set with set_variant_backend, or
+    else one opened from the PATIENT_VCF and GENE_INTERVALS environment
+    variables (the simulated patient when PATIENT_VCF is unset)
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = open_variant_backend(os.environ.get("PATIENT_VCF"), os.environ.get("GENE_INTERVALS"))
+        return _backend
+
+def set_variant_backend(backend):
+    """Make check_variant query backend, closing the previous one"""
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+        _backend = backend
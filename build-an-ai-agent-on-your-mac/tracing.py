@@ -0,0 +1,166 @@
+"""
+Structured tracing of LLM calls, tool executions and rendering.
+
+A Tracer records one span per LLM call, tool call, render and whole turn,
+with its duration and attributes (model, token usage, tool name, argument
+and result sizes). Spans are kept in memory for an in-process summary and,
+optionally, appended to a JSONL trace file as they finish.
+
+For streamed LLM calls the time to first token is recorded as well, which
+splits the call into prefill (prompt processing) and decode (generation).
+"""
+
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Id of the turn the current code runs in, so tool spans on worker threads
+# (which copy the context) are attributed to the right turn
+current_turn = contextvars.ContextVar("current_turn", default=None)
+
+class Tracer:
+    """Collects spans in memory and optionally writes them to a JSONL file"""
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path: JSONL trace file to append spans to, or None to keep them
+                in memory only
+        """
+        self.path = path
+        self.spans = []
+        self._turns = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'a') if path else None
+
+    @contextmanager
+    def span(self, kind, name, **attributes):
+        """
+        Time the enclosed block as a span.
+
+        Yields the span's attribute dictionary, so the block can add
+        attributes it only learns while running (such as token usage).
+        An exception escaping the block is recorded as the span's error.
+        """
+        start_time = time.time()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.record(kind, name, start_time, time.perf_counter() - start, attributes)
+
+    @contextmanager
+    def turn(self, **attributes):
+        """Span covering one user turn; spans started inside it carry its id"""
+        with self._lock:
+            self._turns += 1
+            turn_id = self._turns
+        token = current_turn.set(turn_id)
+        try:
+            with self.span("turn", "turn", **attributes) as span:
+                yield span
+        finally:
+            current_turn.reset(token)
+
+    def record(self, kind, name, start_time, duration, attributes=None):
+        """Add a finished span"""
+        span = {
+            "kind": kind,
+            "name": name,
+            "turn": current_turn.get(),
+            "start": start_time,
+            "duration_s": duration,
+            "thread": threading.current_thread().name,
+            **(attributes or {})
+        }
+        with self._lock:
+            self.spans.append(span)
+            if self._file is not None:
+                self._file.write(json.dumps(span, default=str) + "\n")
+                self._file.flush()
+
+    def summary(self, turn=None):
+        """
+        Describe where the traced time went.
+
+        Args:
+            turn: Only summarize this turn id (None for every span)
+
+        Returns:
+            Multi-line text: count, total, mean and p95 duration per span
+            kind and name, token totals, and the prefill/decode split
+        """
+        with self._lock:
+            spans = [span for span in self.spans if turn is None or span["turn"] == turn]
+        if not spans:
+            return "No spans traced yet"
+
+        groups = defaultdict(list)
+        for span in spans:
+            groups[(span["kind"], span["name"])].append(span["duration_s"])
+
+        lines = [f"{'span':<36} {'count':>6} {'total s':>9} {'mean ms':>9} {'p95 ms':>9}"]
+        for (kind, name), durations in sorted(groups.items(), key=lambda item: -sum(item[1])):
+            durations = np.asarray(durations)
+            lines.append(
+                f"{kind + ':' + name:<36} {len(durations):>6} {durations.sum():>9.3f} "
+                f"{durations.mean() * 1e3:>9.1f} {np.percentile(durations, 95) * 1e3:>9.1f}"
+            )
+
+        llm_spans = [span for span in spans if span["kind"] == "llm"]
+        prompt_tokens = sum(span.get("prompt_tokens") or 0 for span in llm_spans)
+        completion_tokens = sum(span.get("completion_tokens") or 0 for span in llm_spans)
+        lines.append(f"LLM tokens: {prompt_tokens:,} prompt, {completion_tokens:,} completion")
+
+        streamed = [span for span in llm_spans if span.get("time_to_first_token") is not None]
+        if streamed:
+            prefill = sum(span["time_to_first_token"] for span in streamed)
+            decode = sum(span["duration_s"] - span["time_to_first_token"] for span in streamed)
+            lines.append(f"Streamed LLM time: {prefill:.2f}s prefill (to first token), {decode:.2f}s decode")
+
+        tool_spans = [span for span in spans if span["kind"] == "tool"]
+        if tool_spans:
+            cached = sum(1 for span in tool_spans if span.get("cached"))
+            argument_bytes = sum(span.get("argument_bytes", 0) for span in tool_spans)
+            result_bytes = sum(span.get("result_bytes", 0) for span in tool_spans)
+            lines.append(
+                f"Tools: {len(tool_spans)} call(s), {cached} from cache, "
+                f"{argument_bytes:,} argument bytes, {result_bytes:,} result bytes"
+            )
+        return "\n".join(lines)
+
+    @property
+    def last_turn(self):
+        return self._turns or None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def llm_usage(response):
+    """Prompt and completion token counts from a completion's usage, if reported"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {"prompt_tokens": None, "completion_tokens": None}
+    return {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+
+def maybe_span(tracer, kind, name, **attributes):
+    """tracer.span(...) when tracing, otherwise a no-op yielding the attributes"""
+    if tracer is None:
+        return nullcontext(attributes)
+    return tracer.span(kind, name, **attributes)
+
+def maybe_turn(tracer, **attributes):
+    """tracer.turn(...) when tracing, otherwise a no-op yielding the attributes"""
+    if tracer is None:
+        return nullcontext(attributes)
+    return tracer.turn(**attributes)
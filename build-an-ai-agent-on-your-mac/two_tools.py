@@ -2,12 +2,20 @@ from openai import OpenAI
 from rich.console import Console
 from rich.panel import Panel
 import json
+import time
 
-from util import call_llm, render_response, print_messages, execute_tool_call
-from tools.translate_dna import translate_dna, translate_dna_schema
+from util import call_llm, render_response, print_messages, execute_tool_calls, print_tool_timing, MAX_TOOL_CONCURRENCY
+from tools.translate_dna import translate_dna, translate_dna_schema, translate_dna_file, translate_dna_file_schema
 from tools.analyze_protein import analyze_protein, analyze_protein_schema
+from tools.find_orfs import find_orfs, find_orfs_schema
+from tools.reverse_complement import reverse_complement, reverse_complement_schema
+from tools.count_kmers import count_kmers, count_kmers_schema
+from tools.codon_usage import codon_usage, codon_usage_schema
+from tools.sequence_store import (
+    get_sequence, get_sequence_schema, load_sequences, load_sequences_schema, store_inline_sequences
+)
 
-def main(show_messages): 
+def main(show_messages, max_concurrency=MAX_TOOL_CONCURRENCY): 
     # Initialize Rich console
     console = Console()
 
@@ -20,13 +28,27 @@ def main(show_messages):
     # Define the mapping of function names to function objects
     tool_functions = {
         "translate_dna": translate_dna,
-        "analyze_protein": analyze_protein
+        "translate_dna_file": translate_dna_file,
+        "analyze_protein": analyze_protein,
+        "find_orfs": find_orfs,
+        "reverse_complement": reverse_complement,
+        "count_kmers": count_kmers,
+        "codon_usage": codon_usage,
+        "load_sequences": load_sequences,
+        "get_sequence": get_sequence
     }
     
     # Define the tool schemas
     tool_schemas = [
         translate_dna_schema, 
-        analyze_protein_schema
+        translate_dna_file_schema,
+        analyze_protein_schema,
+        find_orfs_schema,
+        reverse_complement_schema,
+        count_kmers_schema,
+        codon_usage_schema,
+        load_sequences_schema,
+        get_sequence_schema
     ]
     
     # Welcome message
@@ -51,6 +73,11 @@ def main(show_messages):
         if not user_input.strip():
             continue
         
+        # Keep pasted sequences out of the context: store them and refer to them by ID
+        user_input, stored = store_inline_sequences(user_input)
+        for summary in stored:
+            console.print(f"[dim][Stored {summary['length']:,} bp as {summary['sequence_id']}][/dim]")
+
         # Add user message to context
         messages.append({"role": "user", "content": user_input})
         
@@ -64,20 +91,24 @@ def main(show_messages):
                 # Add the assistant's response (with tool call) to messages
                 messages.append(response_message)
                 
-                # Execute each tool call
                 for tool_call in response_message.tool_calls:
                     console.print(f"[dim][Tool Call: {tool_call.function.name}][/dim]")
-                    
-                    # Execute the tool using the tool_functions dictionary
-                    tool_result = execute_tool_call(tool_call, tool_functions)
-                    
-                    # Add tool result to messages
+                
+                # Execute the turn's tool calls concurrently
+                tools_start = time.time()
+                executed = execute_tool_calls(response_message.tool_calls, tool_functions, max_concurrency)
+                tools_wall = time.time() - tools_start
+                
+                # Add tool results to messages, in the original tool call order
+                for tool_call, tool_result, _ in executed:
                     messages.append({
                         "role": "tool",
                         "tool_call_id": tool_call.id,
                         "content": json.dumps(tool_result)
                     })
                 
+                print_tool_timing(executed, tools_wall, console)
+                
                 # Get the next response from the model
                 with console.status("[bold green]Processing...", spinner="dots"):
                     response_message = call_llm(messages, client, tool_schemas)
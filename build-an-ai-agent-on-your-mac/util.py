@@ -2,20 +2,49 @@ import re
 from rich.markdown import Markdown
 from rich.syntax import Syntax
 import json 
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
-def call_llm(messages, client, tool_schemas=None, model="gpt-4"): 
-    """Call LLM with optional tool support"""
-    params = {
-        "model": model,
-        "messages": messages
-    }
-    
-    if tool_schemas:
-        params["tools"] = tool_schemas
-        params["tool_choice"] = "auto"
+from tracing import maybe_span, llm_usage
+
+# Maximum number of tool calls from one assistant turn that run at the same time
+MAX_TOOL_CONCURRENCY = 4
+
+def call_llm(messages, client, tool_schemas=None, model="gpt-4", recorder=None, tracer=None, resilience=None): 
+    """
+    Call LLM with optional tool support.
     
-    response = client.chat.completions.create(**params)
-    return response.choices[0].message
+    With an LLMRecorder in replay mode the completion is served from the
+    recording and the client is not used; in record mode it is stored there.
+    With a Tracer the call is recorded as an "llm" span with its token usage.
+    With a Resilience policy the call has a deadline and may be hedged.
+    """
+    with maybe_span(tracer, "llm", model, message_count=len(messages)) as span:
+        if recorder is not None and recorder.mode == "replay":
+            span["replayed"] = True
+            return recorder.replay(model, messages, tool_schemas)
+        
+        params = {
+            "model": model,
+            "messages": messages
+        }
+        
+        if tool_schemas:
+            params["tools"] = tool_schemas
+            params["tool_choice"] = "auto"
+        
+        if resilience is not None:
+            response = resilience.call_llm(client.chat.completions.create, params,
+                                           getattr(client.chat.completions, "create_hedge", None))
+        else:
+            response = client.chat.completions.create(**params)
+        message = response.choices[0].message
+        span.update(llm_usage(response))
+        
+        if recorder is not None:
+            recorder.record(model, messages, tool_schemas, message)
+        return message
 
 def render_response(text, console):
     """Render response with syntax highlighting for code blocks"""
@@ -41,34 +70,123 @@ def render_response(text, console):
             )
             console.print(syntax)
 
+def message_to_dict(message):
+    """Plain dictionary form of a message, whether a dict or an OpenAI message object"""
+    if hasattr(message, 'model_dump'):
+        return message.model_dump(exclude_none=True)
+    return message
+
 def print_messages(messages, console): 
     console.print("[dim]Accumulated messages:[/dim]")
-    import json
-    context_dicts = []
-    for message in messages:
-        if hasattr(message, 'model_dump'):
-            context_dicts.append(message.model_dump())
-        else:
-            context_dicts.append(message)
+    context_dicts = [message_to_dict(message) for message in messages]
     print(json.dumps(context_dicts, indent=2))
 
-def execute_tool_call(tool_call, tool_functions):
+def execute_tool_call(tool_call, tool_functions, cache=None, tracer=None, prefetcher=None, resilience=None):
     """
     Execute the requested tool call using the provided tool functions dictionary.
     
     Args:
         tool_call: The tool call object from the LLM response
         tool_functions: Dictionary mapping function names to function objects
+        cache: Optional ToolCache consulted before running cacheable tools
+        tracer: Optional Tracer that records the call as a "tool" span
+        prefetcher: Optional Prefetcher that may already hold the result, and
+            that starts the follow-up lookups this result suggests
+        resilience: Optional Resilience policy that runs the tool under a
+            deadline and retries it if it fails
     
     Returns:
         Dictionary containing the result of the tool call
     """
     function_name = tool_call.function.name
-    arguments = json.loads(tool_call.function.arguments)
     
-    if function_name in tool_functions:
-        return tool_functions[function_name](**arguments)
-    else:
-        return {"error": f"Unknown function: {function_name}"}
+    with maybe_span(tracer, "tool", function_name, argument_bytes=len(tool_call.function.arguments)) as span:
+        arguments = json.loads(tool_call.function.arguments)
+        prefetched, result = (False, None)
+        if prefetcher is not None:
+            timeout = None if resilience is None else resilience.tool_deadline
+            prefetched, result = prefetcher.take(function_name, arguments, timeout)
+        cached = False
+        if not prefetched:
+            result, cached = _run_tool(function_name, arguments, tool_functions, cache, resilience)
+        if prefetcher is not None:
+            prefetcher.observe(function_name, result)
+        if tracer is not None:
+            span["cached"] = cached
+            span["prefetched"] = prefetched
+            span["result_bytes"] = len(json.dumps(result))
+            if isinstance(result, dict) and "error" in result:
+                span["error"] = result["error"]
+        return result
+
+def _run_tool(function_name, arguments, tool_functions, cache, resilience=None):
+    """Run one tool, through the cache if it is cacheable; returns (result, from_cache)"""
+    if function_name not in tool_functions:
+        return {"error": f"Unknown function: {function_name}"}, False
+    
+    def run():
+        if resilience is None:
+            return tool_functions[function_name](**arguments), True
+        return resilience.call_tool(function_name, tool_functions[function_name], arguments)
+    
+    if cache is not None and cache.cacheable(function_name):
+        found, result = cache.get(function_name, arguments)
+        if not found:
+            result, completed = run()
+            # A call that timed out or failed has no result worth keeping
+            if completed:
+                cache.put(function_name, arguments, result)
+        return result, found
+    
+    return run()[0], False
 
+def execute_tool_calls(tool_calls, tool_functions, max_concurrency=MAX_TOOL_CONCURRENCY, cache=None, tracer=None,
+                       prefetcher=None, resilience=None):
+    """
+    Execute the tool calls of one assistant turn concurrently.
+    
+    The calls of a single turn are independent of each other, so they run on
+    a thread pool of at most max_concurrency workers. Results come back in the
+    order of tool_calls, whatever order the calls finish in.
+    
+    Args:
+        tool_calls: The tool call objects from one LLM response
+        tool_functions: Dictionary mapping function names to function objects
+        max_concurrency: Maximum number of tool calls running at once
+        cache: Optional ToolCache shared by the calls
+        tracer: Optional Tracer that records each call as a span
+        prefetcher: Optional Prefetcher shared by the calls
+        resilience: Optional Resilience policy applied to each call
+    
+    Returns:
+        List of (tool_call, result, elapsed_seconds) tuples, in tool_calls order;
+        a call that raised has an error dictionary as its result
+    """
+    def timed_call(tool_call):
+        start = time.perf_counter()
+        try:
+            result = execute_tool_call(tool_call, tool_functions, cache, tracer, prefetcher, resilience)
+        except Exception as e:
+            # Bad JSON arguments, an unexpected argument or a tool bug: one error result, not a failed turn
+            result = {"error": f"{type(e).__name__}: {e}"}
+        return tool_call, result, time.perf_counter() - start
+    
+    if len(tool_calls) <= 1 or max_concurrency <= 1:
+        return [timed_call(tool_call) for tool_call in tool_calls]
+    
+    # Each worker runs in a copy of this context, so its spans keep the current turn
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(tool_calls))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, timed_call, tool_call) for tool_call in tool_calls
+        ]
+        return [future.result() for future in futures]
 
+def print_tool_timing(executed, wall_time, console):
+    """Show how long a turn's tool calls took in wall time versus summed tool time"""
+    summed = sum(elapsed for _, _, elapsed in executed)
+    breakdown = ", ".join(
+        f"{tool_call.function.name} {elapsed:.2f}s" for tool_call, _, elapsed in executed
+    )
+    console.print(
+        f"[dim]  ⏱ {len(executed)} tool call(s): {wall_time:.2f}s wall, {summed:.2f}s summed ({breakdown})[/dim]"
+    )